@@ -1,29 +1,642 @@
-from assets.constants import COFFEIN_MAIN_COFFE_PAGE
+import argparse
+import os
+import socket
+import time
+from collections import defaultdict
+from dataclasses import fields
+from typing import Collection
+
+from archive.page_archive import PageArchive
+from assets.constants import (
+    ARCHIVE_DIR,
+    COFFEEIN_DETAIL_NODES,
+    COFFEEIN_LISTING_NODES,
+    COFFEIN_MAIN_COFFE_PAGE,
+    DEFAULT_SINK,
+    FINGERPRINTS_PATH,
+    FRONTIER_PATH,
+    WORK_QUEUE_PATH,
+    HTTP_CACHE_PATH,
+    METRICS_DIR,
+    SITE_BUDGETS,
+    SITE_LISTING_PAGES,
+    IGNORED_COFFEES,
+    SKIPPED_BLEND,
+    SKIPPED_IGNORED,
+    SKIPPED_KEYWORD,
+    SKIPPED_PRICE,
+    SKIPPED_WEIGHT,
+)
+from crawlers.archive_replay_crawler import ArchiveReplayCrawler
 from factory.crawler_factory import CrawlerFactory
+from factory.sink_factory import SinkFactory
+from models.metadata import Metadata
 from models.page import PageType
-from factory.processor_factory import ProcessorFactory
-from database.supabase_db import SupabaseDB
+from models.site import Site, SiteBudget
+from database.db_interface import Database
+from database.buffered_writer import BufferedCoffeeWriter
+from database.fingerprint_store import MEMORY, FingerprintStore
+from metrics.run_metrics import RunMetrics
+from parsers.page_parser import PageParser
+from pipeline.page_pipeline import PagePipeline, unique_batches
+from processors.product_filter import ProductFilter
+from planner.incremental_planner import IncrementalPlanner
+from scheduler.crawl_frontier import FRONTIER_STATES, CrawlFrontier
+from scheduler.crawl_scheduler import CrawlScheduler
+from scheduler.work_queue import WORK_STATES, WorkQueue
+from transport.http_cache import HttpCache
+
+BUDGET_FIELDS = {budget_field.name for budget_field in fields(SiteBudget)}
+
+
+def parse_budget(value: str) -> tuple[str, dict]:
+    """SITE:key=value,... e.g. COFFEEIN:requests_per_second=5,priority=1"""
+    name, _, options = value.partition(":")
+    if name not in SITE_LISTING_PAGES:
+        raise argparse.ArgumentTypeError(f"Unknown site: {name}")
+    budget = {}
+    for option in filter(None, options.split(",")):
+        key, _, number = option.partition("=")
+        if key not in BUDGET_FIELDS:
+            raise argparse.ArgumentTypeError(f"Unknown budget option: {key}")
+        try:
+            budget[key] = float(number) if key == "requests_per_second" else int(number)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Invalid number for {key}: {number}")
+    return name, budget
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Crawl coffee shops into the DB")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="fetch every detail page instead of only new or changed products",
+    )
+    parser.add_argument("--stale-after-days", type=int, default=7)
+    parser.add_argument(
+        "--stale-limit",
+        type=int,
+        default=20,
+        help="how many unchanged but stale products to refresh per run",
+    )
+    parser.add_argument(
+        "--sites",
+        nargs="+",
+        choices=list(SITE_LISTING_PAGES),
+        default=list(SITE_LISTING_PAGES),
+        help="shops to crawl concurrently, all of them by default",
+    )
+    parser.add_argument(
+        "--budget",
+        type=parse_budget,
+        action="append",
+        default=[],
+        metavar="SITE:KEY=VALUE,...",
+        help="overrides a site's concurrency, per_host_limit, requests_per_second, "
+        "burst or priority",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help="concurrent page fetches of every site, overrides the budgets",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="parser processes, defaults to the CPU count, 0 parses inline",
+    )
+    parser.add_argument(
+        "--queue-size",
+        type=int,
+        default=64,
+        help="fetched pages waiting for a parser before fetching pauses",
+    )
+    parser.add_argument(
+        "--ignore",
+        action="append",
+        default=[],
+        metavar="WORD",
+        help=f"skips products whose name contains WORD, besides {IGNORED_COFFEES}",
+    )
+    parser.add_argument(
+        "--keyword",
+        action="append",
+        default=[],
+        metavar="WORD",
+        help="keeps only products whose name contains one of the keywords",
+    )
+    parser.add_argument("--min-price", type=float, default=None)
+    parser.add_argument("--max-price", type=float, default=None)
+    parser.add_argument(
+        "--min-weight",
+        type=int,
+        default=None,
+        help="smallest package in grams, read from hints like (1000 g) in names",
+    )
+    parser.add_argument("--max-weight", type=int, default=None)
+    parser.add_argument(
+        "--dom-listings",
+        action="store_true",
+        help="parse listing pages to a DOM instead of scanning their item data",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=500,
+        help="listing products planned, written and fetched together",
+    )
+    parser.add_argument(
+        "--write-batch-size", type=int, default=100, help="coffees per DB write"
+    )
+    parser.add_argument(
+        "--archive-dir", default=ARCHIVE_DIR, help="where fetched pages are archived"
+    )
+    parser.add_argument(
+        "--no-archive", action="store_true", help="do not archive fetched pages"
+    )
+    parser.add_argument(
+        "--replay",
+        nargs="*",
+        metavar="RUN_ID",
+        help="reprocess archived runs without fetching, all runs when none given",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continues the last crawl into the sink, detail pages it finished are "
+        "not fetched again, pending and failed ones are retried",
+    )
+    parser.add_argument(
+        "--enqueue",
+        action="store_true",
+        help="reads the listing and queues the detail pages to fetch in --queue "
+        "for --work processes instead of fetching them",
+    )
+    parser.add_argument(
+        "--work",
+        action="store_true",
+        help="fetches and processes detail pages leased from --queue until it is "
+        "empty, start as many as the sites and the sink allow",
+    )
+    parser.add_argument(
+        "--queue",
+        default=WORK_QUEUE_PATH,
+        help="SQLite work queue, on a shared volume for workers on other machines",
+    )
+    parser.add_argument(
+        "--lease-size", type=int, default=20, help="detail pages leased at once"
+    )
+    parser.add_argument(
+        "--lease-seconds",
+        type=float,
+        default=300,
+        help="after this a lease runs out and its pages go to another worker",
+    )
+    parser.add_argument(
+        "--sink",
+        default=DEFAULT_SINK,
+        help="where coffees are written, supabase or memory for a dry run, "
+        "other sinks can be installed as coffee_aggregator.sinks entry points",
+    )
+    parser.add_argument(
+        "--force-writes",
+        action="store_true",
+        help="write every coffee even when its row did not change since the last run",
+    )
+    parser.add_argument(
+        "--sync-to",
+        metavar="SINK",
+        help="with --sink sqlite, copies the local database to this sink afterwards",
+    )
+    parser.add_argument(
+        "--metrics-dir",
+        default=METRICS_DIR,
+        help="where the Prometheus metrics and the JSON run summary are written",
+    )
+    return parser.parse_args()
 
 
 def main():
-    crawler = CrawlerFactory.create_crawler(PageType.COFFEEIN)
-    processor = ProcessorFactory.create_processor(
-        PageType.COFFEEIN, ignored_coffes=["tasting pack"]
-    )
-    supabase = SupabaseDB()
-    metadata_set = set()
-    for metadata_soup in crawler.find_metadata(COFFEIN_MAIN_COFFE_PAGE):
-        metadata_batch = processor.process_metadata(metadata_soup)
-        metadata_set.update(metadata_batch)
-
-    updated_dict = supabase.update_metadata(list(metadata_set))
-    supabase.delete_old_metadata(list(metadata_set))
-
-    for coffee_soup in crawler.find_coffee(list(metadata_set)):
-        coffee = processor.process_coffee(coffee_soup)
-        if coffee:
-            updated_dict = supabase.update_coffee(coffee)
-            print(updated_dict)
+    args = parse_args()
+    if args.sync_to and args.sink != "sqlite":
+        raise SystemExit("--sync-to needs --sink sqlite")
+    if args.resume and args.replay is not None:
+        raise SystemExit(
+            "--resume continues a crawl, it does not combine with --replay"
+        )
+    if args.enqueue and args.work:
+        raise SystemExit("--enqueue and --work run as separate processes")
+    if (args.enqueue or args.work) and (args.replay is not None or args.resume):
+        raise SystemExit("the work queue keeps its own state, drop --replay/--resume")
+    metrics = RunMetrics()
+    archives = []
+    cache = None
+    if args.replay is not None:
+        run_ids = args.replay or PageArchive.runs(args.archive_dir)
+        archives = [
+            PageArchive(args.archive_dir, run_id, readonly=True) for run_id in run_ids
+        ]
+        crawler = ArchiveReplayCrawler(
+            archives,
+            PageParser(
+                listing_nodes=COFFEEIN_LISTING_NODES,
+                detail_nodes=COFFEEIN_DETAIL_NODES,
+                raw_listings=not args.dom_listings,
+            ),
+        )
+        # archives only hold Coffeein pages so far
+        sites = [
+            Site(
+                PageType.COFFEEIN.name,
+                PageType.COFFEEIN,
+                crawler,
+                COFFEIN_MAIN_COFFE_PAGE,
+            )
+        ]
+    else:
+        if not args.no_archive:
+            archives = [PageArchive(args.archive_dir)]
+            print(f"Archiving fetched pages as run {archives[0].run_id}")
+        cache = HttpCache(HTTP_CACHE_PATH)
+        sites = build_sites(args, cache, archives[0] if archives else None)
+    # replays fetch nothing and the work queue tracks its items itself
+    frontier = (
+        CrawlFrontier(
+            MEMORY if args.sink == "memory" else FRONTIER_PATH.format(sink=args.sink)
+        )
+        if args.replay is None and not (args.enqueue or args.work)
+        else None
+    )
+    work_queue = WorkQueue(args.queue) if args.enqueue or args.work else None
+    pipeline = PagePipeline(
+        sites,
+        product_filter=build_filter(args),
+        workers=args.workers,
+        queue_size=args.queue_size,
+        metrics=metrics,
+        frontier=frontier,
+    )
+    database = SinkFactory.create_sink(args.sink)
+    fingerprints = FingerprintStore(
+        MEMORY if args.sink == "memory" else FINGERPRINTS_PATH.format(sink=args.sink)
+    )
+    if args.force_writes:
+        fingerprints.clear()
+    scheduler = CrawlScheduler(sites, metrics)
+    # every site feeds the same parser pool and the same writer
+    with (
+        pipeline,
+        BufferedCoffeeWriter(
+            database,
+            batch_size=args.write_batch_size,
+            metrics=metrics,
+            fingerprints=fingerprints,
+            frontier=frontier,
+        ) as writer,
+    ):
+        task = replay if args.replay is not None else run
+        with metrics.stage("crawl"):
+            if args.work:
+                work(args, sites, pipeline, database, writer, work_queue)
+            else:
+                scheduler.run(
+                    lambda site: task(
+                        args, site, pipeline, database, writer, work_queue
+                    )
+                )
+    fingerprints.close()
+    if work_queue is not None:
+        counts = work_queue.counts()
+        print(
+            "Work queue "
+            + ", ".join(f"{state}: {counts.get(state, 0)}" for state in WORK_STATES)
+        )
+        work_queue.close()
+    if frontier is not None:
+        for site in sites:
+            counts = frontier.counts(site.page_type.name)
+            print(
+                f"{site.name} frontier: "
+                + ", ".join(
+                    f"{state}: {counts.get(state, 0)}" for state in FRONTIER_STATES
+                )
+            )
+        frontier.close()
+    if writer.report.failed:
+        print(f"Failed to save coffees: {writer.report.failed}")
+    if args.sync_to:
+        with metrics.stage("sync"):
+            synced = database.sync_to(SinkFactory.create_sink(args.sync_to))
+        print(f"Synced {synced} to {args.sync_to}")
+    for archive in archives:
+        archive.close()
+    if cache is not None:
+        cache.close()
+    report(args, sites, metrics)
+    # cron and CI only see the exit status
+    if scheduler.errors:
+        raise SystemExit(f"Crawling failed for {', '.join(sorted(scheduler.errors))}")
+
+
+def build_filter(args) -> ProductFilter:
+    """products are filtered on their listing data, before any detail request"""
+    return ProductFilter(
+        ignored=[*IGNORED_COFFEES, *args.ignore],
+        keywords=args.keyword,
+        min_price=args.min_price,
+        max_price=args.max_price,
+        min_weight=args.min_weight,
+        max_weight=args.max_weight,
+    )
+
+
+def build_sites(
+    args, cache: HttpCache = None, archive: PageArchive = None
+) -> list[Site]:
+    overrides = dict(args.budget)
+    sites = []
+    for name in args.sites:
+        budget = SiteBudget(**{**SITE_BUDGETS.get(name, {}), **overrides.get(name, {})})
+        if args.concurrency is not None:
+            budget.concurrency = args.concurrency
+        page_type = PageType[name]
+        crawler = CrawlerFactory.create_crawler(
+            page_type,
+            cache=cache,
+            archive=archive,
+            raw_listings=not args.dom_listings,
+            **budget.crawler_options(),
+        )
+        sites.append(Site(name, page_type, crawler, SITE_LISTING_PAGES[name], budget))
+    return sites
+
+
+def run(
+    args,
+    site: Site,
+    pipeline: PagePipeline,
+    database: Database,
+    writer: BufferedCoffeeWriter,
+    work_queue: WorkQueue = None,
+):
+    """streams one site's listing data through in batches, so memory follows
+    the batch size instead of the catalogue size, only the seen page_ids are kept"""
+    metrics = pipeline.metrics
+    frontier = pipeline.frontier
+    origin = site.page_type.name
+    planner = IncrementalPlanner(args.stale_after_days, args.stale_limit)
+    seen_page_ids: set[int] = set()
+    # filtered products are still on the site, their rows are kept unless ignored
+    listed_page_ids: set[int] = set()
+    if frontier is not None and not args.resume:
+        frontier.reset(origin)
+
+    metadata = pipeline.metadata(site, listed_page_ids)
+    for batch in unique_batches(metadata, args.batch_size, seen_page_ids):
+        if args.full:
+            to_fetch = batch
+        else:
+            stored = database.get_metadata(origin, [item.page_id for item in batch])
+            plan = planner.plan_batch(batch, stored)
+            for state in ("new", "changed", "unchanged"):
+                metrics.count(
+                    "planned_products",
+                    len(getattr(plan, state)),
+                    site=site.name,
+                    state=state,
+                )
+            to_fetch = plan.to_write
+        if frontier is not None:
+            to_fetch = frontier.schedule(
+                origin, batch, to_fetch, site.crawler.coffee_url
+            )
+        if work_queue is not None:
+            queued = work_queue.enqueue(to_fetch, site.crawler.coffee_url)
+            metrics.count("pages_queued", queued, site=site.name)
+            continue
+        # metadata is stored only with its coffee, a failed page stays new or
+        # changed for the next run instead of looking unchanged
+        completed, _ = crawl_details(site, pipeline, writer, to_fetch)
+        write_metadata(database, completed, metrics)
+
+    stale = planner.take_stale()
+    metrics.count("planned_products", len(stale), site=site.name, state="stale")
+    to_refresh = stale
+    if frontier is not None:
+        to_refresh = frontier.schedule(origin, stale, stale, site.crawler.coffee_url)
+    if work_queue is not None:
+        # the workers store the metadata of what they finish
+        queued = work_queue.enqueue(to_refresh, site.crawler.coffee_url)
+        metrics.count("pages_queued", queued, site=site.name)
+    else:
+        # the sink holds these as listed, an unchanged page only needs a touch
+        refreshed, _ = crawl_details(
+            site,
+            pipeline,
+            writer,
+            to_refresh,
+            stored_page_ids={item.page_id for item in to_refresh},
+        )
+        database.touch_metadata([item.page_id for item in refreshed], origin)
+
+    if site.crawler.listing_incomplete:
+        print(f"{site.name} listing incomplete, no metadata deleted")
+    else:
+        with metrics.time("db_write", table="metadata"):
+            deleted = database.delete_old_metadata(listed_page_ids, origin)
+        metrics.count("metadata_written", len(deleted), result="deleted")
+    if not args.full:
+        print(
+            f"{site.name} "
+            + ", ".join(
+                f"{state}: "
+                f"{metrics.value('planned_products', site=site.name, state=state):g}"
+                for state in ("new", "changed", "stale", "unchanged")
+            )
+        )
+
+
+def replay(
+    args,
+    site: Site,
+    pipeline: PagePipeline,
+    database: Database,
+    writer: BufferedCoffeeWriter,
+    work_queue: WorkQueue = None,
+):
+    """reprocesses archived pages, nothing is deleted since a run may only hold
+    part of the catalogue"""
+    crawler: ArchiveReplayCrawler = site.crawler
+    seen_page_ids: set[int] = set()
+    metadata = pipeline.metadata(site)
+    for batch in unique_batches(metadata, args.batch_size, seen_page_ids):
+        write_metadata(database, batch, pipeline.metrics)
+        for coffee in pipeline.coffees(site, batch):
+            writer.write(coffee)
+    pipeline.metrics.count(
+        "pages_missing", len(crawler.missing), site=site.name, kind="detail"
+    )
+    print(
+        f"Replayed {len(seen_page_ids)} products from {len(crawler.archives)} runs, "
+        f"{len(crawler.missing)} without an archived detail page"
+    )
+
+
+def crawl_details(
+    site: Site,
+    pipeline: PagePipeline,
+    writer: BufferedCoffeeWriter,
+    metadata_list: list[Metadata],
+    stored_page_ids: Collection[int] = (),
+) -> tuple[list[Metadata], dict[int, str]]:
+    """fetches, processes and stores the coffees of metadata_list, returns the
+    products whose page completed and the errors of the others by page_id,
+    unchanged pages are skipped for the stored_page_ids only"""
+    if not metadata_list:
+        return [], {}
+    crawler = site.crawler
+    failed_before = len(crawler.failures)
+    unchanged_before = len(crawler.unchanged)
+    written_before = len(writer.report.failed)
+    processed_urls: set[str] = set()
+    for coffee in pipeline.coffees(
+        site, metadata_list, stored_page_ids, processed_urls
+    ):
+        writer.write(coffee)
+    writer.sync()
+    fetch_errors = {
+        result.url: result.error for result in crawler.failures[failed_before:]
+    }
+    # only pages that were processed or skipped as unchanged completed,
+    # a page the crawler lost without a failure is not
+    reached_urls = processed_urls.union(crawler.unchanged[unchanged_before:])
+    write_failures = set(writer.report.failed[written_before:])
+    completed = []
+    errors = {}
+    for metadata in metadata_list:
+        url = crawler.coffee_url(metadata)
+        if url in fetch_errors:
+            errors[metadata.page_id] = fetch_errors[url] or "fetch failed"
+        elif url not in reached_urls:
+            errors[metadata.page_id] = "page not fetched"
+        elif (metadata.origin, metadata.page_id) in write_failures:
+            errors[metadata.page_id] = "write failed"
+        else:
+            completed.append(metadata)
+    return completed, errors
+
+
+def work(
+    args,
+    sites: list[Site],
+    pipeline: PagePipeline,
+    database: Database,
+    writer: BufferedCoffeeWriter,
+    work_queue: WorkQueue,
+):
+    """leases detail pages from the work queue until it is empty, crawls
+    them with the usual crawler and processor and acks each lease once its
+    coffees are stored, any number of these may run against one queue"""
+    owner = f"{socket.gethostname()}-{os.getpid()}"
+    planner = IncrementalPlanner()
+    sites_by_origin = {site.page_type.name: site for site in sites}
+    while True:
+        items = work_queue.lease(owner, args.lease_size, args.lease_seconds)
+        if not items:
+            # leases of other workers may still run out and come back
+            if not work_queue.has_work():
+                return
+            time.sleep(1.0)
+            continue
+        failures = {}
+        done = []
+        by_origin = defaultdict(list)
+        for item in items:
+            if item.metadata.origin in sites_by_origin:
+                by_origin[item.metadata.origin].append(item)
+            else:
+                failures[item.id] = f"No site crawls {item.metadata.origin}"
+        for origin, site_items in by_origin.items():
+            metadata_list = [item.metadata for item in site_items]
+            # a lease whose page answers 304 is only done when the sink has
+            # the product as listed, a queued new or changed one is processed
+            stored = database.get_metadata(
+                origin, [item.page_id for item in metadata_list]
+            )
+            completed, errors = crawl_details(
+                sites_by_origin[origin],
+                pipeline,
+                writer,
+                metadata_list,
+                stored_page_ids={
+                    item.page_id
+                    for item in metadata_list
+                    if item.page_id in stored
+                    and not planner.is_changed(item, stored[item.page_id])
+                },
+            )
+            write_metadata(database, completed, pipeline.metrics)
+            for item in site_items:
+                if item.metadata.page_id in errors:
+                    failures[item.id] = errors[item.metadata.page_id]
+                else:
+                    done.append(item.id)
+        work_queue.ack(owner, done)
+        work_queue.nack(owner, failures)
+        pipeline.metrics.count("pages_acked", len(done))
+        pipeline.metrics.count("pages_nacked", len(failures))
+
+
+def write_metadata(database: Database, metadata_list, metrics: RunMetrics):
+    if not metadata_list:
+        return
+    with metrics.time("db_write", table="metadata"):
+        result = database.update_metadata(metadata_list)
+    for state in ("created", "updated"):
+        metrics.count("metadata_written", len(result[state]), result=state)
+
+
+def report(args, sites: list[Site], metrics: RunMetrics):
+    for site in sites:
+        crawler = site.crawler
+        metrics.count("pages_failed", len(crawler.failures), site=site.name)
+        metrics.count("pages_unchanged", len(crawler.unchanged), site=site.name)
+        if crawler.controller:
+            for reason, count in crawler.controller.back_offs.items():
+                metrics.count(
+                    "concurrency_back_offs", count, site=site.name, reason=reason
+                )
+        for failure in crawler.failures:
+            print(
+                f"Failed to fetch {failure.url} after {failure.attempts} attempts: "
+                f"{failure.error}"
+            )
+
+    print(
+        f"Fetched {metrics.total('pages_fetched', kind='listing'):g} listing and "
+        f"{metrics.total('pages_fetched', kind='detail'):g} detail pages from "
+        f"{len(sites)} sites, {metrics.total('pages_failed'):g} failed, "
+        f"{metrics.total('pages_unchanged'):g} unchanged"
+    )
+    filtered = sum(
+        metrics.total("products_skipped", reason=reason)
+        for reason in (SKIPPED_KEYWORD, SKIPPED_PRICE, SKIPPED_WEIGHT)
+    )
+    print(
+        f"Saved {metrics.value('coffees_written', saved='true'):g} coffees "
+        f"({metrics.value('coffee_writes', state='inserted'):g} inserted, "
+        f"{metrics.value('coffee_writes', state='changed'):g} changed), "
+        f"{metrics.value('coffee_writes', state='unchanged'):g} unchanged not written, "
+        f"{metrics.value('coffees_written', saved='false'):g} failed, skipped "
+        f"{metrics.total('products_skipped', reason=SKIPPED_IGNORED):g} ignored, "
+        f"{filtered:g} filtered and "
+        f"{metrics.total('products_skipped', reason=SKIPPED_BLEND):g} blends"
+    )
+    prometheus_path, summary_path = metrics.export(args.metrics_dir)
+    print(f"Metrics written to {prometheus_path} and {summary_path}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,171 @@
+import fcntl
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Generator
+
+from models.fetch_result import FetchResult
+
+INDEX_FILE = "index.sqlite"
+PAGES_FILE = "pages.dat"
+
+
+class PageArchive:
+    """Append-only archive of the pages fetched in one run.
+
+    Bodies are zlib compressed and appended to pages.dat, a SQLite index maps
+    url and page_id to their offset. A page stored twice keeps its latest body.
+    Processes that share a run append under a lock on pages.dat."""
+
+    def __init__(self, root: str, run_id: str = None, readonly=False) -> None:
+        # the pid keeps work queue workers started in the same second apart
+        self.run_id = run_id or (
+            datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S") + f"-{os.getpid()}"
+        )
+        self.path = os.path.join(root, self.run_id)
+        self.readonly = readonly
+        self.lock = threading.Lock()
+        if readonly and not os.path.exists(os.path.join(self.path, INDEX_FILE)):
+            raise FileNotFoundError(f"No archived run {self.run_id} in {root}")
+        os.makedirs(self.path, exist_ok=True)
+        pages_path = os.path.join(self.path, PAGES_FILE)
+        self.pages_file = None if readonly else open(pages_path, "ab")
+        self.reader = open(pages_path, "rb")
+        self.connection = sqlite3.connect(
+            os.path.join(self.path, INDEX_FILE), check_same_thread=False
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                page_id INTEGER,
+                status INTEGER,
+                final_url TEXT,
+                offset INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                sequence INTEGER NOT NULL,
+                fetched_at REAL NOT NULL
+            )"""
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS pages_page_id ON pages (page_id)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS pages_sequence ON pages (sequence)"
+        )
+        self.connection.commit()
+
+    @staticmethod
+    def runs(root: str) -> list[str]:
+        """archived run ids, oldest first"""
+        if not os.path.isdir(root):
+            return []
+        return sorted(
+            run_id
+            for run_id in os.listdir(root)
+            if os.path.exists(os.path.join(root, run_id, INDEX_FILE))
+        )
+
+    def record(self, kind: str, result: FetchResult, page_id: int = None) -> None:
+        if self.readonly:
+            raise RuntimeError(f"Archive {self.run_id} is read only")
+        body = zlib.compress(result.text.encode("utf-8"))
+        with self.lock:
+            # tell() of an append handle is stale once another process wrote
+            fcntl.flock(self.pages_file, fcntl.LOCK_EX)
+            try:
+                self.append(kind, result, page_id, body)
+            finally:
+                fcntl.flock(self.pages_file, fcntl.LOCK_UN)
+
+    def append(self, kind: str, result: FetchResult, page_id: int, body: bytes) -> None:
+        """caller holds the lock on pages.dat"""
+        self.pages_file.seek(0, os.SEEK_END)
+        offset = self.pages_file.tell()
+        self.pages_file.write(body)
+        # the body has to be on disk before the index points at it
+        self.pages_file.flush()
+        (sequence,) = self.connection.execute(
+            "SELECT COALESCE(MAX(sequence), 0) + 1 FROM pages"
+        ).fetchone()
+        self.connection.execute(
+            """INSERT OR REPLACE INTO pages
+            (url, kind, page_id, status, final_url, offset, size, sequence, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (
+                result.url,
+                kind,
+                page_id,
+                result.status,
+                result.final_url,
+                offset,
+                len(body),
+                sequence,
+                time.time(),
+            ),
+        )
+        self.connection.commit()
+
+    def pages(self, kind: str) -> Generator[FetchResult, None, None]:
+        """every archived page of a kind in the order it was fetched"""
+        with self.lock:
+            rows = self.connection.execute(
+                """SELECT url, status, final_url, offset, size FROM pages
+                WHERE kind = ? ORDER BY sequence""",
+                (kind,),
+            ).fetchall()
+        for row in rows:
+            yield self.load(*row)
+
+    def page_ids(self) -> set[int]:
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT page_id FROM pages WHERE page_id IS NOT NULL"
+            ).fetchall()
+        return {page_id for (page_id,) in rows}
+
+    def get(self, url: str) -> FetchResult | None:
+        return self.find("url", url)
+
+    def get_page(self, page_id: int) -> FetchResult | None:
+        return self.find("page_id", page_id)
+
+    def find(self, column: str, value) -> FetchResult | None:
+        with self.lock:
+            row = self.connection.execute(
+                f"""SELECT url, status, final_url, offset, size FROM pages
+                WHERE {column} = ? ORDER BY sequence DESC LIMIT 1""",
+                (value,),
+            ).fetchone()
+        return self.load(*row) if row else None
+
+    def load(
+        self, url: str, status: int, final_url: str, offset: int, size: int
+    ) -> FetchResult:
+        with self.lock:
+            self.reader.seek(offset)
+            body = self.reader.read(size)
+        return FetchResult(
+            url=url,
+            status=status,
+            text=zlib.decompress(body).decode("utf-8"),
+            final_url=final_url,
+        )
+
+    def close(self) -> None:
+        with self.lock:
+            if self.pages_file:
+                self.pages_file.close()
+            self.reader.close()
+            self.connection.close()
+
+    def __enter__(self) -> "PageArchive":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -1,9 +1,34 @@
 # CRAWLER
+COFFEEIN_BASE_URL = "https://www.coffeein.sk/"
 COFFEIN_MAIN_COFFE_PAGE = "kategoria/2/cerstvo-prazena-zrnkova-kava/"
+HTTP_CACHE_PATH = ".cache/http_cache.sqlite"
+
+# SITES, keyed by PageType name, with the listing page and the default
+# politeness budget of every shop the crawler factory supports
+SITE_LISTING_PAGES = {"COFFEEIN": COFFEIN_MAIN_COFFE_PAGE}
+SITE_BUDGETS = {
+    "COFFEEIN": {
+        "concurrency": 16,
+        "per_host_limit": 4,
+        "requests_per_second": 20,
+        "burst": 8,
+        "priority": 0,
+        "adaptive": True,
+    },
+}
 
 ## DATABASE
 TABLE_METADATA = "metadata"
 TABLE_COFFEE = "coffee"
+SELECT_PAGE_SIZE = 1000
+WRITE_BATCH_SIZE = 500
+SQLITE_PATH = ".data/coffee.sqlite"
+# fingerprints of the coffees written to each sink
+FINGERPRINTS_PATH = ".cache/fingerprints-{sink}.sqlite"
+# state of every page of the last crawl into each sink, for --resume
+FRONTIER_PATH = ".cache/frontier-{sink}.sqlite"
+# detail pages queued for --work processes, pass --queue for a shared volume
+WORK_QUEUE_PATH = ".data/work_queue.sqlite"
 
 
 # COLUMNS METADATA
@@ -24,6 +49,28 @@ SCRIPT = "script"
 
 H1 = "h1"
 
+# HTML PARSING
+HTML_PARSER = "html.parser"
+LXML_PARSER = "lxml"
+# (tag, attribute, value) of every node CoffeeinProcessor reads on a detail page,
+# None matches any value
+COFFEEIN_DETAIL_NODES = (
+    ("script", None, None),
+    ("h1", "itemprop", "name"),
+    ("p", "itemprop", "description"),
+    ("span", "class", "product_price"),
+    ("div", "class", "speci_param"),
+    ("div", "id", "ranks_box"),
+    ("div", "class", "long_desc_desc"),
+    ("div", "class", "recommended_preparation"),
+    ("div", "class", "popis_date_data"),
+)
+# listing pages need the dataLayer script and the pagination links
+COFFEEIN_LISTING_NODES = (
+    ("script", None, None),
+    ("a", None, None),
+)
+
 # COFFEEIN EXTRAS
 ARABICA_COFFEEIN = "100 % Arabica"
 ROBUSTA_COFFEEIN = "100 % Robusta"
@@ -38,3 +85,26 @@ SWEETNEST_COFFEEIN = "sladkosť"
 ACIDITY_COFFEEIN = "acidita"
 BITTERNESS_COFFEEIN = "horkosť"
 BODY_COFFEIN = "telo"
+
+# PAGE ARCHIVE
+ARCHIVE_DIR = ".archive"
+LISTING_PAGE = "listing"
+DETAIL_PAGE = "detail"
+
+# PLUGINS, entry point groups other packages register implementations in
+CRAWLER_ENTRY_POINTS = "coffee_aggregator.crawlers"
+PROCESSOR_ENTRY_POINTS = "coffee_aggregator.processors"
+SINK_ENTRY_POINTS = "coffee_aggregator.sinks"
+DEFAULT_SINK = "supabase"
+
+# METRICS
+METRICS_DIR = ".metrics"
+METRICS_PREFIX = "coffee_aggregator"
+SKIPPED_IGNORED = "ignored"
+SKIPPED_BLEND = "blend"
+SKIPPED_KEYWORD = "keyword"
+SKIPPED_PRICE = "price"
+SKIPPED_WEIGHT = "weight"
+
+# FILTERS
+IGNORED_COFFEES = ("tasting pack",)
@@ -0,0 +1,85 @@
+"""Compares the single-scan FieldExtractor against one re.search per label.
+
+Run from src/: python -m benchmarks.field_extraction_benchmark [--blocks 2000]
+"""
+
+import argparse
+import re
+import time
+
+from benchmarks.synthetic_pages import synthetic_products
+from processors.coffein_fields import COFFEEIN_FIELDS
+
+
+def legacy_extract(long_desc: str, description: str, popis_date: str) -> dict:
+    """the per-field regexes CoffeeinProcessor ran before the field engine"""
+    values = {}
+    for name, pattern in (
+        ("variety", r"ODRODA:\s*(.+)"),
+        ("region", r"REGIÓN:\s*(.+)"),
+        ("farm", r"FARMA:\s*(.+)"),
+        ("altitude", r"NADMORSKÁ VÝŠKA:\s*(.+)"),
+        ("processing", r"SPRACOVANIE:\s*(.+)"),
+    ):
+        if match := re.search(pattern, long_desc):
+            values[name] = match.group(1).strip()
+    if match := re.search(r"Odtieň praženia:\s*([^<\n]+)", description):
+        roast_shade = match.group(1).strip().split("Veľkosť")[0].strip()
+        values["roast_shade"] = roast_shade.split("Metóda")[0].strip()
+    if match := re.search(r"Veľkosť balenia:\s*([^<\n]+)", description):
+        values["package_size"] = match.group(1).strip()
+    if match := re.search(r"Upražené a vypité:\s*(\d+)x", popis_date):
+        values["buy_count"] = match.group(1)
+    return values
+
+
+def engine_extract(long_desc: str, description: str, popis_date: str) -> dict:
+    values = {}
+    for text in (long_desc, description, popis_date):
+        values.update(COFFEEIN_FIELDS.extract(text))
+    return values
+
+
+def text_blocks(count: int, padding: int) -> list[tuple[str, str, str]]:
+    filler = "Káva s tónmi čokolády a orechov. " * padding
+    return [
+        (
+            f"{filler}\nODRODA: {product['variety']}\nREGIÓN: {product['origin']}\n"
+            f"FARMA: Finca {product['page_id']}\nNADMORSKÁ VÝŠKA: 1800 m n. m.\n"
+            f"SPRACOVANIE: {product['processing']}\n{filler}",
+            f"100 % Arabica. {filler}\nOdtieň praženia: {product['roast_shade']} "
+            f"Veľkosť balenia: 250 g\n{filler}",
+            f"Pridané: 1.1.2025 Upražené a vypité: {product['buy_count']}x",
+        )
+        for product in synthetic_products(count)
+    ]
+
+
+def timed(extract, blocks, repeat) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for block in blocks:
+            extract(*block)
+    return (time.perf_counter() - started) * 1_000_000 / (repeat * len(blocks))
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--blocks", type=int, default=2000)
+    arg_parser.add_argument("--padding", type=int, default=20)
+    arg_parser.add_argument("--repeat", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    blocks = text_blocks(args.blocks, args.padding)
+    mismatches = sum(
+        legacy_extract(*block) != engine_extract(*block) for block in blocks
+    )
+    legacy_us = timed(legacy_extract, blocks, args.repeat)
+    engine_us = timed(engine_extract, blocks, args.repeat)
+    print(f"legacy regexes  {legacy_us:8.1f} us/page")
+    print(f"field engine    {engine_us:8.1f} us/page")
+    print(f"speedup         {legacy_us / engine_us:8.2f}x, {mismatches} mismatches")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Peak RSS of the listing flow for a large synthetic catalogue.
+
+Compares collecting every Metadata before planning, as app.main used to, with
+streaming the catalogue through in batches. Each mode runs in its own process
+so their peaks do not mix, and the size of the models is reported too.
+
+Run from src/: python -m benchmarks.memory_benchmark [--products 100000]
+"""
+
+import argparse
+import resource
+import subprocess
+import sys
+import tracemalloc
+
+from assets.constants import COFFEEIN_LISTING_NODES
+from benchmarks.synthetic_pages import listing_page, synthetic_products
+from models.coffee import Coffee, Origin, Popularity, Species, Taste
+from models.metadata import Metadata
+from models.page import PageType
+from parsers.page_parser import PageParser
+from pipeline.page_pipeline import unique_batches
+from planner.incremental_planner import IncrementalPlanner
+from processors.coffein_processor import CoffeeinProcessor
+
+PER_PAGE = 24
+
+
+def listing_metadata(products: int):
+    """processes generated listing pages one at a time, like the pipeline"""
+    parser = PageParser(listing_nodes=COFFEEIN_LISTING_NODES)
+    processor = CoffeeinProcessor(["tasting pack"])
+    template = synthetic_products(PER_PAGE)
+    last_page = -(-products // PER_PAGE)
+    for page_number in range(1, last_page + 1):
+        offset = (page_number - 1) * PER_PAGE
+        page_products = [
+            {
+                **product,
+                "page_id": product["page_id"] + offset,
+                "name": f"{product['name']} {page_number}",
+            }
+            for product in template[: products - offset]
+        ]
+        html = listing_page(page_products, page_number, last_page, "/k/", blocks=2)
+        yield from processor.process_metadata(parser.parse_listing(html))
+
+
+def run_collect(products: int) -> int:
+    metadata_list = list(set(listing_metadata(products)))
+    plan = IncrementalPlanner().plan(metadata_list, {})
+    return len(plan.to_write)
+
+
+def run_stream(products: int, batch_size: int) -> int:
+    planner = IncrementalPlanner()
+    seen_page_ids: set[int] = set()
+    planned = 0
+    for batch in unique_batches(listing_metadata(products), batch_size, seen_page_ids):
+        plan = planner.plan_batch(batch, {})
+        planned += len(plan.to_write)
+    return planned + len(planner.take_stale())
+
+
+def model_sizes(count=10000) -> tuple[float, float]:
+    """bytes per Metadata and per Coffee, as retained on the heap"""
+    products = synthetic_products(count)
+    tracemalloc.start()
+    metadata = [
+        Metadata(
+            product["page_id"],
+            PageType.COFFEEIN.name,
+            product["name"],
+            product["price"],
+            f"detail-{product['page_id']}",
+        )
+        for product in products
+    ]
+    metadata_bytes = tracemalloc.get_traced_memory()[0]
+    coffees = [
+        Coffee(
+            id=product["page_id"],
+            page=PageType.COFFEEIN.name,
+            name=product["name"],
+            price=product["price"],
+            weight=250,
+            origin=Origin(region=product["origin"], variety=product["variety"]),
+            taste=Taste(
+                *product["ratings"],
+                roast_shade=product["roast_shade"],
+                species=Species(100, 0),
+                processing=product["processing"],
+                flavor_profile=product["flavors"],
+            ),
+            popularity=Popularity(tuple(product["reviews"]), 90, product["buy_count"]),
+        )
+        for product in products
+    ]
+    coffee_bytes = tracemalloc.get_traced_memory()[0] - metadata_bytes
+    tracemalloc.stop()
+    del metadata, coffees
+    return metadata_bytes / count, coffee_bytes / count
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--products", type=int, default=100_000)
+    arg_parser.add_argument("--batch-size", type=int, default=500)
+    arg_parser.add_argument("--mode", choices=["collect", "stream"])
+    args = arg_parser.parse_args()
+
+    if args.mode:
+        if args.mode == "collect":
+            planned = run_collect(args.products)
+        else:
+            planned = run_stream(args.products, args.batch_size)
+        peak_mib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"{args.mode:<8}{planned:>10}{peak_mib:>12.1f}")
+        return
+
+    metadata_bytes, coffee_bytes = model_sizes()
+    print(f"Metadata {metadata_bytes:.0f} B, Coffee {coffee_bytes:.0f} B per object")
+    print(f"{args.products} products, batches of {args.batch_size}")
+    print(f"{'mode':<8}{'planned':>10}{'peak MiB':>12}")
+    for mode in ("collect", "stream"):
+        subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.memory_benchmark",
+                "--mode",
+                mode,
+                "--products",
+                str(args.products),
+                "--batch-size",
+                str(args.batch_size),
+            ],
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Compares parse time and peak memory per detail page across parser backends.
+
+Run from src/: python -m benchmarks.parser_benchmark [--pages 50] [--files a.html ...]
+"""
+
+import argparse
+import time
+import tracemalloc
+from importlib.util import find_spec
+
+from assets.constants import COFFEEIN_DETAIL_NODES, HTML_PARSER, LXML_PARSER
+from benchmarks.synthetic_pages import detail_page, synthetic_products
+from parsers.page_parser import PageParser
+from processors.coffein_processor import CoffeeinProcessor
+
+
+def load_pages(args) -> list[str]:
+    if args.files:
+        pages = []
+        for path in args.files:
+            with open(path, encoding="utf-8") as file:
+                pages.append(file.read())
+        return pages
+    return [
+        detail_page(product, blocks=args.blocks)
+        for product in synthetic_products(args.pages)
+    ]
+
+
+def available_parsers() -> list[tuple[str, PageParser]]:
+    backends = [HTML_PARSER]
+    if find_spec("lxml"):
+        backends.append(LXML_PARSER)
+    parsers = []
+    for backend in backends:
+        parsers.append((f"{backend} full", PageParser(backend)))
+        parsers.append(
+            (
+                f"{backend} scoped",
+                PageParser(backend, detail_nodes=COFFEEIN_DETAIL_NODES),
+            )
+        )
+    return parsers
+
+
+def measure(parser: PageParser, pages: list[str], repeat: int) -> tuple[float, float]:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            parser.parse_detail(page)
+    per_page_ms = (time.perf_counter() - started) * 1000 / (repeat * len(pages))
+
+    peaks = []
+    for page in pages:
+        tracemalloc.start()
+        soup = parser.parse_detail(page)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        del soup
+    return per_page_ms, max(peaks) / 1024
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--pages", type=int, default=50)
+    arg_parser.add_argument("--blocks", type=int, default=150)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--files", nargs="*")
+    args = arg_parser.parse_args()
+
+    pages = load_pages(args)
+    average_kib = sum(len(page.encode("utf-8")) for page in pages) / len(pages) / 1024
+    print(f"{len(pages)} pages, {average_kib:.0f} KiB on average")
+
+    processor = CoffeeinProcessor()
+    reference = None
+    print(f"{'parser':<22}{'ms/page':>10}{'peak KiB':>12}  same output")
+    for name, parser in available_parsers():
+        per_page_ms, peak_kib = measure(parser, pages, args.repeat)
+        coffees = [
+            processor.process_coffee(parser.parse_detail(page)) for page in pages
+        ]
+        if reference is None:
+            reference = coffees
+        print(
+            f"{name:<22}{per_page_ms:>10.2f}{peak_kib:>12.0f}  {coffees == reference}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""Times CoffeeinProcessor and each of its extractors on the html fixtures.
+
+Records time and peak traced memory per call and compares them against the
+stored baseline, failing when a case got slower than the threshold allows.
+Timings are the fastest of the repeated rounds, which take turns between the
+cases, and are compared after scaling the baseline by a reference workload
+timed alongside them, so a busier or slower machine does not read as a
+regression. A regression also has to show again in --confirm reruns.
+
+Run from src/:
+    python -m benchmarks.processor_benchmark            print the results
+    python -m benchmarks.processor_benchmark --check    fail on regressions
+    python -m benchmarks.processor_benchmark --save     store a new baseline
+    python -m benchmarks.processor_benchmark --write-fixtures
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable
+
+from assets.constants import COFFEEIN_DETAIL_NODES, COFFEEIN_LISTING_NODES
+from benchmarks.synthetic_pages import detail_page, listing_page, synthetic_products
+from parsers.page_parser import PageParser
+from processors.coffein_processor import CoffeeinProcessor
+from processors.page_context import CoffeeinPageContext
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCHMARK_DIR, "fixtures")
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, "results", "processor_baseline.json")
+# timed alongside the cases, regressions are judged relative to it
+REFERENCE = "reference"
+
+# extractors timed on their own, each gets a page context whose node walk
+# already happened, so it pays only for the text it reads itself
+HANDLERS: dict[str, Callable] = {
+    "handle_page_id": lambda processor, page: processor.handle_page_id(page),
+    "handle_species": lambda processor, page: processor.handle_species(page),
+    "handle_size": lambda processor, page: processor.handle_size(page.name, page),
+    "handle_popularity": lambda processor, page: processor.handle_popularity(page),
+    "handle_decaf": lambda processor, page: processor.handle_decaf(page.name, page),
+    "handle_origin": lambda processor, page: processor.handle_origin(page),
+    "handle_taste_ratings": (
+        lambda processor, page: processor.handle_taste_ratings(page)
+    ),
+    "handle_roast_shade": lambda processor, page: processor.handle_roast_shade(page),
+    "handle_flavor_profile": (
+        lambda processor, page: processor.handle_flavor_profile(page)
+    ),
+    "handel_processing": lambda processor, page: processor.handel_processing(page),
+}
+
+
+def write_fixtures() -> None:
+    """regenerates the fixtures, covering single origins, a decaf, a blend,
+    pages without reviews and a page that only states species in tags"""
+    products = synthetic_products(60, seed=7)
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    base_path = "/kategoria/2/cerstvo-prazena-zrnkova-kava/"
+    pages = {
+        "listing_page_1.html": listing_page(products[:24], 1, 3, base_path),
+        "listing_page_3.html": listing_page(products[48:], 3, 3, base_path),
+    }
+    single_origin = next(p for p in products if p["arabica"] == 100 and p["reviews"])
+    no_reviews = next(p for p in products if p["arabica"] == 100 and not p["reviews"])
+    blend = next(p for p in products if p["arabica"] != 100)
+    decaf = dict(single_origin, page_id=2000, decaf=True)
+    pages["detail_single_origin.html"] = detail_page(single_origin)
+    pages["detail_no_reviews.html"] = detail_page(no_reviews)
+    pages["detail_blend.html"] = detail_page(blend)
+    pages["detail_decaf.html"] = detail_page(decaf)
+    pages["detail_species_tags.html"] = (
+        detail_page(no_reviews)
+        .replace("<strong>100 % Arabica</strong>", "<strong>Arabica</strong>")
+        .replace(
+            "</p>",
+            " <strong>70 % arabica</strong><strong>30 % robusta</strong></p>",
+            1,
+        )
+    )
+    for file_name, html in pages.items():
+        with open(os.path.join(FIXTURES_DIR, file_name), "w", encoding="utf-8") as file:
+            file.write(html)
+    print(f"Wrote {len(pages)} fixtures to {FIXTURES_DIR}")
+
+
+def load_fixtures(prefix: str) -> list[str]:
+    pages = []
+    for file_name in sorted(os.listdir(FIXTURES_DIR)):
+        if file_name.startswith(prefix) and file_name.endswith(".html"):
+            with open(os.path.join(FIXTURES_DIR, file_name), encoding="utf-8") as file:
+                pages.append(file.read())
+    return pages
+
+
+def reference_workload(_=None) -> int:
+    """fixed pure Python work, the yardstick for how fast the machine runs"""
+    return sum(len(str(number)) for number in range(1000))
+
+
+def time_round(call: Callable, setups: list) -> float:
+    elapsed = 0.0
+    for setup in setups:
+        argument = setup()
+        started = time.perf_counter()
+        call(argument)
+        elapsed += time.perf_counter() - started
+    return elapsed / len(setups)
+
+
+def peak_memory(call: Callable, setups: list) -> int:
+    """the largest peak of traced memory a single call needed"""
+    peak = 0
+    for setup in setups:
+        argument = setup()
+        tracemalloc.start()
+        call(argument)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return peak
+
+
+def measure(cases: dict[str, tuple[Callable, list]], repeat: int) -> dict:
+    """time per call of each case's fastest round, noise only ever adds time,
+    the cases take turns round by round so that fastest round is picked from
+    the whole run and not from whatever the machine did during one stretch"""
+    fastest = dict.fromkeys(cases, float("inf"))
+    for _ in range(repeat):
+        for name, (call, setups) in cases.items():
+            fastest[name] = min(fastest[name], time_round(call, setups))
+    return {
+        name: {
+            "us_per_call": round(fastest[name] * 1_000_000, 2),
+            "peak_kib": round(peak_memory(call, setups) / 1024, 2),
+        }
+        for name, (call, setups) in cases.items()
+    }
+
+
+def run_cases(repeat: int) -> dict[str, dict]:
+    parser = PageParser(
+        listing_nodes=COFFEEIN_LISTING_NODES, detail_nodes=COFFEEIN_DETAIL_NODES
+    )
+    processor = CoffeeinProcessor(["tasting pack"])
+    listing_pages = load_fixtures("listing_")
+    listings = [parser.parse_listing(html) for html in listing_pages]
+    details = [parser.parse_detail(html) for html in load_fixtures("detail_")]
+
+    def fresh_page(soup):
+        return lambda: CoffeeinPageContext(soup)
+
+    def walked_page(soup):
+        def setup():
+            page = CoffeeinPageContext(soup)
+            page.nodes
+            return page
+
+        return setup
+
+    cases = {
+        REFERENCE: (reference_workload, [lambda: None]),
+        "process_metadata": (
+            processor.process_metadata,
+            [lambda soup=s: soup for s in listings],
+        ),
+        # what a listing page costs on the DOM path, to compare process_listing to
+        "dom_listing": (
+            lambda html: processor.process_metadata(parser.parse_listing(html)),
+            [lambda html=html: html for html in listing_pages],
+        ),
+        "process_listing": (
+            processor.process_listing,
+            [lambda html=html: html for html in listing_pages],
+        ),
+        "process_coffee": (
+            processor.process_coffee,
+            [lambda soup=s: soup for s in details],
+        ),
+        "page_context.nodes": (
+            lambda page: page.nodes,
+            [fresh_page(soup) for soup in details],
+        ),
+    }
+    walked = [walked_page(soup) for soup in details]
+    for name, handler in HANDLERS.items():
+        cases[name] = (
+            lambda page, handler=handler: handler(processor, page),
+            walked,
+        )
+    return measure(cases, repeat)
+
+
+def regressions(
+    results: dict, baseline: dict, threshold: float, min_delta_us: float
+) -> dict[str, str]:
+    """a case regresses when it exceeds the baseline by the relative threshold,
+    timings also by min_delta_us so the tiny extractors do not flap on noise,
+    baseline timings are scaled to the machine's speed first"""
+    found = {}
+    scale = speed_scale(results, baseline)
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None or name == REFERENCE:
+            continue
+        for metric, factor, min_delta in (
+            ("us_per_call", scale, min_delta_us),
+            ("peak_kib", 1.0, 0),
+        ):
+            limit = max(
+                expected[metric] * factor * (1 + threshold),
+                expected[metric] * factor + min_delta,
+            )
+            if result[metric] > limit:
+                found[f"{name} {metric}"] = (
+                    f"{result[metric]} > {expected[metric]} x{factor:.2f} "
+                    f"+{threshold:.0%}"
+                )
+    return found
+
+
+def speed_scale(results: dict, baseline: dict) -> float:
+    """how much slower the reference ran than for the baseline, baselines
+    saved without a reference are not scaled"""
+    if REFERENCE not in baseline or REFERENCE not in results:
+        return 1.0
+    return results[REFERENCE]["us_per_call"] / baseline[REFERENCE]["us_per_call"]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    arg_parser.add_argument("--repeat", type=int, default=50)
+    arg_parser.add_argument("--threshold", type=float, default=0.5)
+    arg_parser.add_argument("--min-delta-us", type=float, default=5.0)
+    # reruns a regression has to survive before --check fails
+    arg_parser.add_argument("--confirm", type=int, default=2)
+    arg_parser.add_argument("--baseline", default=BASELINE_PATH)
+    arg_parser.add_argument("--check", action="store_true")
+    arg_parser.add_argument("--save", action="store_true")
+    arg_parser.add_argument("--write-fixtures", action="store_true")
+    args = arg_parser.parse_args()
+
+    if args.write_fixtures:
+        write_fixtures()
+        return
+
+    results = run_cases(args.repeat)
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+
+    print(f"{'case':<24}{'us/call':>10}{'baseline':>10}{'peak KiB':>10}")
+    for name, result in results.items():
+        expected = baseline.get(name, {}).get("us_per_call")
+        print(
+            f"{name:<24}{result['us_per_call']:>10.1f}"
+            f"{expected if expected is not None else '-':>10}"
+            f"{result['peak_kib']:>10.1f}"
+        )
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+            file.write("\n")
+        print(f"Saved baseline to {args.baseline}")
+
+    if args.check:
+        found = regressions(results, baseline, args.threshold, args.min_delta_us)
+        for _ in range(args.confirm):
+            if not found:
+                break
+            rerun = regressions(
+                run_cases(args.repeat), baseline, args.threshold, args.min_delta_us
+            )
+            found = {case: rerun[case] for case in found if case in rerun}
+        for case, regression in found.items():
+            print(f"Regression: {case}: {regression}")
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Compares how fast the local sinks store coffees and metadata.
+
+Writes the same processed coffees to InMemoryDB, to SQLiteDB in bulk batches
+and to SQLiteDB one row per transaction, the way SupabaseDB.update_coffee
+writes rows one by one.
+
+Run from src/: python -m benchmarks.sink_benchmark [--coffees 2000] [--batch-size 100]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic_pages import detail_page, synthetic_products
+from database.memory_db import InMemoryDB
+from database.sqlite_db import SQLiteDB
+from models.metadata import Metadata
+from models.page import PageType
+from parsers.page_parser import PageParser
+from processors.coffein_processor import CoffeeinProcessor
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--coffees", type=int, default=2000)
+    arg_parser.add_argument("--batch-size", type=int, default=100)
+    args = arg_parser.parse_args()
+
+    # no blends, the processor would skip them
+    products = [
+        {**product, "arabica": 100} for product in synthetic_products(args.coffees)
+    ]
+    parser = PageParser()
+    processor = CoffeeinProcessor([])
+    coffees = [
+        processor.process_coffee(parser.parse_detail(detail_page(product, blocks=2)))
+        for product in products
+    ]
+    metadata = [
+        Metadata(
+            product["page_id"],
+            PageType.COFFEEIN.name,
+            product["name"],
+            product["price"],
+            f"detail-{product['page_id']}",
+        )
+        for product in products
+    ]
+    batches = [
+        coffees[start : start + args.batch_size]
+        for start in range(0, len(coffees), args.batch_size)
+    ]
+
+    directory = tempfile.mkdtemp()
+    sinks = {
+        "memory": lambda: InMemoryDB(),
+        "sqlite bulk": lambda: SQLiteDB(os.path.join(directory, "bulk.sqlite")),
+        "sqlite per row": lambda: SQLiteDB(os.path.join(directory, "row.sqlite")),
+    }
+    print(f"{len(coffees)} coffees, batches of {args.batch_size}")
+    print(f"{'sink':<16}{'coffees/s':>12}{'metadata/s':>12}")
+    for name, create in sinks.items():
+        database = create()
+        started = time.perf_counter()
+        database.update_metadata(metadata)
+        metadata_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        if name.endswith("per row"):
+            for coffee in coffees:
+                database.update_coffee(coffee)
+        else:
+            for batch in batches:
+                database.update_coffees(batch)
+        coffee_seconds = time.perf_counter() - started
+        print(
+            f"{name:<16}{len(coffees) / coffee_seconds:>12.0f}"
+            f"{len(metadata) / metadata_seconds:>12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
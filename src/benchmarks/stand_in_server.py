@@ -0,0 +1,207 @@
+"""Local stand-in for coffeein.sk serving synthetic listing and detail pages.
+
+Run from src/: python -m benchmarks.stand_in_server [--products 500] [--port 8000]
+"""
+
+import argparse
+import multiprocessing
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from assets.constants import COFFEIN_MAIN_COFFE_PAGE
+from benchmarks.synthetic_pages import detail_page, listing_page, synthetic_products
+
+
+class StandInCatalogue:
+    """Answers requests like the real site: listing pages past the last one
+    redirect to the first page, detail pages are keyed by page_id. Latency,
+    transient 503s and detail redirects are injected on demand. With a
+    capacity, latency grows with the load beyond it and requests beyond
+    twice the capacity answer 429, like on an overloaded shop."""
+
+    def __init__(
+        self,
+        products=500,
+        per_page=24,
+        blocks=50,
+        latency=0.0,
+        error_rate=0.0,
+        redirect_rate=0.0,
+        seed=42,
+        capacity: int = None,
+        first_page_id=1000,
+    ) -> None:
+        self.products = synthetic_products(products, seed, first_page_id)
+        self.by_page_id = {product["page_id"]: product for product in self.products}
+        self.per_page = per_page
+        self.blocks = blocks
+        self.last_page = max(1, -(-len(self.products) // per_page))
+        self.latency = latency
+        self.error_rate = error_rate
+        self.redirect_rate = redirect_rate
+        self.capacity = capacity
+        self.in_flight = 0
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.rendered: dict[str, bytes] = {}
+        self.listing_path = "/" + COFFEIN_MAIN_COFFE_PAGE
+        self.listing_regex = re.compile(re.escape(self.listing_path) + r"(\d+)/$")
+        self.detail_regex = re.compile(r"/detail/(\d+)/[^/]+(/?)$")
+
+    def roll(self, rate: float) -> bool:
+        with self.lock:
+            return self.random.random() < rate
+
+    def respond(self, path: str) -> tuple[int, dict, bytes]:
+        with self.lock:
+            self.in_flight += 1
+            load = self.in_flight
+        try:
+            if self.capacity and load > 2 * self.capacity:
+                return 429, {"Retry-After": "1"}, b"Too Many Requests"
+            if self.latency:
+                slowdown = max(1.0, load / self.capacity) if self.capacity else 1.0
+                time.sleep(self.latency * slowdown)
+            return self.serve(path)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def serve(self, path: str) -> tuple[int, dict, bytes]:
+        if self.roll(self.error_rate):
+            return 503, {}, b"Service Unavailable"
+
+        if match := self.listing_regex.match(path):
+            page_number = int(match.group(1))
+            if page_number > self.last_page or page_number < 1:
+                return 302, {"Location": self.listing_path + "1/"}, b""
+            return 200, {}, self.render(path, page_number, self.render_listing)
+
+        if match := self.detail_regex.match(path):
+            product = self.by_page_id.get(int(match.group(1)))
+            if product is None:
+                return 404, {}, b"Not Found"
+            if not match.group(2) and self.roll(self.redirect_rate):
+                return 301, {"Location": path + "/"}, b""
+            return 200, {}, self.render(path.rstrip("/"), product, self.render_detail)
+
+        return 404, {}, b"Not Found"
+
+    def render(self, key: str, argument, renderer) -> bytes:
+        body = self.rendered.get(key)
+        if body is None:
+            body = renderer(argument).encode("utf-8")
+            self.rendered[key] = body
+        return body
+
+    def render_listing(self, page_number: int) -> str:
+        start = (page_number - 1) * self.per_page
+        return listing_page(
+            self.products[start : start + self.per_page],
+            page_number,
+            self.last_page,
+            self.listing_path,
+            blocks=self.blocks,
+        )
+
+    def render_detail(self, product: dict) -> str:
+        return detail_page(product, blocks=self.blocks)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    catalogue: StandInCatalogue = None
+
+    def do_GET(self) -> None:
+        status, headers, body = self.catalogue.respond(self.path)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+class StandInServer:
+    def __init__(self, catalogue: StandInCatalogue, host="127.0.0.1", port=0):
+        handler = type("Handler", (StandInHandler,), {"catalogue": catalogue})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        # clients that time out or give up reset their connections, that is
+        # part of the benchmark and not worth a traceback
+        self.server.handle_error = lambda request, client_address: None
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> "StandInServer":
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> "StandInServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+def serve(options: dict, urls: multiprocessing.Queue) -> None:
+    server = StandInServer(StandInCatalogue(**options))
+    urls.put(server.url)
+    server.server.serve_forever()
+
+
+def start_in_subprocess(**options) -> tuple[multiprocessing.Process, str]:
+    """keeps the server's CPU and memory out of the measured process"""
+    urls = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, args=(options, urls), daemon=True)
+    process.start()
+    return process, urls.get(timeout=30)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--products", type=int, default=500)
+    arg_parser.add_argument("--per-page", type=int, default=24)
+    arg_parser.add_argument("--blocks", type=int, default=50)
+    arg_parser.add_argument("--latency", type=float, default=0.0)
+    arg_parser.add_argument("--error-rate", type=float, default=0.0)
+    arg_parser.add_argument("--redirect-rate", type=float, default=0.0)
+    arg_parser.add_argument("--capacity", type=int, default=None)
+    arg_parser.add_argument("--port", type=int, default=8000)
+    args = arg_parser.parse_args()
+
+    catalogue = StandInCatalogue(
+        args.products,
+        args.per_page,
+        args.blocks,
+        args.latency,
+        args.error_rate,
+        args.redirect_rate,
+        capacity=args.capacity,
+    )
+    server = StandInServer(catalogue, port=args.port)
+    print(f"Serving {args.products} products on {server.url}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Startup time of the entry points, measured in fresh interpreters.
+
+Reports the median wall time of every scenario over a few runs and, from one
+python -X importtime run, the time spent importing and the heaviest top level
+imports, so a module that starts importing a heavy client at load shows up.
+
+Run from src/: python -m benchmarks.startup_benchmark [--runs 5] [--top 10]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+SCENARIOS = {
+    "interpreter": ["-c", "pass"],
+    "import app": ["-c", "import app"],
+    "app --help": ["app.py", "--help"],
+    "dry run sink": [
+        "-c",
+        "import app; from factory.sink_factory import SinkFactory; "
+        "SinkFactory.create_sink('memory')",
+    ],
+    "supabase sink": [
+        "-c",
+        "import app; from factory.registry import SINKS; SINKS.get('supabase')",
+    ],
+}
+
+
+def wall_time(arguments: list[str]) -> float:
+    started = time.perf_counter()
+    subprocess.run([sys.executable, *arguments], check=True, capture_output=True)
+    return time.perf_counter() - started
+
+
+def import_times(arguments: list[str]) -> list[tuple[int, int, str]]:
+    """(depth, cumulative microseconds, module) of every import"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", *arguments],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    imports = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((depth, int(cumulative), name.strip()))
+    return imports
+
+
+def app_imports(arguments: list[str]) -> list[tuple[int, str]]:
+    """imports made directly by app, heaviest first, importtime lists the
+    children of a module right before the module itself"""
+    children = []
+    for depth, cumulative, module in import_times(arguments):
+        if depth == 1:
+            children.append((cumulative, module))
+        elif not depth:
+            if module == "app":
+                return sorted(children, reverse=True)
+            children = []
+    return []
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--runs", type=int, default=5)
+    arg_parser.add_argument(
+        "--top", type=int, default=10, help="heaviest imports of app to show"
+    )
+    args = arg_parser.parse_args()
+
+    print(f"{'scenario':<16}{'wall ms':>10}{'imports ms':>12}")
+    for name, arguments in SCENARIOS.items():
+        wall = statistics.median(wall_time(arguments) for _ in range(args.runs))
+        imported = sum(
+            cumulative for depth, cumulative, _ in import_times(arguments) if not depth
+        )
+        print(f"{name:<16}{wall * 1000:>10.1f}{imported / 1000:>12.1f}")
+
+    print("\nheaviest imports of app")
+    for cumulative, module in app_imports(SCENARIOS["import app"])[: args.top]:
+        print(f"{module:<40}{cumulative / 1000:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
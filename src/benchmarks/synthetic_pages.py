@@ -0,0 +1,140 @@
+import json
+import random
+
+ORIGINS = ["Etiopia", "Kolumbia", "Brazilia", "Kena", "Guatemala", "Peru", "Rwanda"]
+VARIETIES = ["Bourbon", "Typica", "Caturra", "Heirloom", "Gesha", "SL28"]
+PROCESSING = ["praná", "naturálna", "honey", "anaeróbna"]
+ROAST_SHADES = ["svetlé", "stredné", "tmavé"]
+FLAVORS = ["čokoláda", "orechy", "citrusy", "jahoda", "karamel", "kvety", "med"]
+SIZES = [100, 200, 250, 500, 1000]
+
+
+def synthetic_products(count: int, seed=42, first_page_id=1000) -> list[dict]:
+    rng = random.Random(seed)
+    products = []
+    for page_id in range(first_page_id, first_page_id + count):
+        origin = rng.choice(ORIGINS)
+        size = rng.choice(SIZES)
+        blend = rng.random() < 0.1
+        products.append(
+            {
+                "page_id": page_id,
+                "name": f"{origin} {rng.choice(VARIETIES)} {page_id} ({size} g)",
+                "price": round(rng.uniform(6, 60), 2),
+                "origin": origin,
+                "variety": rng.choice(VARIETIES),
+                "processing": rng.choice(PROCESSING),
+                "roast_shade": rng.choice(ROAST_SHADES),
+                "arabica": 80 if blend else 100,
+                "decaf": rng.random() < 0.05,
+                "flavors": rng.sample(FLAVORS, 3),
+                "ratings": [rng.randint(1, 5) for _ in range(4)],
+                "reviews": [
+                    f"Recenzia {index} pre {page_id}: výborná káva."
+                    for index in range(rng.randint(0, 6))
+                ],
+                "buy_count": rng.randint(0, 500),
+            }
+        )
+    return products
+
+
+def filler(blocks: int) -> str:
+    """navigation, related products and footer markup the processor never reads"""
+    menu = "".join(
+        f'<li class="menu_item"><a href="/kategoria/{index}/menu-{index}/">'
+        f"Kategória {index}</a></li>"
+        for index in range(blocks)
+    )
+    cards = "".join(
+        f'<div class="product_box"><a href="/detail/{index}/related-{index}/">'
+        f'<img src="/img/{index}.jpg" alt="Related {index}"></a>'
+        f'<div class="product_name">Súvisiaci produkt {index}</div>'
+        f'<span class="price">{index % 40 + 5},90 €</span></div>'
+        for index in range(blocks)
+    )
+    return (
+        f'<div id="header"><ul class="menu">{menu}</ul></div>'
+        f'<div class="related_products">{cards}</div>'
+        f'<div id="footer"><p>{"Obchodné podmienky. " * blocks}</p></div>'
+    )
+
+
+def listing_page(
+    products: list[dict], page_number: int, last_page: int, base_path: str, blocks=50
+) -> str:
+    items = ",".join(
+        "{"
+        f"'item_id': '{product['page_id']}', "
+        f"'item_name': {json.dumps(product['name'])}, "
+        f"'price': '{product['price']}', "
+        "'item_brand': 'Coffeein',"
+        "}"
+        for product in products
+    )
+    pagination = "".join(
+        f'<a href="{base_path}{number}/">{number}</a>'
+        for number in range(
+            max(1, page_number - 2), min(last_page, page_number + 2) + 1
+        )
+    )
+    pagination += f'<a href="{base_path}{last_page}/">»</a>'
+    return (
+        "<html><head><title>Zrnková káva</title>"
+        "<script>window.dataLayer = window.dataLayer || [];</script>"
+        "<script>dataLayer.push({'event': 'view_item_list', "
+        f'"ecommerce": {{"items": [{items}] }} }});</script>'
+        f"</head><body>{filler(blocks)}"
+        f'<div class="pagination">{pagination}</div></body></html>'
+    )
+
+
+def detail_page(product: dict, blocks=50) -> str:
+    species = (
+        "100 % Arabica"
+        if product["arabica"] == 100
+        else f"{product['arabica']} % arabica, {100 - product['arabica']} % robusta"
+    )
+    decaf = " Táto káva je bezkofeínová." if product["decaf"] else ""
+    params = "".join(
+        f'<div class="speci_param"><div class="speci_param_name">{name}</div>'
+        + '<span class="point_full"></span>' * rating
+        + '<span class="point_empty"></span>' * (5 - rating)
+        + "</div>"
+        for name, rating in zip(
+            ["Telo", "Horkosť", "Acidita", "Sladkosť"], product["ratings"]
+        )
+    )
+    flavors = "".join(f"<span>{flavor}</span>" for flavor in product["flavors"])
+    reviews = "".join(
+        f'<li itemprop="review"><div class="rank_left">Zákazník</div>'
+        f'<div class="rank_right">{review}</div></li>'
+        for review in product["reviews"]
+    )
+    return (
+        f"<html><head><title>{product['name']}</title>"
+        "<script>dataLayer.push({'event': 'view_item', 'ecommerce': {'items': "
+        f"[{{'item_id': '{product['page_id']}', 'price': '{product['price']}'}}]}}}});"
+        "</script></head><body>"
+        f"{filler(blocks)}"
+        f'<h1 itemprop="name">{product["name"]}</h1>'
+        f'<span class="product_price" content="{product["price"]}">'
+        f"{product['price']} €</span>"
+        f'<p itemprop="description"><strong>{species}</strong> z krajiny '
+        f"{product['origin']}.{decaf}\n"
+        f"Odtieň praženia: {product['roast_shade']}\n"
+        f"Veľkosť balenia: {product['name'].split('(')[-1].rstrip(')')}</p>"
+        f"{params}"
+        f'<div class="recommended_preparation">{flavors}</div>'
+        f'<div class="long_desc_desc">ODRODA: {product["variety"]}\n'
+        f"REGIÓN: {product['origin']}\nFARMA: Finca {product['page_id']}\n"
+        f"NADMORSKÁ VÝŠKA: 1800 m n. m.\n"
+        f"SPRACOVANIE: {product['processing']}\n</div>"
+        f'<div id="ranks_box"><ul>{reviews}</ul>'
+        '<div itemprop="aggregateRating">'
+        f'<meta itemprop="ratingValue" content="{4 + product["page_id"] % 10 / 10}">'
+        "</div></div>"
+        f'<div class="popis_date_data">Upražené a vypité: {product["buy_count"]}x'
+        "</div>"
+        f"{filler(blocks // 2)}</body></html>"
+    )
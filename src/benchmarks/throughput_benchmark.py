@@ -0,0 +1,185 @@
+"""Crawls the local stand-in server end to end and reports throughput.
+
+Runs CoffeeinCrawler, the parsing pipeline and an in-memory database against
+benchmarks.stand_in_server, so concurrency and parser changes can be measured
+offline. With --sites N every site gets its own stand-in server, budget and
+page_ids and all of them are crawled together by the CrawlScheduler.
+
+Run from src/: python -m benchmarks.throughput_benchmark [--products 500]
+    [--latency 0.05] [--sites 3] [--requests-per-second 50]
+"""
+
+import argparse
+import resource
+import statistics
+import time
+
+from assets.constants import COFFEIN_MAIN_COFFE_PAGE
+from benchmarks.stand_in_server import start_in_subprocess
+from crawlers.coffeein_crawler import CoffeeinCrawler
+from database.buffered_writer import BufferedCoffeeWriter
+from database.memory_db import InMemoryDB
+from models.page import PageType
+from models.site import Site, SiteBudget
+from pipeline.page_pipeline import PagePipeline
+from scheduler.crawl_scheduler import CrawlScheduler
+
+
+class TimedCoffeeinCrawler(CoffeeinCrawler):
+    """remembers the fetch latency of every page it hands to the pipeline"""
+
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.latencies: list[float] = []
+
+    def fetch_metadata_pages(self, metadata_url_base):
+        for result in super().fetch_metadata_pages(metadata_url_base):
+            self.latencies.append(result.elapsed)
+            yield result
+
+    def fetch_coffee_pages(self, metadata_list, stored_page_ids=()):
+        for result in super().fetch_coffee_pages(metadata_list, stored_page_ids):
+            self.latencies.append(result.elapsed)
+            yield result
+
+
+def percentile(values: list[float], percent: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+def crawl_site(
+    site: Site, pipeline: PagePipeline, database: InMemoryDB
+) -> tuple[int, float, int, float]:
+    """returns the listing and detail pages and the seconds each stage took"""
+    crawler: TimedCoffeeinCrawler = site.crawler
+    started = time.perf_counter()
+    metadata_list = list(set(pipeline.metadata(site)))
+    database.update_metadata(metadata_list)
+    listing_seconds = time.perf_counter() - started
+    listing_pages = len(crawler.latencies)
+
+    started = time.perf_counter()
+    with BufferedCoffeeWriter(database) as writer:
+        for coffee in pipeline.coffees(site, metadata_list):
+            writer.write(coffee)
+    detail_seconds = time.perf_counter() - started
+    detail_pages = len(crawler.latencies) - listing_pages
+    return listing_pages, listing_seconds, detail_pages, detail_seconds
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument("--products", type=int, default=500)
+    arg_parser.add_argument("--per-page", type=int, default=24)
+    arg_parser.add_argument("--blocks", type=int, default=50)
+    arg_parser.add_argument("--latency", type=float, default=0.02)
+    arg_parser.add_argument("--error-rate", type=float, default=0.0)
+    arg_parser.add_argument("--redirect-rate", type=float, default=0.0)
+    arg_parser.add_argument("--concurrency", type=int, default=8)
+    arg_parser.add_argument("--per-host-limit", type=int, default=8)
+    arg_parser.add_argument("--requests-per-second", type=float, default=None)
+    arg_parser.add_argument(
+        "--capacity",
+        type=int,
+        default=None,
+        help="requests the stand-in serves at once before answering 429",
+    )
+    arg_parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="adapt in-flight requests between --per-host-limit and --concurrency",
+    )
+    arg_parser.add_argument("--workers", type=int, default=0)
+    arg_parser.add_argument(
+        "--sites", type=int, default=1, help="stand-in shops crawled together"
+    )
+    args = arg_parser.parse_args()
+
+    servers = []
+    sites = []
+    for index in range(args.sites):
+        server, url = start_in_subprocess(
+            products=args.products,
+            per_page=args.per_page,
+            blocks=args.blocks,
+            latency=args.latency,
+            error_rate=args.error_rate,
+            redirect_rate=args.redirect_rate,
+            seed=index,
+            capacity=args.capacity,
+            # the shops share an origin, their products must not share keys
+            first_page_id=1000 + index * args.products,
+        )
+        servers.append(server)
+        budget = SiteBudget(
+            concurrency=args.concurrency,
+            per_host_limit=args.per_host_limit,
+            requests_per_second=args.requests_per_second,
+            adaptive=args.adaptive,
+        )
+        crawler = TimedCoffeeinCrawler(base_url=url, **budget.crawler_options())
+        sites.append(
+            Site(
+                f"shop-{index + 1}",
+                PageType.COFFEEIN,
+                crawler,
+                COFFEIN_MAIN_COFFE_PAGE,
+                budget,
+            )
+        )
+    database = InMemoryDB()
+    pipeline = PagePipeline(sites, workers=args.workers)
+    scheduler = CrawlScheduler(sites, pipeline.metrics)
+    try:
+        started = time.perf_counter()
+        results = scheduler.run(lambda site: crawl_site(site, pipeline, database))
+        seconds = time.perf_counter() - started
+    finally:
+        pipeline.close()
+        worker_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+        for server in servers:
+            server.terminate()
+
+    print(f"{len(database.metadata)} products, {len(database.coffees)} coffees stored")
+    for site in sites:
+        if site.name not in results:
+            continue
+        listing_pages, listing_seconds, detail_pages, detail_seconds = results[
+            site.name
+        ]
+        print(
+            f"{site.name:<8} listing {listing_pages:6d} pages "
+            f"{listing_pages / listing_seconds:9.1f} pages/s, detail {detail_pages:6d} "
+            f"pages {detail_pages / detail_seconds:9.1f} pages/s"
+        )
+    crawlers = [site.crawler for site in sites]
+    latencies = [latency for crawler in crawlers for latency in crawler.latencies]
+    failures = [failure for crawler in crawlers for failure in crawler.failures]
+    pages = len(latencies)
+    latencies += [failure.elapsed for failure in failures]
+    print(
+        f"total    {pages:6d} pages in {seconds:.2f} s {pages / seconds:9.1f} pages/s"
+    )
+    print(
+        f"latency  p50 {percentile(latencies, 50) * 1000:.1f} ms, "
+        f"p99 {percentile(latencies, 99) * 1000:.1f} ms, "
+        f"{len(failures)} failed"
+    )
+    for site in sites:
+        if site.crawler.controller:
+            controller = site.crawler.controller
+            print(
+                f"{site.name:<8} adapted to {controller.limit:.1f} in flight, "
+                f"backed off {sum(controller.back_offs.values())} times "
+                f"{dict(controller.back_offs)}"
+            )
+    print(
+        f"peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB"
+        + (f", parser worker {worker_rss / 1024:.0f} MiB" if args.workers else "")
+    )
+
+
+if __name__ == "__main__":
+    main()
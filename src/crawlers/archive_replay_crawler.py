@@ -0,0 +1,60 @@
+from typing import Collection, Generator
+
+from bs4 import BeautifulSoup
+
+from archive.page_archive import PageArchive
+from assets.constants import LISTING_PAGE
+from crawlers.crawler_interface import Crawler
+from models.fetch_result import FetchResult
+from models.metadata import Metadata
+from parsers.page_parser import PageParser
+
+
+class ArchiveReplayCrawler(Crawler):
+    """Serves pages from archived runs instead of the network. With several
+    runs a page from a later run replaces the same page of an earlier one."""
+
+    def __init__(self, archives: list[PageArchive], parser: PageParser = None) -> None:
+        super().__init__()
+        self.archives = archives
+        self.parser = parser or PageParser()
+        self.missing: list[int] = []
+
+    def find_metadata(
+        self, metadata_url_base: str
+    ) -> Generator[BeautifulSoup, None, None]:
+        for result in self.fetch_metadata_pages(metadata_url_base):
+            yield self.parser.parse_listing(result.text)
+
+    def find_coffee(
+        self, metadata_list: list[Metadata]
+    ) -> Generator[BeautifulSoup, None, None]:
+        for result in self.fetch_coffee_pages(metadata_list):
+            yield self.parser.parse_detail(result.text)
+
+    def fetch_metadata_pages(
+        self, metadata_url_base: str = None
+    ) -> Generator[FetchResult, None, None]:
+        """every archived listing page, the url base is not needed offline"""
+        listings = {}
+        for archive in self.archives:
+            for result in archive.pages(LISTING_PAGE):
+                listings[result.url] = result
+        yield from listings.values()
+
+    def fetch_coffee_pages(
+        self, metadata_list: list[Metadata], stored_page_ids: Collection[int] = ()
+    ) -> Generator[FetchResult, None, None]:
+        for metadata in metadata_list:
+            result = self.latest_page(metadata.page_id)
+            if result is None:
+                self.missing.append(metadata.page_id)
+                continue
+            yield result
+
+    def latest_page(self, page_id: int) -> FetchResult | None:
+        for archive in reversed(self.archives):
+            result = archive.get_page(page_id)
+            if result is not None:
+                return result
+        return None
@@ -1,76 +1,293 @@
-from typing import Generator
-import requests
+import re
+from typing import Collection, Generator
 
+from models.fetch_result import FetchResult
 from models.metadata import Metadata
 from collections import defaultdict
 from urllib.parse import urljoin
 from bs4 import BeautifulSoup
 
+from assets.constants import (
+    COFFEEIN_BASE_URL,
+    COFFEEIN_DETAIL_NODES,
+    COFFEEIN_LISTING_NODES,
+    DETAIL_PAGE,
+    LISTING_PAGE,
+    LXML_PARSER,
+)
+from archive.page_archive import PageArchive
 from crawlers.crawler_interface import Crawler
+from parsers.page_parser import PageParser
+from transport.aimd import AimdController
+from transport.async_transport import AsyncTransport
+from transport.http_cache import HttpCache
+from transport.http_transport import HttpTransport
+from transport.rate_limiter import RateLimiter
+from transport.retry_policy import RetryPolicy
 
 
 class CoffeeinCrawler(Crawler):
-    def __init__(self, retries=3, timeout=15, max_pages=1000) -> None:
-        self.base_url = "https://www.coffeein.sk/"
+    def __init__(
+        self,
+        retries=3,
+        timeout=15,
+        max_pages=1000,
+        concurrency=8,
+        per_host_limit=4,
+        max_failures=3,
+        cache_path: str = None,
+        cache: HttpCache = None,
+        cache_max_bytes=256 * 1024 * 1024,
+        cache_ttl: float = None,
+        skip_unchanged=True,
+        parser_backend=LXML_PARSER,
+        scoped_parsing=True,
+        raw_listings=True,
+        archive: PageArchive = None,
+        base_url=COFFEEIN_BASE_URL,
+        requests_per_second: float = None,
+        burst=1,
+        adaptive=False,
+    ) -> None:
+        super().__init__()
+        self.base_url = base_url
         self.product_metadata = defaultdict(dict)
         self.retries = retries
         self.timeout = timeout
         self.max_pages = max_pages
+        self.concurrency = concurrency
+        self.max_failures = max_failures
+        self.skip_unchanged = skip_unchanged
+        self.archive = archive
+        self.parser = PageParser(
+            parser_backend,
+            listing_nodes=COFFEEIN_LISTING_NODES if scoped_parsing else None,
+            detail_nodes=COFFEEIN_DETAIL_NODES if scoped_parsing else None,
+            raw_listings=raw_listings,
+        )
+        self.retry_policy = RetryPolicy(retries=retries)
+        # sites crawled together share one cache instead of opening it twice
+        self.cache = cache or (
+            HttpCache(cache_path, max_size_bytes=cache_max_bytes, ttl=cache_ttl)
+            if cache_path
+            else None
+        )
+        self.rate_limiter = (
+            RateLimiter(requests_per_second, burst) if requests_per_second else None
+        )
+        self.transport = HttpTransport(
+            self.retry_policy,
+            timeout=timeout,
+            pool_size=per_host_limit,
+            cache=self.cache,
+            rate_limiter=self.rate_limiter,
+        )
+        # adaptive crawls start at per_host_limit and may grow up to concurrency
+        self.controller = (
+            AimdController(initial=per_host_limit, maximum=concurrency)
+            if adaptive
+            else None
+        )
+        self.async_transport = AsyncTransport(
+            self.retry_policy,
+            concurrency=concurrency,
+            per_host_limit=per_host_limit,
+            timeout=timeout,
+            cache=self.cache,
+            rate_limiter=self.rate_limiter,
+            controller=self.controller,
+        )
+
+    def coffee_url(self, metadata: Metadata) -> str:
+        return urljoin(
+            self.base_url, f"detail/{metadata.page_id}/{metadata.detail_link}"
+        )
 
     def find_coffee(
         self, metadata_list: list[Metadata]
     ) -> Generator[BeautifulSoup, None, None]:
+        for result in self.fetch_coffee_pages(metadata_list):
+            yield self.parser.parse_detail(result.text)
+
+    def fetch_coffee_pages(
+        self, metadata_list: list[Metadata], stored_page_ids: Collection[int] = ()
+    ) -> Generator[FetchResult, None, None]:
+        if self.concurrency > 1:
+            yield from self.fetch_coffee_pages_concurrent(
+                metadata_list, stored_page_ids
+            )
+        else:
+            yield from self.fetch_coffee_pages_sequential(
+                metadata_list, stored_page_ids
+            )
+
+    def fetch_coffee_pages_concurrent(
+        self, metadata_list: list[Metadata], stored_page_ids: Collection[int] = ()
+    ) -> Generator[FetchResult, None, None]:
+        page_ids = {
+            self.coffee_url(metadata): metadata.page_id for metadata in metadata_list
+        }
+        for result in self.async_transport.fetch_all(list(page_ids)):
+            page_id = page_ids[result.url]
+            if self.is_coffee_page_usable(result, page_id, page_id in stored_page_ids):
+                yield result
+
+    def fetch_coffee_pages_sequential(
+        self, metadata_list: list[Metadata], stored_page_ids: Collection[int] = ()
+    ) -> Generator[FetchResult, None, None]:
         for metadata in metadata_list:
-            relative_path = f"detail/{metadata.page_id}/{metadata.detail_link}"
-            base_coffe_url = urljoin(self.base_url, relative_path)
-            try:
-                response = requests.get(base_coffe_url, timeout=self.timeout)
-                response.raise_for_status()
-                yield BeautifulSoup(response.text, features="html.parser")
-            except requests.exceptions.HTTPError as e:
-                print(f"HTTP Error: {e}")
-            except requests.exceptions.ConnectionError:
-                print(
-                    "A connection error occurred. Please check your internet connection."
-                )
-            except requests.exceptions.Timeout:
-                print("The request timed out.")
-            except requests.exceptions.RequestException as e:
-                print(f"An error occurred: {e}")
-            except Exception as e:
-                print(f"An unexpected error occurred: {e}")
+            result = self.transport.get(self.coffee_url(metadata))
+            stored = metadata.page_id in stored_page_ids
+            if self.is_coffee_page_usable(result, metadata.page_id, stored):
+                yield result
+
+    def is_coffee_page_usable(
+        self, result: FetchResult, page_id: int = None, stored=False
+    ) -> bool:
+        """unchanged detail pages of products the sink stores are skipped so
+        nothing downstream reprocesses them, other unchanged pages are processed
+        from the cached body, all are archived so a run's archive holds every
+        page it saw"""
+        if not result.ok:
+            self.failures.append(result)
+            return False
+        self.archive_page(DETAIL_PAGE, result, page_id)
+        if result.unchanged and self.skip_unchanged and stored:
+            self.unchanged.append(result.url)
+            return False
+        return True
+
+    def archive_page(self, kind: str, result: FetchResult, page_id: int = None) -> None:
+        if self.archive is not None:
+            self.archive.record(kind, result, page_id)
 
     def is_rerouted(self, requested_url: str, response_url: str) -> bool:
         return requested_url != response_url
 
+    def listing_url(self, base_metadata_url: str, page_number: int) -> str:
+        return urljoin(base_metadata_url, f"{page_number}/")
+
     def find_metadata(
         self, metadata_url_base: str
     ) -> Generator[BeautifulSoup, None, None]:
+        for result in self.fetch_metadata_pages(metadata_url_base):
+            yield self.parser.parse_listing(result.text)
+
+    def fetch_metadata_pages(
+        self, metadata_url_base: str
+    ) -> Generator[FetchResult, None, None]:
         base_metadata_url = urljoin(self.base_url, metadata_url_base)
-        page_iterator = 1
-
-        for page_iterator in range(1, self.max_pages):
-            url = urljoin(base_metadata_url, f"{page_iterator}/")
-            page_iterator = page_iterator + 1
-
-            try:
-                response = requests.get(url, timeout=self.timeout)
-                response.raise_for_status()
-                if self.is_rerouted(url, response.url):
-                    break
-                yield BeautifulSoup(response.text, features="html.parser")
-            except requests.exceptions.HTTPError as e:
-                print(f"HTTP Error: {e}")
-            except requests.exceptions.ConnectionError:
-                print(
-                    "A connection error occurred. Please check your internet connection."
-                )
-            except requests.exceptions.Timeout:
-                print("The request timed out.")
-            except requests.exceptions.RequestException as e:
-                print(f"An error occurred: {e}")
-            except Exception as e:
-                print(f"An unexpected error occurred: {e}")
+        self.listing_incomplete = False
+        if self.concurrency > 1:
+            yield from self.fetch_metadata_pages_concurrent(base_metadata_url)
+        else:
+            yield from self.fetch_metadata_pages_sequential(base_metadata_url, 1)
+
+    def fetch_metadata_pages_sequential(
+        self, base_metadata_url: str, first_page: int
+    ) -> Generator[FetchResult, None, None]:
+        consecutive_failures = 0
+        for page_iterator in range(first_page, self.max_pages):
+            url = self.listing_url(base_metadata_url, page_iterator)
+            result = self.transport.get(url)
+            if not result.ok:
+                self.failures.append(result)
+                self.listing_incomplete = True
+                consecutive_failures += 1
+                if consecutive_failures >= self.max_failures:
+                    return
+                continue
+            consecutive_failures = 0
+            if self.is_rerouted(url, result.final_url):
+                return
+            self.archive_page(LISTING_PAGE, result)
+            yield result
+        # max_pages ran out before the listing did
+        self.listing_incomplete = True
+
+    def fetch_metadata_pages_concurrent(
+        self, base_metadata_url: str
+    ) -> Generator[FetchResult, None, None]:
+        first_url = self.listing_url(base_metadata_url, 1)
+        first_result = self.transport.get(first_url)
+        if not first_result.ok:
+            self.failures.append(first_result)
+            self.listing_incomplete = True
+            return
+        if self.is_rerouted(first_url, first_result.final_url):
+            return
+        self.archive_page(LISTING_PAGE, first_result)
+        yield first_result
+
+        last_page = self.find_last_page(first_result.text, base_metadata_url)
+        if last_page is None:
+            last_page = self.probe_last_page(base_metadata_url)
+        last_page = min(last_page, self.max_pages - 1)
+
+        urls = [
+            self.listing_url(base_metadata_url, page_number)
+            for page_number in range(2, last_page + 1)
+        ]
+        consecutive_failures = 0
+        reached_end = False
+        for result in self.async_transport.fetch_all(urls):
+            if not result.ok:
+                self.failures.append(result)
+                self.listing_incomplete = True
+                consecutive_failures += 1
+                if consecutive_failures >= self.max_failures:
+                    return
+                continue
+            consecutive_failures = 0
+            if self.is_rerouted(result.url, result.final_url):
+                reached_end = True
+                continue
+            self.archive_page(LISTING_PAGE, result)
+            yield result
+
+        # pagination may only show a window of pages, walk on until the redirect
+        if not reached_end:
+            yield from self.fetch_metadata_pages_sequential(
+                base_metadata_url, last_page + 1
+            )
+
+    def find_last_page(self, html: str, base_metadata_url: str) -> int | None:
+        """reads the pagination links straight from the html, so the fetching
+        thread never builds a DOM"""
+        page_regex = re.compile(re.escape(base_metadata_url) + r"(\d+)/?$")
+        page_numbers = []
+        for href in re.findall(r"""href=["']([^"']+)["']""", html):
+            match = page_regex.match(urljoin(base_metadata_url, href))
+            if match:
+                page_numbers.append(int(match.group(1)))
+        return max(page_numbers) if page_numbers else None
+
+    def probe_last_page(self, base_metadata_url: str) -> int:
+        """exponential probing followed by a binary search for the last page"""
+        last_existing = 1
+        upper = 2
+        while upper < self.max_pages and self.page_exists(base_metadata_url, upper):
+            last_existing = upper
+            upper *= 2
+        upper = min(upper, self.max_pages)
+
+        while upper - last_existing > 1:
+            middle = (last_existing + upper) // 2
+            if self.page_exists(base_metadata_url, middle):
+                last_existing = middle
+            else:
+                upper = middle
+        return last_existing
+
+    def page_exists(self, base_metadata_url: str, page_number: int) -> bool:
+        url = self.listing_url(base_metadata_url, page_number)
+        result = self.transport.get(url)
+        if not result.ok:
+            # the last page found may be short of the real one
+            self.failures.append(result)
+            self.listing_incomplete = True
+            return False
+        return not self.is_rerouted(url, result.final_url)
 
     def generate_specific_page_url(self, link, item_id):
         return urljoin(self.base_url, f"detail/{link}/{item_id}")
@@ -85,13 +302,13 @@ class CoffeeinCrawler(Crawler):
 
         for item_id, item_data in metadata.items():
             detail_url = self.generate_specific_page_url(item_id, item_data.get("link"))
-            response = requests.get(detail_url, timeout=self.timeout)
+            result = self.transport.get(detail_url)
 
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, features="html.parser")
+            if result.ok:
+                soup = self.parser.parse_detail(result.text)
                 coffee_data = self.extract_coffee_details(soup, detail_url, item_id)
                 coffee_details[item_id] = coffee_data
             else:
-                print(f"Failed to retrieve page {detail_url}: {response.status_code}")
+                self.failures.append(result)
 
         return coffee_details
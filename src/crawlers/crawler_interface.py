@@ -1,10 +1,23 @@
 from abc import ABC, abstractmethod
-from typing import Generator
+from typing import Collection, Generator
 from bs4 import BeautifulSoup
+from models.fetch_result import FetchResult
 from models.metadata import Metadata
+from parsers.page_parser import PageParser
 
 
 class Crawler(ABC):
+    parser: PageParser
+    # AimdController of crawlers that adapt their concurrency to the site
+    controller = None
+
+    def __init__(self) -> None:
+        self.failures: list[FetchResult] = []
+        # urls only, the cached bodies of a whole run's unchanged pages add up
+        self.unchanged: list[str] = []
+        # set when listing pages failed, the products on them would look delisted
+        self.listing_incomplete = False
+
     @abstractmethod
     def find_metadata(
         self, metadata_url_base: str
@@ -18,3 +31,19 @@ class Crawler(ABC):
     ) -> Generator[BeautifulSoup, None, None]:
         """finds specific coffe and all information about it"""
         pass
+
+    @abstractmethod
+    def fetch_metadata_pages(
+        self, metadata_url_base: str
+    ) -> Generator[FetchResult, None, None]:
+        """fetches raw listing pages without parsing them"""
+        pass
+
+    @abstractmethod
+    def fetch_coffee_pages(
+        self, metadata: list[Metadata], stored_page_ids: Collection[int] = ()
+    ) -> Generator[FetchResult, None, None]:
+        """fetches raw detail pages without parsing them, pages that did not
+        change may only be skipped for the stored_page_ids, the products the
+        sink already holds as listed"""
+        pass
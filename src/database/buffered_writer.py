@@ -0,0 +1,201 @@
+import queue
+import threading
+import time
+from collections import defaultdict
+from typing import List
+
+from database.db_interface import Database
+from database.fingerprint_store import FingerprintStore
+from database.rows import coffee_fingerprint, coffee_key
+from metrics.run_metrics import RunMetrics
+from models.coffee import Coffee
+from models.write_report import WriteReport
+from scheduler.crawl_frontier import CrawlFrontier
+
+_CLOSE = object()
+
+
+class BufferedCoffeeWriter:
+    """Write-behind sink that persists coffees in batches from a background
+    thread, so fetching and writing overlap.
+
+    With a FingerprintStore, coffees whose row did not change since they were
+    last written are counted as unchanged and not sent to the database. With a
+    CrawlFrontier, the detail page of every stored coffee is marked done."""
+
+    def __init__(
+        self,
+        database: Database,
+        batch_size=100,
+        flush_interval=2.0,
+        max_queue=1000,
+        metrics: RunMetrics = None,
+        fingerprints: FingerprintStore = None,
+        frontier: CrawlFrontier = None,
+    ) -> None:
+        self.database = database
+        self.fingerprints = fingerprints
+        self.frontier = frontier
+        self.metrics = metrics or RunMetrics()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.report = WriteReport()
+        # raised by the next sync or close, the thread keeps writing
+        self.errors: list[Exception] = []
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def write(self, coffee: Coffee) -> None:
+        """Blocks while the queue is full, which slows the crawl down to the DB"""
+        if self.closed:
+            raise RuntimeError("Writer is already closed")
+        self.queue.put(coffee)
+
+    def sync(self) -> None:
+        """blocks until every coffee written so far is stored, raises when
+        writing failed in the meantime"""
+        stored = threading.Event()
+        self.queue.put(stored)
+        while not stored.wait(timeout=1.0):
+            if not self.thread.is_alive():
+                raise RuntimeError("Writer thread stopped")
+        self.raise_errors()
+
+    def close(self) -> WriteReport:
+        if not self.closed:
+            self.closed = True
+            self.queue.put(_CLOSE)
+            self.thread.join()
+            self.raise_errors()
+        return self.report
+
+    def raise_errors(self) -> None:
+        if self.errors:
+            errors, self.errors = self.errors, []
+            raise RuntimeError(
+                f"Writing coffees failed {len(errors)} times: {errors[0]!r}"
+            ) from errors[0]
+
+    def __enter__(self) -> "BufferedCoffeeWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def run(self) -> None:
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+            if item is _CLOSE:
+                self.flush(batch)
+                return
+            if isinstance(item, threading.Event):
+                self.flush(batch)
+                batch = []
+                item.set()
+                continue
+            if item is not None:
+                batch.append(item)
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self.flush(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def flush(self, batch: List[Coffee]) -> None:
+        if not batch:
+            return
+        outcomes = (self.report.succeeded, self.report.failed, self.report.unchanged)
+        reported_before = [len(keys) for keys in outcomes]
+        try:
+            self.write_batch(batch)
+        except Exception as e:
+            print(f"Error flushing {len(batch)} coffees: {e!r}")
+            self.errors.append(e)
+            # what the batch did not report yet counts as failed
+            reported = {
+                key
+                for keys, before in zip(outcomes, reported_before)
+                for key in keys[before:]
+            }
+            unreported = [
+                coffee for coffee in batch if coffee_key(coffee) not in reported
+            ]
+            self.report.failed += [coffee_key(coffee) for coffee in unreported]
+            self.metrics.count("coffees_written", len(unreported), saved="false")
+
+    def write_batch(self, batch: List[Coffee]) -> None:
+        fingerprints = {
+            coffee_key(coffee): coffee_fingerprint(coffee) for coffee in batch
+        }
+        stored = self.fingerprints.get(fingerprints) if self.fingerprints else {}
+        to_write = []
+        unchanged = []
+        for coffee in batch:
+            key = coffee_key(coffee)
+            if stored.get(key) == fingerprints[key]:
+                self.report.unchanged.append(key)
+                self.metrics.count("coffee_writes", state="unchanged")
+                unchanged.append(coffee)
+            else:
+                to_write.append(coffee)
+        self.record_frontier(unchanged, True)
+        if not to_write:
+            return
+
+        try:
+            with self.metrics.time("db_write", table="coffee"):
+                results = self.database.update_coffees(to_write)
+        except Exception as e:
+            print(f"Error writing {len(to_write)} coffees: {e}")
+            results = {
+                "created": [],
+                "updated": [],
+                "failed": [coffee_key(coffee) for coffee in to_write],
+            }
+        # the sink tells whether a row existed, a missing fingerprint does not
+        # after --force-writes or a cleared cache
+        for state, keys in (
+            ("inserted", results["created"]),
+            ("changed", results["updated"]),
+        ):
+            if keys:
+                self.report.succeeded += keys
+                getattr(self.report, state).extend(keys)
+                self.metrics.count("coffee_writes", len(keys), state=state)
+                self.metrics.count("coffees_written", len(keys), saved="true")
+        if results["failed"]:
+            self.report.failed += results["failed"]
+            self.metrics.count("coffees_written", len(results["failed"]), saved="false")
+        failed = set(results["failed"])
+        if self.fingerprints:
+            self.fingerprints.put(
+                {
+                    coffee_key(coffee): fingerprints[coffee_key(coffee)]
+                    for coffee in to_write
+                    if coffee_key(coffee) not in failed
+                }
+            )
+        self.record_frontier(
+            [coffee for coffee in to_write if coffee_key(coffee) not in failed], True
+        )
+        self.record_frontier(
+            [coffee for coffee in to_write if coffee_key(coffee) in failed], False
+        )
+
+    def record_frontier(self, coffees: List[Coffee], saved: bool) -> None:
+        if self.frontier is None or not coffees:
+            return
+        page_ids = defaultdict(list)
+        for coffee in coffees:
+            page_ids[coffee.page].append(coffee.id)
+        for origin, ids in page_ids.items():
+            if saved:
+                self.frontier.finish_coffees(origin, ids)
+            else:
+                self.frontier.fail_coffees(origin, ids, "write failed")
@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import Dict, List, Tuple
+from typing import Dict, Iterable, List, Tuple
 
+from models.coffee import Coffee
 from models.metadata import Metadata
 
 
@@ -12,7 +13,35 @@ class Database(ABC):
     @abstractmethod
     def update_metadata(
         self, new_metadata_list: List[Metadata]
-    ) -> Tuple[List[Dict], List[Dict]]:
-        """Updates metadata if they don't exist create them also if
-        there are different metadata that are present in database but are not present in
-        new_metadata_list delete them"""
+    ) -> Dict[str, List[Dict]]:
+        """Creates or updates the metadata, returns the created and updated rows,
+        rows missing from new_metadata_list are left alone, delete_old_metadata
+        removes them"""
+
+    # rows are unique per (origin, page_id), page_ids of two shops may overlap
+    @abstractmethod
+    def get_metadata(
+        self, origin: str, page_ids: Iterable[int] = None
+    ) -> Dict[int, Dict]:
+        """Returns stored metadata rows of one origin keyed by page_id, only the
+        given page_ids when there are some"""
+
+    @abstractmethod
+    def touch_metadata(self, page_ids: List[int], origin: str) -> None:
+        """Marks metadata as refreshed now so it is not considered stale"""
+
+    @abstractmethod
+    def delete_old_metadata(
+        self, kept_page_ids: Iterable[int], origin: str
+    ) -> List[int]:
+        """Deletes stored metadata of the origin whose page_id is not kept,
+        returns their page_ids"""
+
+    @abstractmethod
+    def update_coffee(self, coffee: Coffee) -> bool:
+        """Creates or updates a single coffee, returns whether it was saved"""
+
+    @abstractmethod
+    def update_coffees(self, coffees: List[Coffee]) -> Dict[str, List[Tuple[str, int]]]:
+        """Creates or updates coffees in bulk, returns the (origin, page_id) of
+        the created, updated and failed ones"""
@@ -0,0 +1,65 @@
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable
+
+from database.rows import chunked
+
+MEMORY = ":memory:"
+
+
+class FingerprintStore:
+    """Fingerprint of the last coffee row written per origin and page_id, kept
+    next to the crawler so unchanged coffees are not sent to the database again"""
+
+    def __init__(self, path=MEMORY) -> None:
+        self.lock = threading.Lock()
+        if path != MEMORY and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        columns = [
+            row[1] for row in self.connection.execute("PRAGMA table_info(fingerprints)")
+        ]
+        if columns and "origin" not in columns:
+            # keyed by page_id alone before, it is only a cache so start over
+            self.connection.execute("DROP TABLE fingerprints")
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS fingerprints (
+                origin TEXT NOT NULL,
+                page_id INTEGER NOT NULL,
+                fingerprint TEXT NOT NULL,
+                PRIMARY KEY (origin, page_id)
+            )"""
+        )
+        self.connection.commit()
+
+    def get(self, keys: Iterable[tuple[str, int]]) -> Dict[tuple[str, int], str]:
+        """stored fingerprints keyed by (origin, page_id)"""
+        stored = {}
+        with self.lock:
+            for key_batch in chunked(list(keys), 400):
+                rows = self.connection.execute(
+                    "SELECT origin, page_id, fingerprint FROM fingerprints "
+                    "WHERE (origin, page_id) IN "
+                    f"(VALUES {', '.join(['(?, ?)'] * len(key_batch))})",
+                    [value for key in key_batch for value in key],
+                )
+                stored.update(((origin, page_id), fp) for origin, page_id, fp in rows)
+        return stored
+
+    def put(self, fingerprints: Dict[tuple[str, int], str]) -> None:
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO fingerprints (origin, page_id, fingerprint) "
+                "VALUES (?, ?, ?)",
+                [(*key, fingerprint) for key, fingerprint in fingerprints.items()],
+            )
+
+    def clear(self) -> None:
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM fingerprints")
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
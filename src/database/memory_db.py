@@ -0,0 +1,90 @@
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Tuple
+
+from assets.constants import CHANGED_AT, DETAIL_LINK, NAME, ORIGIN, PAGE_ID, PRICE
+from database.db_interface import Database
+from database.rows import coffee_key, coffee_to_row
+from models.coffee import Coffee
+from models.metadata import Metadata
+
+
+class InMemoryDB(Database):
+    """Keeps rows in dicts keyed by (origin, page_id), for benchmarks and dry runs"""
+
+    def __init__(self) -> None:
+        self.metadata: Dict[Tuple[str, int], Dict] = {}
+        self.coffees: Dict[Tuple[str, int], Dict] = {}
+        self.lock = threading.Lock()
+
+    def delete_metadata(self, id: str) -> None:
+        with self.lock:
+            for key in [key for key in self.metadata if key[1] == int(id)]:
+                del self.metadata[key]
+
+    def update_metadata(self, new_metadata_list: List[Metadata]) -> Dict:
+        created = []
+        updated = []
+        changed_at = datetime.now(timezone.utc).isoformat()
+        with self.lock:
+            for metadata in new_metadata_list:
+                row = {
+                    PAGE_ID: metadata.page_id,
+                    ORIGIN: metadata.origin,
+                    NAME: metadata.name,
+                    PRICE: metadata.price,
+                    DETAIL_LINK: metadata.detail_link,
+                    CHANGED_AT: metadata.changed_at or changed_at,
+                }
+                key = (metadata.origin, metadata.page_id)
+                if key in self.metadata:
+                    updated.append(row)
+                else:
+                    created.append(row)
+                self.metadata[key] = row
+        return {"created": created, "updated": updated}
+
+    def get_metadata(
+        self, origin: str, page_ids: Iterable[int] = None
+    ) -> Dict[int, Dict]:
+        with self.lock:
+            if page_ids is None:
+                page_ids = [key[1] for key in self.metadata if key[0] == origin]
+            return {
+                page_id: dict(self.metadata[origin, page_id])
+                for page_id in page_ids
+                if (origin, page_id) in self.metadata
+            }
+
+    def touch_metadata(self, page_ids: List[int], origin: str) -> None:
+        changed_at = datetime.now(timezone.utc).isoformat()
+        with self.lock:
+            for page_id in page_ids:
+                if (origin, page_id) in self.metadata:
+                    self.metadata[origin, page_id][CHANGED_AT] = changed_at
+
+    def delete_old_metadata(
+        self, kept_page_ids: Iterable[int], origin: str
+    ) -> List[int]:
+        with self.lock:
+            existing_ids = {key[1] for key in self.metadata if key[0] == origin}
+            deleted_ids = sorted(existing_ids.difference(kept_page_ids))
+            for page_id in deleted_ids:
+                del self.metadata[origin, page_id]
+        return deleted_ids
+
+    def update_coffee(self, coffee: Coffee) -> bool:
+        with self.lock:
+            self.coffees[coffee_key(coffee)] = coffee_to_row(coffee)
+        return True
+
+    def update_coffees(self, coffees: List[Coffee]) -> Dict[str, List[Tuple[str, int]]]:
+        created = []
+        updated = []
+        for coffee in coffees:
+            key = coffee_key(coffee)
+            with self.lock:
+                stored = key in self.coffees
+            self.update_coffee(coffee)
+            (updated if stored else created).append(key)
+        return {"created": created, "updated": updated, "failed": []}
@@ -0,0 +1,16 @@
+-- Run once in the Supabase SQL editor before the first crawl with this version.
+--
+-- Metadata rows carry the time they were last written or refreshed, the
+-- incremental planner refetches rows older than --stale-after-days. Rows from
+-- before this migration have none and are refreshed on the next run.
+alter table metadata add column if not exists changed_at timestamptz;
+
+-- page_ids are unique per shop only, the sink upserts on (origin, page_id) for
+-- metadata and on (page, page_id) for coffees and needs these exact constraints.
+alter table metadata drop constraint if exists metadata_page_id_key;
+alter table metadata
+    add constraint metadata_origin_page_id_key unique (origin, page_id);
+
+alter table coffee drop constraint if exists coffee_page_id_key;
+alter table coffee
+    add constraint coffee_page_page_id_key unique (page, page_id);
@@ -0,0 +1,95 @@
+import hashlib
+import json
+from typing import Dict, Iterator, List, Tuple
+
+from models.coffee import Coffee, Origin, Popularity, Species, Taste
+
+
+def chunked(items: List, size: int) -> Iterator[List]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def coffee_key(coffee: Coffee) -> Tuple[str, int]:
+    """a coffee is unique per origin, page_ids of two shops may overlap"""
+    return coffee.page, coffee.id
+
+
+def coffee_to_row(coffee: Coffee) -> Dict:
+    return {
+        "page_id": coffee.id,
+        "page": coffee.page,
+        "name": coffee.name,
+        "price": coffee.price,
+        "weight": coffee.weight,
+        "region": coffee.origin.region,
+        "farm": coffee.origin.farm,
+        "altitude": coffee.origin.altitude,
+        "variety": coffee.origin.variety,
+        "body": coffee.taste.body,
+        "bitterness": coffee.taste.bitterness,
+        "acidity": coffee.taste.acidity,
+        "sweetness": coffee.taste.sweetness,
+        "roast_shade": coffee.taste.roast_shade,
+        "arabica": coffee.taste.species.arabica,
+        "robusta": coffee.taste.species.robusta,
+        "processing": coffee.taste.processing,
+        "flavor_profile": ";".join(coffee.taste.flavor_profile)
+        if coffee.taste.flavor_profile
+        else None,
+        "reviews": ";".join(coffee.popularity.reviews)
+        if coffee.popularity and coffee.popularity.reviews
+        else None,
+        "review_score": coffee.popularity.review_score if coffee.popularity else None,
+        "buy_count": coffee.popularity.buy_count if coffee.popularity else None,
+        "decaf": coffee.decaf,
+    }
+
+
+def coffee_fingerprint(coffee: Coffee) -> str:
+    """stable hash of the normalised row, equal rows give equal fingerprints"""
+    row = json.dumps(
+        coffee_to_row(coffee),
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.blake2b(row.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def row_to_coffee(row: Dict) -> Coffee:
+    """inverse of coffee_to_row, e.g. to copy stored coffees to another Database"""
+    popularity = None
+    if row["review_score"] is not None or row["buy_count"] is not None:
+        popularity = Popularity(
+            reviews=tuple(row["reviews"].split(";")) if row["reviews"] else (),
+            review_score=row["review_score"],
+            buy_count=row["buy_count"],
+        )
+    return Coffee(
+        id=row["page_id"],
+        page=row["page"],
+        name=row["name"],
+        price=row["price"],
+        weight=row["weight"],
+        origin=Origin(
+            region=row["region"],
+            farm=row["farm"],
+            altitude=row["altitude"],
+            variety=row["variety"],
+        ),
+        taste=Taste(
+            body=row["body"],
+            bitterness=row["bitterness"],
+            acidity=row["acidity"],
+            sweetness=row["sweetness"],
+            roast_shade=row["roast_shade"],
+            species=Species(arabica=row["arabica"], robusta=row["robusta"]),
+            processing=row["processing"],
+            flavor_profile=tuple(row["flavor_profile"].split(";"))
+            if row["flavor_profile"]
+            else None,
+        ),
+        popularity=popularity,
+        decaf=bool(row["decaf"]) if row["decaf"] is not None else None,
+    )
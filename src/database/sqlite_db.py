@@ -0,0 +1,307 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Tuple
+
+from assets.constants import (
+    CHANGED_AT,
+    DETAIL_LINK,
+    ID,
+    NAME,
+    ORIGIN,
+    PAGE_ID,
+    PRICE,
+    SQLITE_PATH,
+    TABLE_COFFEE,
+    TABLE_METADATA,
+    WRITE_BATCH_SIZE,
+)
+from database.db_interface import Database
+from database.rows import chunked, coffee_key, coffee_to_row, row_to_coffee
+from models.coffee import Coffee
+from models.metadata import Metadata
+
+METADATA_COLUMNS = (PAGE_ID, ORIGIN, NAME, PRICE, DETAIL_LINK, CHANGED_AT)
+# column types of the rows coffee_to_row builds
+COFFEE_COLUMNS = {
+    "page_id": "INTEGER NOT NULL",
+    "page": "TEXT",
+    "name": "TEXT",
+    "price": "REAL",
+    "weight": "INTEGER",
+    "region": "TEXT",
+    "farm": "TEXT",
+    "altitude": "TEXT",
+    "variety": "TEXT",
+    "body": "INTEGER",
+    "bitterness": "INTEGER",
+    "acidity": "INTEGER",
+    "sweetness": "INTEGER",
+    "roast_shade": "TEXT",
+    "arabica": "INTEGER",
+    "robusta": "INTEGER",
+    "processing": "TEXT",
+    "flavor_profile": "TEXT",
+    "reviews": "TEXT",
+    "review_score": "REAL",
+    "buy_count": "INTEGER",
+    "decaf": "INTEGER",
+}
+# page_ids are unique per shop only, coffee rows name their origin in page
+METADATA_KEY = (ORIGIN, PAGE_ID)
+COFFEE_KEY = ("page", PAGE_ID)
+
+
+def upsert_sql(table: str, columns: Iterable[str], key: Tuple[str, str]) -> str:
+    columns = list(columns)
+    updates = ", ".join(
+        f"{column} = excluded.{column}" for column in columns if column not in key
+    )
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' * len(columns))}) "
+        f"ON CONFLICT ({', '.join(key)}) DO UPDATE SET {updates}"
+    )
+
+
+def key_filter(key: Tuple[str, str], count: int) -> str:
+    return f"({', '.join(key)}) IN (VALUES {', '.join(['(?, ?)'] * count)})"
+
+
+class SQLiteDB(Database):
+    """Local Database in one SQLite file, a fast sink for development,
+    benchmarks and edge deployments that can be synced to another Database.
+
+    Writes are executemany upserts, one transaction per batch, in WAL mode so
+    readers are not blocked while the crawl writes."""
+
+    def __init__(self, path=SQLITE_PATH, batch_size=WRITE_BATCH_SIZE) -> None:
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        metadata_columns = ", ".join(
+            (
+                f"{PAGE_ID} INTEGER NOT NULL",
+                f"{ORIGIN} TEXT",
+                f"{NAME} TEXT",
+                f"{PRICE} REAL",
+                f"{DETAIL_LINK} TEXT",
+                f"{CHANGED_AT} TEXT",
+            )
+        )
+        coffee_columns = ", ".join(
+            f"{column} {column_type}" for column, column_type in COFFEE_COLUMNS.items()
+        )
+        with self.connection:
+            self.create_table(TABLE_METADATA, metadata_columns, METADATA_KEY)
+            self.create_table(TABLE_COFFEE, coffee_columns, COFFEE_KEY)
+
+    def create_table(self, table: str, columns: str, key: Tuple[str, str]) -> None:
+        """creates the table unique per key, a file from before origins were part
+        of the key is unique per page_id alone and is copied over once"""
+        schema = f"({ID} INTEGER PRIMARY KEY, {columns}, UNIQUE ({', '.join(key)}))"
+        if self.unique_on_page_id(table):
+            self.connection.execute(f"DROP INDEX IF EXISTS {table}_{ORIGIN}")
+            self.connection.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+            self.connection.execute(f"CREATE TABLE {table} {schema}")
+            copied = ", ".join(
+                row[1] for row in self.connection.execute(f"PRAGMA table_info({table})")
+            )
+            self.connection.execute(
+                f"INSERT INTO {table} ({copied}) SELECT {copied} FROM {table}_old"
+            )
+            self.connection.execute(f"DROP TABLE {table}_old")
+        self.connection.execute(f"CREATE TABLE IF NOT EXISTS {table} {schema}")
+
+    def unique_on_page_id(self, table: str) -> bool:
+        for index in self.connection.execute(f"PRAGMA index_list({table})"):
+            columns = [
+                row["name"]
+                for row in self.connection.execute(
+                    f"PRAGMA index_info({index['name']})"
+                )
+            ]
+            if index["unique"] and columns == [PAGE_ID]:
+                return True
+        return False
+
+    def delete_metadata(self, id: str) -> None:
+        with self.lock, self.connection:
+            self.connection.execute(
+                f"DELETE FROM {TABLE_METADATA} WHERE {ID} = ?", (id,)
+            )
+
+    def update_metadata(self, new_metadata_list: List[Metadata]) -> Dict:
+        created = []
+        updated = []
+        changed_at = datetime.now(timezone.utc).isoformat()
+        sql = upsert_sql(TABLE_METADATA, METADATA_COLUMNS, METADATA_KEY)
+        with self.lock:
+            for metadata_batch in chunked(new_metadata_list, self.batch_size):
+                rows = [
+                    {
+                        PAGE_ID: metadata.page_id,
+                        ORIGIN: metadata.origin,
+                        NAME: metadata.name,
+                        PRICE: metadata.price,
+                        DETAIL_LINK: metadata.detail_link,
+                        CHANGED_AT: metadata.changed_at or changed_at,
+                    }
+                    for metadata in metadata_batch
+                ]
+                with self.connection:
+                    existing_keys = self.existing_keys(
+                        TABLE_METADATA,
+                        METADATA_KEY,
+                        [(row[ORIGIN], row[PAGE_ID]) for row in rows],
+                    )
+                    self.connection.executemany(
+                        sql, [tuple(row.values()) for row in rows]
+                    )
+                for row in rows:
+                    if (row[ORIGIN], row[PAGE_ID]) in existing_keys:
+                        updated.append(row)
+                    else:
+                        created.append(row)
+        return {"created": created, "updated": updated}
+
+    def get_metadata(
+        self, origin: str, page_ids: Iterable[int] = None
+    ) -> Dict[int, Dict]:
+        columns = f"{PAGE_ID}, {NAME}, {PRICE}, {DETAIL_LINK}, {CHANGED_AT}"
+        query = f"SELECT {columns} FROM {TABLE_METADATA} WHERE {ORIGIN} = ?"
+        with self.lock:
+            if page_ids is None:
+                rows = self.connection.execute(query, (origin,)).fetchall()
+            else:
+                rows = []
+                for id_batch in chunked(list(page_ids), self.batch_size):
+                    rows += self.connection.execute(
+                        f"{query} AND {PAGE_ID} IN ({', '.join('?' * len(id_batch))})",
+                        (origin, *id_batch),
+                    ).fetchall()
+        return {row[PAGE_ID]: dict(row) for row in rows}
+
+    def touch_metadata(self, page_ids: List[int], origin: str) -> None:
+        changed_at = datetime.now(timezone.utc).isoformat()
+        with self.lock, self.connection:
+            self.connection.executemany(
+                f"UPDATE {TABLE_METADATA} SET {CHANGED_AT} = ? "
+                f"WHERE {ORIGIN} = ? AND {PAGE_ID} = ?",
+                [(changed_at, origin, page_id) for page_id in page_ids],
+            )
+
+    def delete_old_metadata(
+        self, kept_page_ids: Iterable[int], origin: str
+    ) -> List[int]:
+        with self.lock, self.connection:
+            existing_ids = {
+                row[0]
+                for row in self.connection.execute(
+                    f"SELECT {PAGE_ID} FROM {TABLE_METADATA} WHERE {ORIGIN} = ?",
+                    (origin,),
+                )
+            }
+            deleted_ids = sorted(existing_ids.difference(kept_page_ids))
+            self.connection.executemany(
+                f"DELETE FROM {TABLE_METADATA} WHERE {ORIGIN} = ? AND {PAGE_ID} = ?",
+                [(origin, page_id) for page_id in deleted_ids],
+            )
+        return deleted_ids
+
+    def update_coffee(self, coffee: Coffee) -> bool:
+        return not self.update_coffees([coffee])["failed"]
+
+    def update_coffees(self, coffees: List[Coffee]) -> Dict[str, List[Tuple[str, int]]]:
+        results = {"created": [], "updated": [], "failed": []}
+        sql = upsert_sql(TABLE_COFFEE, COFFEE_COLUMNS, COFFEE_KEY)
+        with self.lock:
+            for coffee_batch in chunked(coffees, self.batch_size):
+                keys = [coffee_key(coffee) for coffee in coffee_batch]
+                rows = [
+                    tuple(map(coffee_to_row(coffee).get, COFFEE_COLUMNS))
+                    for coffee in coffee_batch
+                ]
+                existing_keys = self.existing_keys(TABLE_COFFEE, COFFEE_KEY, keys)
+                try:
+                    with self.connection:
+                        self.connection.executemany(sql, rows)
+                    saved = [True] * len(rows)
+                except sqlite3.Error as e:
+                    print(f"Upsert of {len(coffee_batch)} coffees failed: {e}")
+                    # retry one by one so a single bad row does not sink the batch
+                    saved = [self.upsert_row(sql, row) for row in rows]
+                for key, row_saved in zip(keys, saved):
+                    if not row_saved:
+                        state = "failed"
+                    elif key in existing_keys:
+                        state = "updated"
+                    else:
+                        state = "created"
+                    results[state].append(key)
+        return results
+
+    def upsert_row(self, sql: str, row: tuple) -> bool:
+        try:
+            with self.connection:
+                self.connection.execute(sql, row)
+            return True
+        except sqlite3.Error as e:
+            print(f"Error updating/inserting Coffee record: {e}")
+            return False
+
+    def existing_keys(
+        self, table: str, key: Tuple[str, str], keys: List[Tuple[str, int]]
+    ) -> set[Tuple[str, int]]:
+        rows = self.connection.execute(
+            f"SELECT {', '.join(key)} FROM {table} WHERE {key_filter(key, len(keys))}",
+            [value for item in keys for value in item],
+        )
+        return {tuple(row) for row in rows}
+
+    def sync_to(self, database: Database) -> Dict[str, int]:
+        """copies every stored metadata and coffee row to another Database in
+        batches, e.g. to Supabase, rows deleted here are not deleted there"""
+        metadata_list = [
+            Metadata(
+                row[PAGE_ID],
+                row[ORIGIN],
+                row[NAME],
+                row[PRICE],
+                row[DETAIL_LINK],
+                changed_at=row[CHANGED_AT],
+            )
+            for row in self.rows(TABLE_METADATA)
+        ]
+        for metadata_batch in chunked(metadata_list, self.batch_size):
+            database.update_metadata(metadata_batch)
+
+        saved = 0
+        coffees = [row_to_coffee(row) for row in self.rows(TABLE_COFFEE)]
+        for coffee_batch in chunked(coffees, self.batch_size):
+            results = database.update_coffees(coffee_batch)
+            saved += len(results["created"]) + len(results["updated"])
+        return {
+            TABLE_METADATA: len(metadata_list),
+            TABLE_COFFEE: saved,
+            "failed": len(coffees) - saved,
+        }
+
+    def rows(self, table: str) -> List[Dict]:
+        with self.lock:
+            return [
+                dict(row)
+                for row in self.connection.execute(
+                    f"SELECT * FROM {table} ORDER BY {PAGE_ID}"
+                )
+            ]
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
@@ -1,131 +1,186 @@
 from supabase import create_client, Client
 import os
-from typing import Dict, List
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Tuple
 from assets.constants import (
     TABLE_METADATA,
+    TABLE_COFFEE,
     NAME,
     PAGE_ID,
     PRICE,
     DETAIL_LINK,
     ORIGIN,
     ID,
+    CHANGED_AT,
+    SELECT_PAGE_SIZE,
+    WRITE_BATCH_SIZE,
 )
 from database.db_interface import Database
+from database.rows import chunked, coffee_key, coffee_to_row
 from models.coffee import Coffee
 from models.metadata import Metadata
 
+# page_ids are unique per shop only, the tables need unique constraints on these
+METADATA_CONFLICT = f"{ORIGIN},{PAGE_ID}"
+COFFEE_CONFLICT = f"page,{PAGE_ID}"
+
 
 class SupabaseDB(Database):
-    def __init__(self):
+    def __init__(self, batch_size=WRITE_BATCH_SIZE):
         url: str = os.environ.get("SUPABASE_URL")
         key: str = os.environ.get("SUPABASE_KEY")
         self.supabase: Client = create_client(url, key)
+        self.batch_size = batch_size
 
     def delete_metadata(self, id: str) -> None:
         self.supabase.table(TABLE_METADATA).delete().eq(ID, id).execute()
 
-    def delete_old_metadata(self, new_metadata_list: List[Metadata]) -> List[int]:
-        existing_ids = (
-            self.supabase.table(TABLE_METADATA).select(PAGE_ID).execute().data
-        )
-        existing_id_set = set(item[PAGE_ID] for item in existing_ids)
-
-        new_id_set = set(metadata.page_id for metadata in new_metadata_list)
-        ids_to_delete = existing_id_set - new_id_set
+    def delete_old_metadata(
+        self, kept_page_ids: Iterable[int], origin: str
+    ) -> List[int]:
+        existing_id_set = set(self.select_all(PAGE_ID, origin))
+        ids_to_delete = sorted(existing_id_set.difference(kept_page_ids))
 
         deleted_ids = []
-        if ids_to_delete:
-            for id in ids_to_delete:
-                self.supabase.table(TABLE_METADATA).delete().eq(PAGE_ID, id).execute()
-                deleted_ids.append(id)
+        for id_batch in chunked(ids_to_delete, self.batch_size):
+            result = (
+                self.supabase.table(TABLE_METADATA)
+                .delete()
+                .eq(ORIGIN, origin)
+                .in_(PAGE_ID, id_batch)
+                .execute()
+            )
+            deleted_ids.extend(row[PAGE_ID] for row in result.data)
 
         return deleted_ids
 
+    def select_all(self, columns: str, origin: str) -> Dict[int, Dict]:
+        """Pages through the origin's metadata, returns rows keyed by page_id"""
+        stored = {}
+        start = 0
+        while True:
+            rows = (
+                self.supabase.table(TABLE_METADATA)
+                .select(columns)
+                .eq(ORIGIN, origin)
+                .order(PAGE_ID)
+                .range(start, start + SELECT_PAGE_SIZE - 1)
+                .execute()
+                .data
+            )
+            for row in rows:
+                stored[row[PAGE_ID]] = row
+            if len(rows) < SELECT_PAGE_SIZE:
+                return stored
+            start += SELECT_PAGE_SIZE
+
+    def get_metadata(
+        self, origin: str, page_ids: Iterable[int] = None
+    ) -> Dict[int, Dict]:
+        columns = f"{PAGE_ID},{NAME},{PRICE},{DETAIL_LINK},{CHANGED_AT}"
+        if page_ids is None:
+            return self.select_all(columns, origin)
+        stored = {}
+        for id_batch in chunked(list(page_ids), self.batch_size):
+            rows = (
+                self.supabase.table(TABLE_METADATA)
+                .select(columns)
+                .eq(ORIGIN, origin)
+                .in_(PAGE_ID, id_batch)
+                .execute()
+                .data
+            )
+            stored.update((row[PAGE_ID], row) for row in rows)
+        return stored
+
+    def touch_metadata(self, page_ids: List[int], origin: str) -> None:
+        changed_at = datetime.now(timezone.utc).isoformat()
+        for id_batch in chunked(page_ids, self.batch_size):
+            self.supabase.table(TABLE_METADATA).update({CHANGED_AT: changed_at}).eq(
+                ORIGIN, origin
+            ).in_(PAGE_ID, id_batch).execute()
+
     def update_metadata(self, new_metadata_list: List[Metadata]) -> Dict:
         created = []
         updated = []
-        for metadata in new_metadata_list:
-            upsert_data = {
+        if not new_metadata_list:
+            return {"created": created, "updated": updated}
+
+        changed_at = datetime.now(timezone.utc).isoformat()
+        upsert_rows = [
+            {
                 PAGE_ID: metadata.page_id,
                 ORIGIN: metadata.origin,
                 NAME: metadata.name,
                 PRICE: metadata.price,
                 DETAIL_LINK: metadata.detail_link,
+                CHANGED_AT: metadata.changed_at or changed_at,
             }
-
-            existing = (
-                self.supabase.table(TABLE_METADATA)
-                .select("*")
-                .eq(PAGE_ID, metadata.page_id)
+            for metadata in new_metadata_list
+        ]
+
+        for row_batch in chunked(upsert_rows, self.batch_size):
+            # only the batch's own ids, scanning the table per batch is O(n²),
+            # an id of another origin is filtered out by the key
+            existing_key_set = {
+                (row[ORIGIN], row[PAGE_ID])
+                for row in self.supabase.table(TABLE_METADATA)
+                .select(METADATA_CONFLICT)
+                .in_(PAGE_ID, [row[PAGE_ID] for row in row_batch])
                 .execute()
                 .data
+            }
+            result = (
+                self.supabase.table(TABLE_METADATA)
+                .upsert(row_batch, on_conflict=METADATA_CONFLICT)
+                .execute()
             )
-
-            if existing:
-                result = (
-                    self.supabase.table(TABLE_METADATA)
-                    .update(upsert_data)
-                    .eq(ID, metadata.page_id)
-                    .execute()
-                )
-                updated.extend(result.data)
-            else:
-                result = (
-                    self.supabase.table(TABLE_METADATA).insert(upsert_data).execute()
-                )
-                created.extend(result.data)
+            for row in result.data:
+                if (row[ORIGIN], row[PAGE_ID]) in existing_key_set:
+                    updated.append(row)
+                else:
+                    created.append(row)
 
         return {"created": created, "updated": updated}
 
     def update_coffee(self, coffee: Coffee) -> bool:
         try:
-            upsert_data = {
-                "page_id": coffee.id,
-                "page": coffee.page,
-                "name": coffee.name,
-                "price": coffee.price,
-                "weight": coffee.weight,
-                "region": coffee.origin.region,
-                "farm": coffee.origin.farm,
-                "altitude": coffee.origin.altitude,
-                "variety": coffee.origin.variety,
-                "body": coffee.taste.body,
-                "bitterness": coffee.taste.bitterness,
-                "acidity": coffee.taste.acidity,
-                "sweetness": coffee.taste.sweetness,
-                "roast_shade": coffee.taste.roast_shade,
-                "arabica": coffee.taste.species.arabica,
-                "robusta": coffee.taste.species.robusta,
-                "processing": coffee.taste.processing,
-                "flavor_profile": ";".join(coffee.taste.flavor_profile)
-                if coffee.taste.flavor_profile
-                else None,
-                "reviews": ";".join(coffee.popularity.reviews)
-                if coffee.popularity and coffee.popularity.reviews
-                else None,
-                "review_score": coffee.popularity.review_score
-                if coffee.popularity
-                else None,
-                "buy_count": coffee.popularity.buy_count if coffee.popularity else None,
-                "decaf": coffee.decaf,
-            }
-
-            existing = (
-                self.supabase.table("coffee")
-                .select("*")
-                .eq("page_id", coffee.id)
-                .execute()
-            )
-
-            if existing.data:
-                self.supabase.table("coffee").update(upsert_data).eq(
-                    "page_id", coffee.id
-                ).execute()
-            else:
-                self.supabase.table("coffee").insert(upsert_data).execute()
-
+            self.supabase.table(TABLE_COFFEE).upsert(
+                coffee_to_row(coffee), on_conflict=COFFEE_CONFLICT
+            ).execute()
             return True
 
         except Exception as e:
             print(f"Error updating/inserting Coffee record: {e}")
             return False
+
+    def update_coffees(self, coffees: List[Coffee]) -> Dict[str, List[Tuple[str, int]]]:
+        results = {"created": [], "updated": [], "failed": []}
+        for coffee_batch in chunked(coffees, self.batch_size):
+            existing_key_set = {
+                (row["page"], row[PAGE_ID])
+                for row in self.supabase.table(TABLE_COFFEE)
+                .select(COFFEE_CONFLICT)
+                .in_(PAGE_ID, [coffee.id for coffee in coffee_batch])
+                .execute()
+                .data
+            }
+            try:
+                self.supabase.table(TABLE_COFFEE).upsert(
+                    [coffee_to_row(coffee) for coffee in coffee_batch],
+                    on_conflict=COFFEE_CONFLICT,
+                ).execute()
+                saved = [True] * len(coffee_batch)
+            except Exception as e:
+                print(f"Batch upsert of {len(coffee_batch)} coffees failed: {e}")
+                # retry one by one so a single bad record does not sink the batch
+                saved = [self.update_coffee(coffee) for coffee in coffee_batch]
+            for coffee, coffee_saved in zip(coffee_batch, saved):
+                key = coffee_key(coffee)
+                if not coffee_saved:
+                    results["failed"].append(key)
+                elif key in existing_key_set:
+                    results["updated"].append(key)
+                else:
+                    results["created"].append(key)
+        return results
@@ -1,12 +1,13 @@
-from crawlers.coffeein_crawler import CoffeeinCrawler
 from models.page import PageType
 from crawlers.crawler_interface import Crawler
+from factory.registry import CRAWLERS
 
 
 class CrawlerFactory:
     @staticmethod
-    def create_crawler(crawler_type: str, **kwargs) -> Crawler:
-        if crawler_type == PageType.COFFEEIN:
-            return CoffeeinCrawler(**kwargs)
-        else:
+    def create_crawler(crawler_type: PageType, **kwargs) -> Crawler:
+        try:
+            crawler_class = CRAWLERS.get(crawler_type.name)
+        except KeyError:
             raise ValueError(f"Unknown crawler type: {crawler_type}")
+        return crawler_class(**kwargs)
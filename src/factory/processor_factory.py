@@ -1,13 +1,16 @@
 from typing import List
 from models.page import PageType
 from processors.processor_interface import Processor
-from processors.coffein_processor import CoffeeinProcessor
+from factory.registry import PROCESSORS
 
 
 class ProcessorFactory:
     @staticmethod
-    def create_processor(crawler_type: str, ignored_coffes: List[str]) -> Processor:
-        if crawler_type == PageType.COFFEEIN:
-            return CoffeeinProcessor(ignored_coffes)
-        else:
+    def create_processor(
+        crawler_type: PageType, ignored_coffes: List[str]
+    ) -> Processor:
+        try:
+            processor_class = PROCESSORS.get(crawler_type.name)
+        except KeyError:
             raise ValueError(f"Unknown crawler type: {crawler_type}")
+        return processor_class(ignored_coffes)
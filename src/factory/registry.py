@@ -0,0 +1,69 @@
+import importlib
+from importlib.metadata import entry_points
+from typing import Dict
+
+from assets.constants import (
+    CRAWLER_ENTRY_POINTS,
+    PROCESSOR_ENTRY_POINTS,
+    SINK_ENTRY_POINTS,
+)
+
+
+class Registry:
+    """Maps names to implementations given as "module:attribute" and only
+    imports a module when its implementation is first asked for.
+
+    Names missing from the built-ins are looked up among the installed entry
+    points of the group, so other packages can plug in crawlers, processors
+    and sinks without touching this repo."""
+
+    def __init__(self, group: str, builtins: Dict[str, str]) -> None:
+        self.group = group
+        self.targets = dict(builtins)
+        self.loaded: Dict[str, type] = {}
+
+    def register(self, name: str, target: str | type) -> None:
+        """target is a class or a "module:attribute" path resolved on first use"""
+        self.loaded.pop(name, None)
+        if isinstance(target, str):
+            self.targets[name] = target
+        else:
+            self.targets.pop(name, None)
+            self.loaded[name] = target
+
+    def get(self, name: str) -> type:
+        if name in self.loaded:
+            return self.loaded[name]
+        if name in self.targets:
+            module_name, _, attribute = self.targets[name].partition(":")
+            implementation = getattr(importlib.import_module(module_name), attribute)
+        else:
+            matches = entry_points(group=self.group, name=name)
+            if not matches:
+                raise KeyError(name)
+            implementation = next(iter(matches)).load()
+        self.loaded[name] = implementation
+        return implementation
+
+    def names(self) -> list[str]:
+        installed = {entry_point.name for entry_point in entry_points(group=self.group)}
+        return sorted(set(self.targets) | set(self.loaded) | installed)
+
+
+# keyed by PageType name
+CRAWLERS = Registry(
+    CRAWLER_ENTRY_POINTS, {"COFFEEIN": "crawlers.coffeein_crawler:CoffeeinCrawler"}
+)
+PROCESSORS = Registry(
+    PROCESSOR_ENTRY_POINTS,
+    {"COFFEEIN": "processors.coffein_processor:CoffeeinProcessor"},
+)
+# Database implementations the coffees are written to
+SINKS = Registry(
+    SINK_ENTRY_POINTS,
+    {
+        "supabase": "database.supabase_db:SupabaseDB",
+        "memory": "database.memory_db:InMemoryDB",
+        "sqlite": "database.sqlite_db:SQLiteDB",
+    },
+)
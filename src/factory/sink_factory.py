@@ -0,0 +1,12 @@
+from database.db_interface import Database
+from factory.registry import SINKS
+
+
+class SinkFactory:
+    @staticmethod
+    def create_sink(sink_name: str, **kwargs) -> Database:
+        try:
+            sink_class = SINKS.get(sink_name)
+        except KeyError:
+            raise ValueError(f"Unknown sink: {sink_name}")
+        return sink_class(**kwargs)
@@ -0,0 +1,197 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Iterator
+
+from assets.constants import METRICS_PREFIX
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                return
+        self.counts[-1] += 1
+
+    def quantile(self, q: float) -> float:
+        """estimated like Prometheus does, interpolating inside the bucket"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, self.counts):
+            if count and seen + count >= rank:
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return self.buckets[-1]
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else 0.0,
+            "p50": round(self.quantile(0.5), 6),
+            "p99": round(self.quantile(0.99), 6),
+        }
+
+
+class RunMetrics:
+    """Counters, gauges and latency histograms of one run, exported as a
+    Prometheus text file and a JSON summary"""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.counters: dict[str, dict[Labels, float]] = {}
+        self.gauges: dict[str, dict[Labels, float]] = {}
+        self.histograms: dict[str, dict[Labels, Histogram]] = {}
+        self.started_at = datetime.now(timezone.utc)
+        self.started = time.perf_counter()
+
+    def count(self, name: str, amount: float = 1, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def set(self, name: str, value: float, **labels: str) -> None:
+        with self.lock:
+            self.gauges.setdefault(name, {})[tuple(sorted(labels.items()))] = value
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram()
+            series[key].observe(seconds)
+
+    @contextmanager
+    def time(self, name: str, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """wall time of a whole stage, exported as a gauge"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = round(time.perf_counter() - started, 3)
+            self.set("stage_duration_seconds", elapsed, stage=name)
+
+    def value(self, name: str, **labels: str) -> float:
+        with self.lock:
+            return self.counters.get(name, {}).get(tuple(sorted(labels.items())), 0)
+
+    def total(self, name: str, **labels: str) -> float:
+        """sum of every series of a counter that carries the given labels,
+        e.g. the pages fetched of a kind across all sites"""
+        wanted = set(labels.items())
+        with self.lock:
+            series = self.counters.get(name, {})
+            return sum(value for key, value in series.items() if wanted <= set(key))
+
+    def to_prometheus(self) -> str:
+        lines = []
+        with self.lock:
+            for name, series in sorted(self.counters.items()):
+                metric = f"{METRICS_PREFIX}_{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{metric}{format_labels(labels)} {value:g}")
+            for name, series in sorted(self.gauges.items()):
+                metric = f"{METRICS_PREFIX}_{name}"
+                lines.append(f"# TYPE {metric} gauge")
+                for labels, value in sorted(series.items()):
+                    lines.append(f"{metric}{format_labels(labels)} {value:g}")
+            for name, series in sorted(self.histograms.items()):
+                metric = f"{METRICS_PREFIX}_{name}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                for labels, histogram in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(
+                        histogram.buckets + (float("inf"),), histogram.counts
+                    ):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        bucket_labels = format_labels(labels + (("le", le),))
+                        lines.append(f"{metric}_bucket{bucket_labels} {cumulative}")
+                    lines.append(
+                        f"{metric}_sum{format_labels(labels)} {histogram.sum:.6f}"
+                    )
+                    lines.append(
+                        f"{metric}_count{format_labels(labels)} {histogram.count}"
+                    )
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            return {
+                "started_at": self.started_at.isoformat(),
+                "duration_seconds": round(time.perf_counter() - self.started, 3),
+                "counters": {
+                    name: {label_key(labels): value for labels, value in series.items()}
+                    for name, series in self.counters.items()
+                },
+                "gauges": {
+                    name: {label_key(labels): value for labels, value in series.items()}
+                    for name, series in self.gauges.items()
+                },
+                "latency_seconds": {
+                    name: {
+                        label_key(labels): histogram.summary()
+                        for labels, histogram in series.items()
+                    }
+                    for name, series in self.histograms.items()
+                },
+            }
+
+    def export(self, directory: str) -> tuple[str, str]:
+        """writes run_metrics.prom and run_summary.json, returns their paths"""
+        os.makedirs(directory, exist_ok=True)
+        self.set("run_duration_seconds", round(time.perf_counter() - self.started, 3))
+        prometheus_path = os.path.join(directory, "run_metrics.prom")
+        summary_path = os.path.join(directory, "run_summary.json")
+        with open(prometheus_path, "w", encoding="utf-8") as file:
+            file.write(self.to_prometheus())
+        with open(summary_path, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, indent=2)
+            file.write("\n")
+        return prometheus_path, summary_path
+
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels) + "}"
+
+
+def escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def label_key(labels: Labels) -> str:
+    """labels as a JSON key, e.g. kind=detail, or total when there are none"""
+    return ",".join(f"{key}={value}" for key, value in labels) or "total"
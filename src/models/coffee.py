@@ -1,29 +1,40 @@
+import sys
 from dataclasses import dataclass
 from typing import Optional
 
 
-@dataclass
+def intern_text(value: Optional[str]) -> Optional[str]:
+    """shares one copy of the low-cardinality strings across all coffees"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+@dataclass(slots=True)
 class Origin:
     region: Optional[str] = None
     farm: Optional[str] = None
     altitude: Optional[str] = None
     variety: Optional[str] = None
 
+    def __post_init__(self) -> None:
+        self.region = intern_text(self.region)
+        self.altitude = intern_text(self.altitude)
+        self.variety = intern_text(self.variety)
+
 
-@dataclass
+@dataclass(slots=True)
 class Popularity:
-    reviews: list[str]
+    reviews: tuple[str, ...]
     review_score: float
     buy_count: int
 
 
-@dataclass
+@dataclass(slots=True)
 class Species:
     arabica: int
     robusta: int
 
 
-@dataclass
+@dataclass(slots=True)
 class Taste:
     body: int
     bitterness: int
@@ -32,10 +43,16 @@ class Taste:
     roast_shade: int
     species: Species
     processing: Optional[str] = None
-    flavor_profile: Optional[list] = None
+    flavor_profile: Optional[tuple[str, ...]] = None
 
+    def __post_init__(self) -> None:
+        self.roast_shade = intern_text(self.roast_shade)
+        self.processing = intern_text(self.processing)
+        if self.flavor_profile is not None:
+            self.flavor_profile = tuple(map(intern_text, self.flavor_profile))
 
-@dataclass
+
+@dataclass(slots=True)
 class Coffee:
     id: int
     page: str
@@ -46,3 +63,6 @@ class Coffee:
     taste: Taste
     popularity: Optional[Popularity]
     decaf: Optional[bool] = False
+
+    def __post_init__(self) -> None:
+        self.page = intern_text(self.page)
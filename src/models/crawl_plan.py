@@ -0,0 +1,19 @@
+from dataclasses import dataclass, field
+
+from models.metadata import Metadata
+
+
+@dataclass(slots=True)
+class CrawlPlan:
+    new: list[Metadata] = field(default_factory=list)
+    changed: list[Metadata] = field(default_factory=list)
+    stale: list[Metadata] = field(default_factory=list)
+    unchanged: list[Metadata] = field(default_factory=list)
+
+    @property
+    def to_write(self) -> list[Metadata]:
+        return self.new + self.changed
+
+    @property
+    def to_fetch(self) -> list[Metadata]:
+        return self.new + self.changed + self.stale
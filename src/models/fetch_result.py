@@ -0,0 +1,18 @@
+from dataclasses import dataclass
+from typing import Optional
+
+
+@dataclass(slots=True)
+class FetchResult:
+    url: str
+    status: Optional[int] = None
+    text: Optional[str] = None
+    final_url: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    elapsed: float = 0.0
+    unchanged: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.text is not None
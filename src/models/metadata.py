@@ -1,9 +1,10 @@
 from dataclasses import dataclass
 from typing import Optional
+from models.coffee import intern_text
 from models.page import PageType
 
 
-@dataclass
+@dataclass(slots=True)
 class Metadata:
     page_id: int
     origin: PageType
@@ -11,11 +12,16 @@ class Metadata:
     price: float
     detail_link: str
     image_link: Optional[str] = None
+    # when a sink stored it, kept when rows are copied to another sink
+    changed_at: Optional[str] = None
+
+    def __post_init__(self) -> None:
+        self.origin = intern_text(self.origin)
 
     def __eq__(self, other):
         if not isinstance(other, Metadata):
             return NotImplemented
-        return self.page_id == other.page_id
+        return (self.origin, self.page_id) == (other.origin, other.page_id)
 
     def __hash__(self):
-        return hash(self.page_id)
+        return hash((self.origin, self.page_id))
@@ -0,0 +1,36 @@
+from dataclasses import dataclass, field
+
+from crawlers.crawler_interface import Crawler
+from models.page import PageType
+
+
+@dataclass(slots=True)
+class SiteBudget:
+    """politeness budget of one domain, higher priority sites get the shared
+    parser pool first when it is busy, adaptive sites start at per_host_limit
+    requests in flight and adapt up to concurrency"""
+
+    concurrency: int = 8
+    per_host_limit: int = 4
+    requests_per_second: float | None = None
+    burst: int = 1
+    priority: int = 0
+    adaptive: bool = False
+
+    def crawler_options(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "per_host_limit": self.per_host_limit,
+            "requests_per_second": self.requests_per_second,
+            "burst": self.burst,
+            "adaptive": self.adaptive,
+        }
+
+
+@dataclass(slots=True)
+class Site:
+    name: str
+    page_type: PageType
+    crawler: Crawler
+    listing_path: str
+    budget: SiteBudget = field(default_factory=SiteBudget)
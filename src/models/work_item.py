@@ -0,0 +1,12 @@
+from dataclasses import dataclass
+
+from models.metadata import Metadata
+
+
+@dataclass(slots=True)
+class WorkItem:
+    id: int
+    url: str
+    metadata: Metadata
+    # leases taken so far, including the current one
+    attempts: int
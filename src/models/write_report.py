@@ -0,0 +1,13 @@
+from dataclasses import dataclass, field
+
+
+# coffees are listed by (origin, page_id)
+@dataclass(slots=True)
+class WriteReport:
+    succeeded: list[tuple[str, int]] = field(default_factory=list)
+    failed: list[tuple[str, int]] = field(default_factory=list)
+    # succeeded split by whether the coffee was stored before
+    inserted: list[tuple[str, int]] = field(default_factory=list)
+    changed: list[tuple[str, int]] = field(default_factory=list)
+    # not written, the stored row has the same fingerprint
+    unchanged: list[tuple[str, int]] = field(default_factory=list)
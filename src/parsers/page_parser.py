@@ -0,0 +1,73 @@
+from importlib.util import find_spec
+from typing import Iterable, Optional
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from assets.constants import HTML_PARSER, LXML_PARSER
+
+NodeRule = tuple[str, Optional[str], Optional[str]]
+
+
+class NodeStrainer(SoupStrainer):
+    """Keeps only top level nodes matching one of the rules, together with
+    their whole subtree"""
+
+    def __init__(self, rules: Iterable[NodeRule]) -> None:
+        super().__init__()
+        self.rules: dict[str, list[tuple[Optional[str], Optional[str]]]] = {}
+        for tag, attribute, value in rules:
+            self.rules.setdefault(tag, []).append((attribute, value))
+
+    @property
+    def excludes_everything(self) -> bool:
+        return not self.rules
+
+    def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+        for attribute, value in self.rules.get(name, ()):
+            if attribute is None:
+                return True
+            found = (attrs or {}).get(attribute)
+            if found is None:
+                continue
+            if value is None:
+                return True
+            # class arrives as the raw attribute string at this point
+            values = found.split() if isinstance(found, str) else found
+            if value in values:
+                return True
+        return False
+
+    def allow_string_creation(self, string) -> bool:
+        return False
+
+
+def resolve_backend(backend: str) -> str:
+    if backend == LXML_PARSER and find_spec("lxml") is None:
+        # a dependency, but a partial install still crawls, only slower
+        print(f"lxml is not installed, parsing with {HTML_PARSER}")
+        return HTML_PARSER
+    return backend
+
+
+class PageParser:
+    """Turns fetched html into BeautifulSoup using the configured backend,
+    optionally keeping only the nodes the processor reads, with raw_listings
+    listing pages skip the DOM and go to Processor.process_listing as they are"""
+
+    def __init__(
+        self,
+        backend: str = LXML_PARSER,
+        listing_nodes: Iterable[NodeRule] = None,
+        detail_nodes: Iterable[NodeRule] = None,
+        raw_listings: bool = False,
+    ) -> None:
+        self.raw_listings = raw_listings
+        self.backend = resolve_backend(backend)
+        self.listing_strainer = NodeStrainer(listing_nodes) if listing_nodes else None
+        self.detail_strainer = NodeStrainer(detail_nodes) if detail_nodes else None
+
+    def parse_listing(self, html: str) -> BeautifulSoup:
+        return BeautifulSoup(html, self.backend, parse_only=self.listing_strainer)
+
+    def parse_detail(self, html: str) -> BeautifulSoup:
+        return BeautifulSoup(html, self.backend, parse_only=self.detail_strainer)
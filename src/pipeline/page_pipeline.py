@@ -0,0 +1,330 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Collection, Generator, Iterable, List
+
+from assets.constants import DETAIL_PAGE, LISTING_PAGE
+from factory.processor_factory import ProcessorFactory
+from metrics.run_metrics import RunMetrics
+from models.coffee import Coffee
+from models.fetch_result import FetchResult
+from models.metadata import Metadata
+from models.page import PageType
+from models.site import Site
+from parsers.page_parser import PageParser
+from pipeline.priority_slots import PrioritySlots
+from processors.processor_interface import Processor
+from processors.product_filter import ProductFilter
+from scheduler.crawl_frontier import CrawlFrontier
+
+_DONE = object()
+
+# set once per worker process by init_worker, keyed by site name
+worker_parsers: dict[str, PageParser] = {}
+worker_processors: dict[str, Processor] = {}
+
+
+def init_worker(
+    sites: dict[str, tuple[PageType, PageParser]], ignored_coffees: List[str]
+) -> None:
+    for name, (page_type, parser) in sites.items():
+        worker_parsers[name] = parser
+        worker_processors[name] = ProcessorFactory.create_processor(
+            page_type, ignored_coffees
+        )
+
+
+def process_page(site: str, kind: str, html: str) -> tuple:
+    """runs in a worker, returns the processed value, the parse and process
+    timings and the products the processor skipped meanwhile"""
+    parser = worker_parsers[site]
+    processor = worker_processors[site]
+    skipped_before = processor.skipped.copy()
+    started = time.perf_counter()
+    if kind == LISTING_PAGE and parser.raw_listings:
+        parsed = started
+        value = processor.process_listing(html)
+    elif kind == LISTING_PAGE:
+        soup = parser.parse_listing(html)
+        parsed = time.perf_counter()
+        value = processor.process_metadata(soup)
+    else:
+        soup = parser.parse_detail(html)
+        parsed = time.perf_counter()
+        value = processor.process_coffee(soup)
+    processed = time.perf_counter()
+    skipped = processor.skipped - skipped_before
+    return value, parsed - started, processed - parsed, skipped
+
+
+def unique_batches(
+    metadata: Iterable[Metadata], size: int, seen_page_ids: set[int]
+) -> Generator[List[Metadata], None, None]:
+    """groups streamed metadata into batches, skipping products seen before,
+    seen_page_ids is filled in place so the caller keeps the full id set"""
+    batch = []
+    for item in metadata:
+        if item.page_id in seen_page_ids:
+            continue
+        seen_page_ids.add(item.page_id)
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class PagePipeline:
+    """Fetch, parse and sink stages connected by bounded queues.
+
+    Every site's crawler fetches raw pages on its own threads into a bounded
+    queue, one process pool shared by all sites parses and processes them on
+    every core and the caller sinks the results, e.g. into a
+    BufferedCoffeeWriter. With workers=0 pages are processed inline in the
+    calling thread."""
+
+    def __init__(
+        self,
+        sites: Iterable[Site],
+        ignored_coffees: List[str] = None,
+        workers: int = None,
+        queue_size=64,
+        max_in_flight: int = None,
+        metrics: RunMetrics = None,
+        product_filter: ProductFilter = None,
+        frontier: CrawlFrontier = None,
+    ) -> None:
+        self.sites = {site.name: site for site in sites}
+        self.metrics = metrics or RunMetrics()
+        self.product_filter = product_filter
+        self.frontier = frontier
+        # how many of each crawler's failures and unchanged pages the frontier got
+        self.frontier_cursors = {name: (0, 0) for name in self.sites}
+        self.workers = os.cpu_count() if workers is None else workers
+        self.queue_size = queue_size
+        self.max_in_flight = max_in_flight or max(1, self.workers) * 2
+        # pages of every site compete for the same pool slots
+        self.slots = PrioritySlots(self.max_in_flight)
+        worker_sites = {
+            name: (site.page_type, site.crawler.parser)
+            for name, site in self.sites.items()
+        }
+        init_worker(worker_sites, ignored_coffees)
+        self.pool = (
+            # forking copies the fetcher threads' locks and the sinks' sqlite
+            # connections into the workers, forkserver starts them clean
+            ProcessPoolExecutor(
+                self.workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+                initializer=init_worker,
+                initargs=(worker_sites, ignored_coffees),
+            )
+            if self.workers > 0
+            else None
+        )
+
+    def metadata(
+        self, site: Site, listed_page_ids: set[int] = None
+    ) -> Generator[Metadata, None, None]:
+        """yields the listing products that pass the product filter, so the
+        filtered ones never cost a detail request, listed_page_ids collects
+        every product the listing holds except the ignored ones, whose rows are
+        deleted like the processor's ignored products"""
+        pages = site.crawler.fetch_metadata_pages(site.listing_path)
+        for metadata_batch in self.run(site, pages, LISTING_PAGE):
+            if listed_page_ids is not None:
+                listed_page_ids.update(
+                    item.page_id
+                    for item in metadata_batch or ()
+                    if self.product_filter is None
+                    or not self.product_filter.is_ignored(item.name)
+                )
+            if self.product_filter is None:
+                yield from metadata_batch or ()
+                continue
+            skipped = Counter()
+            yield from self.product_filter.apply(metadata_batch or (), skipped)
+            for reason, amount in skipped.items():
+                self.metrics.count(
+                    "products_skipped", amount, site=site.name, reason=reason
+                )
+        self.sync_frontier(site)
+
+    def coffees(
+        self,
+        site: Site,
+        metadata_list: Iterable[Metadata],
+        stored_page_ids: Collection[int] = (),
+        processed_urls: set[str] = None,
+    ) -> Generator[Coffee, None, None]:
+        """yields processed coffees, blends are only counted in the metrics,
+        unchanged pages are skipped for the stored_page_ids only,
+        processed_urls collects every detail page that reached the processor"""
+        pages = site.crawler.fetch_coffee_pages(list(metadata_list), stored_page_ids)
+        for coffee in self.run(site, pages, DETAIL_PAGE, processed_urls):
+            if coffee:
+                yield coffee
+        self.sync_frontier(site)
+
+    def sync_frontier(self, site: Site) -> None:
+        """hands the frontier the pages the crawler gave up on or skipped as
+        unchanged since the last call, they never reach the processor"""
+        if self.frontier is None:
+            return
+        crawler = site.crawler
+        failed, unchanged = self.frontier_cursors[site.name]
+        failures = crawler.failures[failed:]
+        unchanged_urls = crawler.unchanged[unchanged:]
+        self.frontier_cursors[site.name] = (
+            failed + len(failures),
+            unchanged + len(unchanged_urls),
+        )
+        origin = site.page_type.name
+        self.frontier.fail(origin, [(result.url, result.error) for result in failures])
+        self.frontier.finish(origin, unchanged_urls)
+
+    def run(
+        self,
+        site: Site,
+        pages: Generator[FetchResult, None, None],
+        kind: str,
+        processed_urls: set[str] = None,
+    ) -> Generator:
+        """yields processed pages in completion order"""
+        fetched = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        errors = []
+        fetcher = threading.Thread(
+            target=self.fetch,
+            args=(site, pages, kind, fetched, stop, errors),
+            daemon=True,
+        )
+        fetcher.start()
+        try:
+            if self.pool is None:
+                while (result := fetched.get()) is not _DONE:
+                    task_result = process_page(site.name, kind, result.text)
+                    yield self.record(
+                        site, kind, task_result, result.url, processed_urls
+                    )
+            else:
+                yield from self.process_pooled(site, fetched, kind, processed_urls)
+        finally:
+            stop.set()
+            fetcher.join()
+        if errors:
+            raise errors[0]
+
+    def process_pooled(
+        self,
+        site: Site,
+        fetched: queue.Queue,
+        kind: str,
+        processed_urls: set[str] = None,
+    ) -> Generator:
+        pending: dict[Future, str] = {}
+        held = None
+        fetching = True
+        while fetching or pending or held is not None:
+            if held is None and fetching:
+                try:
+                    item = fetched.get(timeout=0.05 if pending else None)
+                except queue.Empty:
+                    item = None
+                if item is _DONE:
+                    fetching = False
+                else:
+                    held = item
+            # at most max_in_flight pages of all sites sit in the pool, the
+            # rest waits in the bounded queues and eventually blocks fetching
+            if held is not None and self.slots.acquire(
+                site.budget.priority, timeout=0.05 if pending else None
+            ):
+                future = self.pool.submit(process_page, site.name, kind, held.text)
+                future.add_done_callback(lambda _: self.slots.release())
+                pending[future] = held.url
+                held = None
+            if pending:
+                done, _ = wait(
+                    pending,
+                    timeout=0 if fetching or held is not None else None,
+                    return_when=FIRST_COMPLETED,
+                )
+                for future in done:
+                    url = pending.pop(future)
+                    yield self.record(site, kind, future.result(), url, processed_urls)
+
+    def record(
+        self,
+        site: Site,
+        kind: str,
+        task_result: tuple,
+        url: str,
+        processed_urls: set[str] = None,
+    ):
+        """moves the timings a worker measured into the run metrics, pages
+        that leave nothing to write are done for the frontier"""
+        value, parse_seconds, process_seconds, skipped = task_result
+        if processed_urls is not None:
+            processed_urls.add(url)
+        if self.frontier is not None and (kind == LISTING_PAGE or value is None):
+            self.frontier.finish(site.page_type.name, [url])
+        self.metrics.observe("parse", parse_seconds, site=site.name, kind=kind)
+        self.metrics.observe("process", process_seconds, site=site.name, kind=kind)
+        for reason, amount in skipped.items():
+            self.metrics.count(
+                "products_skipped", amount, site=site.name, reason=reason
+            )
+        return value
+
+    def fetch(
+        self,
+        site: Site,
+        pages: Generator[FetchResult, None, None],
+        kind: str,
+        fetched: queue.Queue,
+        stop: threading.Event,
+        errors: list,
+    ) -> None:
+        try:
+            for result in pages:
+                self.metrics.count("pages_fetched", site=site.name, kind=kind)
+                if site.crawler.controller:
+                    self.metrics.set(
+                        "concurrency_limit",
+                        round(site.crawler.controller.limit, 2),
+                        site=site.name,
+                    )
+                self.metrics.observe("fetch", result.elapsed, site=site.name, kind=kind)
+                if not self.put(fetched, result, stop):
+                    return
+        except Exception as e:
+            errors.append(e)
+        finally:
+            pages.close()
+            self.put(fetched, _DONE, stop)
+
+    def put(self, fetched: queue.Queue, item, stop: threading.Event) -> bool:
+        """blocks while the queue is full unless the consumer went away"""
+        while not stop.is_set():
+            try:
+                fetched.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+    def __enter__(self) -> "PagePipeline":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
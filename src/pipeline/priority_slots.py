@@ -0,0 +1,34 @@
+import threading
+from collections import Counter
+
+
+class PrioritySlots:
+    """Counting semaphore that hands a free slot to the highest priority
+    waiter first, so busy sites share the parser pool by priority"""
+
+    def __init__(self, slots: int) -> None:
+        self.free = slots
+        self.waiting = Counter()
+        self.condition = threading.Condition()
+
+    def acquire(self, priority=0, timeout: float = None) -> bool:
+        with self.condition:
+            self.waiting[priority] += 1
+            try:
+                acquired = self.condition.wait_for(
+                    lambda: self.free > 0 and priority >= max(self.waiting), timeout
+                )
+                if acquired:
+                    self.free -= 1
+                return acquired
+            finally:
+                self.waiting[priority] -= 1
+                if not self.waiting[priority]:
+                    del self.waiting[priority]
+                # a lower priority waiter may be next now
+                self.condition.notify_all()
+
+    def release(self) -> None:
+        with self.condition:
+            self.free += 1
+            self.condition.notify_all()
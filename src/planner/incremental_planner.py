@@ -0,0 +1,115 @@
+import heapq
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+from assets.constants import CHANGED_AT, DETAIL_LINK, NAME, PRICE
+from models.crawl_plan import CrawlPlan
+from models.metadata import Metadata
+
+
+class IncrementalPlanner:
+    """Decides which detail pages need fetching by diffing fresh listing data
+    against what the database already holds"""
+
+    def __init__(self, stale_after_days=7, stale_limit=20) -> None:
+        self.stale_after_days = stale_after_days
+        self.stale_limit = stale_limit
+        # the stale_limit oldest candidates seen by plan_batch, newest on top
+        self.stale_candidates: list[tuple[float, int, Metadata]] = []
+
+    def plan(
+        self, fresh_metadata: List[Metadata], stored_metadata: Dict[int, Dict]
+    ) -> CrawlPlan:
+        plan = CrawlPlan()
+        for metadata in fresh_metadata:
+            stored = stored_metadata.get(metadata.page_id)
+            if stored is None:
+                plan.new.append(metadata)
+            elif self.is_changed(metadata, stored):
+                plan.changed.append(metadata)
+            else:
+                plan.unchanged.append(metadata)
+        plan.stale = self.stale_slice(plan.unchanged, stored_metadata)
+        return plan
+
+    def plan_batch(
+        self, fresh_metadata: List[Metadata], stored_metadata: Dict[int, Dict]
+    ) -> CrawlPlan:
+        """plans one batch of a streamed catalogue, stale products are only
+        collected and handed out by take_stale once every batch was planned"""
+        plan = CrawlPlan()
+        cutoff = self.stale_cutoff()
+        for metadata in fresh_metadata:
+            stored = stored_metadata.get(metadata.page_id)
+            if stored is None:
+                plan.new.append(metadata)
+            elif self.is_changed(metadata, stored):
+                plan.changed.append(metadata)
+            else:
+                plan.unchanged.append(metadata)
+                changed_at = self.parse_changed_at(stored.get(CHANGED_AT))
+                if changed_at is None or changed_at < cutoff:
+                    self.offer_stale(changed_at, metadata)
+        return plan
+
+    def offer_stale(self, changed_at: datetime | None, metadata: Metadata) -> None:
+        if self.stale_limit <= 0:
+            return
+        age = changed_at.timestamp() if changed_at else float("-inf")
+        candidate = (-age, -metadata.page_id, metadata)
+        if len(self.stale_candidates) < self.stale_limit:
+            heapq.heappush(self.stale_candidates, candidate)
+        elif candidate > self.stale_candidates[0]:
+            heapq.heapreplace(self.stale_candidates, candidate)
+
+    def take_stale(self) -> List[Metadata]:
+        """oldest stale products across all planned batches, oldest first"""
+        stale = [
+            metadata for *_, metadata in sorted(self.stale_candidates, reverse=True)
+        ]
+        self.stale_candidates = []
+        return stale
+
+    def stale_cutoff(self) -> datetime:
+        return datetime.now(timezone.utc) - timedelta(days=self.stale_after_days)
+
+    def is_changed(self, metadata: Metadata, stored: Dict) -> bool:
+        stored_price = stored.get(PRICE)
+        if stored_price is None or abs(float(stored_price) - metadata.price) > 0.005:
+            return True
+        return (
+            stored.get(NAME) != metadata.name
+            or stored.get(DETAIL_LINK) != metadata.detail_link
+        )
+
+    def stale_slice(
+        self, unchanged: List[Metadata], stored_metadata: Dict[int, Dict]
+    ) -> List[Metadata]:
+        """oldest unchanged products past the refresh age, capped at stale_limit"""
+        cutoff = self.stale_cutoff()
+        stale = []
+        for metadata in unchanged:
+            changed_at = self.parse_changed_at(
+                stored_metadata[metadata.page_id].get(CHANGED_AT)
+            )
+            if changed_at is None or changed_at < cutoff:
+                stale.append(
+                    (changed_at or datetime.min.replace(tzinfo=timezone.utc), metadata)
+                )
+        stale.sort(key=lambda item: item[0])
+        return [metadata for _, metadata in stale[: self.stale_limit]]
+
+    @staticmethod
+    def parse_changed_at(changed_at) -> datetime | None:
+        if not changed_at:
+            return None
+        if isinstance(changed_at, datetime):
+            parsed = changed_at
+        else:
+            try:
+                parsed = datetime.fromisoformat(changed_at)
+            except ValueError:
+                return None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return parsed
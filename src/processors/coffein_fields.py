@@ -0,0 +1,23 @@
+from processors.field_extractor import FieldExtractor, FieldSpec
+
+VARIETY = "variety"
+REGION = "region"
+FARM = "farm"
+ALTITUDE = "altitude"
+PROCESSING = "processing"
+ROAST_SHADE = "roast_shade"
+PACKAGE_SIZE = "package_size"
+BUY_COUNT = "buy_count"
+
+COFFEEIN_FIELDS = FieldExtractor(
+    [
+        FieldSpec(VARIETY, "ODRODA:"),
+        FieldSpec(REGION, "REGIÓN:"),
+        FieldSpec(FARM, "FARMA:"),
+        FieldSpec(ALTITUDE, "NADMORSKÁ VÝŠKA:"),
+        FieldSpec(PROCESSING, "SPRACOVANIE:"),
+        FieldSpec(ROAST_SHADE, "Odtieň praženia:", stops=("Veľkosť", "Metóda")),
+        FieldSpec(PACKAGE_SIZE, "Veľkosť balenia:"),
+        FieldSpec(BUY_COUNT, "Upražené a vypité:", value_pattern=r"(\d+)x"),
+    ]
+)
@@ -2,6 +2,19 @@ from bs4 import BeautifulSoup
 import re
 from typing import List, Union
 from processors.processor_interface import Processor
+from processors.coffein_fields import (
+    ALTITUDE,
+    BUY_COUNT,
+    FARM,
+    PACKAGE_SIZE,
+    PROCESSING,
+    REGION,
+    ROAST_SHADE,
+    VARIETY,
+)
+from processors.js_literal import parse_array
+from processors.page_context import CoffeeinPageContext
+from processors.product_filter import ProductFilter
 from errors.crawler_error import ProcessorError
 import unidecode
 from models.metadata import Metadata
@@ -11,16 +24,17 @@ from models.page import PageType
 from assets.constants import (
     DIV,
     SPAN,
-    SCRIPT,
     UNKNONW,
-    H1,
-    DESCRIPTION,
     SWEETNEST_COFFEEIN,
     ACIDITY_COFFEEIN,
     BITTERNESS_COFFEEIN,
     BODY_COFFEIN,
+    SKIPPED_BLEND,
+    SKIPPED_IGNORED,
 )
 
+ITEMS_KEY = re.compile(r"""["']?items["']?\s*:\s*\[""")
+
 
 class CoffeeinProcessor(Processor):
     ignored_coffees = None
@@ -28,12 +42,37 @@ class CoffeeinProcessor(Processor):
     def __init__(self, ignored_coffees: List[str] = None) -> None:
         super().__init__()
         self.ignored_coffees = ignored_coffees or []
+        self.product_filter = ProductFilter(ignored=self.ignored_coffees)
 
     def process_metadata(self, metadata_soup: BeautifulSoup) -> List[Metadata]:
         page_items = self.get_items(metadata_soup)
         metadata_list = self.get_metadata(page_items)
         return metadata_list
 
+    def process_listing(self, html: str | bytes) -> List[Metadata]:
+        return self.get_metadata(self.get_raw_items(html))
+
+    def get_raw_items(self, html: str | bytes) -> List[dict]:
+        """reads the item array of the view_item_list push straight from the
+        page, bytes are decoded only from that script on"""
+        if isinstance(html, bytes):
+            marker = html.find(b"view_item_list")
+            end = html.find(b"</script>", marker)
+            script = html[marker : end if end != -1 else None].decode(
+                "utf-8", "replace"
+            )
+        else:
+            marker = html.find("view_item_list")
+            end = html.find("</script>", marker)
+            script = html[marker : end if end != -1 else None]
+        items = ITEMS_KEY.search(script) if marker != -1 else None
+        if not items:
+            raise ProcessorError("Failed to find product data in script tags")
+        try:
+            return parse_array(script, items.end() - 1)
+        except ValueError as e:
+            raise ProcessorError(f"Failed to parse items: {str(e)}")
+
     def get_items(self, soup: BeautifulSoup) -> List[dict]:
         scripts = soup.find_all("script")
         for script in scripts:
@@ -57,6 +96,7 @@ class CoffeeinProcessor(Processor):
 
     def get_metadata(self, items: List[dict]) -> Union[List[Metadata], None]:
         metadata_list = []
+        seen_page_ids = set()
         for item in items:
             name_unfiltered = item.get("item_name")
             decoded_name = name_unfiltered.encode("utf-8").decode("unicode_escape")
@@ -74,36 +114,36 @@ class CoffeeinProcessor(Processor):
                 price=float(item.get("price")),
             )
 
-            if metadata not in metadata_list and not self.is_ignored_coffee(
-                metadata.name
-            ):
+            if self.is_ignored_coffee(metadata.name):
+                self.skipped[SKIPPED_IGNORED] += 1
+            elif metadata.page_id not in seen_page_ids:
+                seen_page_ids.add(metadata.page_id)
                 metadata_list.append(metadata)
 
         return metadata_list
 
     def is_ignored_coffee(self, coffe_name: str) -> bool:
-        for ignore_coffe in self.ignored_coffees:
-            if ignore_coffe.lower() in coffe_name.lower():
-                return True
-        return False
+        return self.product_filter.is_ignored(coffe_name)
 
     def process_coffee(self, coffee_soup: BeautifulSoup) -> Coffee | None:
-        name = coffee_soup.find(H1, itemprop="name").text.strip()
-        price = float(coffee_soup.find(SPAN, class_="product_price").get("content"))
-
-        species = self.handle_species(coffee_soup)
-        page_id = self.handle_page_id(coffee_soup)
-        weight = self.handle_size(name, coffee_soup)
-        popularity = self.handle_popularity(coffee_soup)
-        decaf = self.handle_decaf(name, coffee_soup)
-        if species.arabica == 100 or species.robusta == 100:
-            origin = self.handle_origin(coffee_soup)
-            taste = self.handle_taste(coffee_soup)
-        else:
+        page = CoffeeinPageContext(coffee_soup)
+        name = page.name
+        price = page.price
+
+        species = self.handle_species(page)
+        if not (species.arabica == 100 or species.robusta == 100):
+            self.skipped[SKIPPED_BLEND] += 1
             return None
-            # origin = self.handle_mixed_origin(coffee_soup)
-            # taste = self.handle_mixed_taste(coffee_soup)
+            # origin = self.handle_mixed_origin(page)
+            # taste = self.handle_mixed_taste(page)
+
         # Extract page_id from script tags
+        page_id = self.handle_page_id(page)
+        weight = self.handle_size(name, page)
+        popularity = self.handle_popularity(page)
+        decaf = self.handle_decaf(name, page)
+        origin = self.handle_origin(page)
+        taste = self.handle_taste(page, species)
 
         return Coffee(
             id=page_id,
@@ -117,11 +157,9 @@ class CoffeeinProcessor(Processor):
             decaf=decaf,
         )
 
-    def handle_page_id(self, coffee_soup: BeautifulSoup) -> int | None:
+    def handle_page_id(self, page: CoffeeinPageContext) -> int | None:
         page_id = None
-        scripts = coffee_soup.find_all(SCRIPT)
-        for script in scripts:
-            script_text = script.string if script.string else ""
+        for script_text in page.scripts:
             if "'item_id': " in script_text:
                 match = re.search(r"'item_id': '(\d+)'", script_text)
                 if match:
@@ -134,11 +172,11 @@ class CoffeeinProcessor(Processor):
                     break
         return page_id
 
-    def handle_taste(self, coffee_soup: BeautifulSoup) -> Taste:
-        taste_ratings = self.handle_taste_ratings(coffee_soup)
-        roast_shade = self.handle_roast_shade(coffee_soup)
-        flavor_profile = self.handle_flavor_profile(coffee_soup)
-        processing = self.handel_processing(coffee_soup)
+    def handle_taste(self, page: CoffeeinPageContext, species: Species) -> Taste:
+        taste_ratings = self.handle_taste_ratings(page)
+        roast_shade = self.handle_roast_shade(page)
+        flavor_profile = self.handle_flavor_profile(page)
+        processing = self.handel_processing(page)
 
         return Taste(
             body=taste_ratings[BODY_COFFEIN],
@@ -148,18 +186,20 @@ class CoffeeinProcessor(Processor):
             roast_shade=roast_shade,
             processing=processing,
             flavor_profile=flavor_profile,
-            species=self.handle_species(coffee_soup),
+            species=species,
         )
 
-    def handel_processing(self, coffee_soup: BeautifulSoup) -> str | None:
-        processing = None
-        if match := re.search(r"SPRACOVANIE:\s*(.+)", coffee_soup.text):
-            processing = match.group(1).strip()
-        return processing
+    def handel_processing(self, page: CoffeeinPageContext) -> str | None:
+        # the label lives in the long description, avoid serialising the whole page
+        return (
+            page.long_desc_fields.get(PROCESSING)
+            or page.description_fields.get(PROCESSING)
+            or page.full_text_fields.get(PROCESSING)
+        )
 
-    def handle_flavor_profile(self, coffee_soup: BeautifulSoup) -> list:
+    def handle_flavor_profile(self, page: CoffeeinPageContext) -> list:
         flavor_profile = []
-        for div in coffee_soup.find_all(DIV, class_="recommended_preparation"):
+        for div in page.recommended_preparation:
             spans = div.find_all(SPAN, recursive=False)
             for span in spans:
                 text = span.get_text().strip()
@@ -167,19 +207,10 @@ class CoffeeinProcessor(Processor):
                     flavor_profile.append(text)
         return flavor_profile
 
-    def handle_roast_shade(self, coffee_soup: BeautifulSoup) -> str:
-        roast_shade = None
-        description = coffee_soup.find("p", itemprop=DESCRIPTION)
-        if description and (
-            match := re.search(r"Odtieň praženia:\s*([^<\n]+)", description.text)
-        ):
-            roast_shade_text = match.group(1).strip()
-            # Extract just the roast shade by splitting at common delimiters
-            roast_shade = roast_shade_text.split("Veľkosť")[0].strip()
-            roast_shade = roast_shade.split("Metóda")[0].strip()
-        return roast_shade
+    def handle_roast_shade(self, page: CoffeeinPageContext) -> str:
+        return page.description_fields.get(ROAST_SHADE)
 
-    def handle_taste_ratings(self, coffee_soup: BeautifulSoup) -> dict:
+    def handle_taste_ratings(self, page: CoffeeinPageContext) -> dict:
         taste_ratings = {
             "telo": UNKNONW,
             "horkosť": UNKNONW,
@@ -187,7 +218,7 @@ class CoffeeinProcessor(Processor):
             "sladkosť": UNKNONW,
         }
 
-        for param in coffee_soup.find_all(DIV, class_="speci_param"):
+        for param in page.speci_params:
             param_name = param.find(DIV, class_="speci_param_name")
             if param_name:
                 name = param_name.text.strip().lower()
@@ -202,26 +233,22 @@ class CoffeeinProcessor(Processor):
                         taste_ratings[name] = percentage
         return taste_ratings
 
-    def handle_species(self, coffee_soup: BeautifulSoup) -> Species:
-        description = coffee_soup.find("p", itemprop="description")
-
-        species = self.handle_species_description(description)
+    def handle_species(self, page: CoffeeinPageContext) -> Species:
+        species = self.handle_species_description(page.description_lower)
         if species:
             return species
 
-        species = self.handle_species_tags(description)
+        species = self.handle_species_tags(page.description_strong_texts)
         if species:
             return species
 
         return Species(arabica=0, robusta=0)
 
-    def handle_species_description(self, description) -> Species | None:
+    def handle_species_description(self, description_lower: str) -> Species | None:
         arabica_percent = None
         robusta_percent = None
-        arabica_match = re.search(
-            r"(\d+)\s*%\s*(arabika|arabica)", description.text.lower()
-        )
-        robusta_match = re.search(r"(\d+)\s*%\s*robusta", description.text.lower())
+        arabica_match = re.search(r"(\d+)\s*%\s*(arabika|arabica)", description_lower)
+        robusta_match = re.search(r"(\d+)\s*%\s*robusta", description_lower)
 
         if arabica_match:
             arabica_percent = int(arabica_match.group(1))
@@ -235,57 +262,30 @@ class CoffeeinProcessor(Processor):
 
         return Species(arabica=arabica_percent, robusta=robusta_percent)
 
-    def handle_species_tags(self, description) -> Species | None:
+    def handle_species_tags(self, strong_texts: list[str]) -> Species | None:
         arabica_percent = None
         robusta_percent = None
 
-        if description:
-            strong_tags = description.find_all("strong")
-            for strong in strong_tags:
-                strong_text = strong.text.strip().lower()
-                arabica_match = re.search(r"(\d+)\s*%\s*(arabika|arabica)", strong_text)
-                robusta_match = re.search(r"(\d+)\s*%\s*robusta", strong_text)
-
-                if arabica_match:
-                    arabica_percent = int(arabica_match.group(1))
-                if robusta_match:
-                    robusta_percent = int(robusta_match.group(1))
+        for strong_text in strong_texts:
+            arabica_match = re.search(r"(\d+)\s*%\s*(arabika|arabica)", strong_text)
+            robusta_match = re.search(r"(\d+)\s*%\s*robusta", strong_text)
+
+            if arabica_match:
+                arabica_percent = int(arabica_match.group(1))
+            if robusta_match:
+                robusta_percent = int(robusta_match.group(1))
         if arabica_percent and robusta_percent:
             return Species(arabica=arabica_percent, robusta=robusta_percent)
         else:
             return None
 
-    def handle_origin(self, coffee_soup: BeautifulSoup) -> Origin:
-        origin_region = None
-        origin_farm = None
-        origin_altitude = None
-        origin_variety = None
-
-        additional_info = coffee_soup.find("div", class_="long_desc_desc")
-        if additional_info:
-            additional_text = additional_info.text
-
-            origin_match = re.search(r"ODRODA:\s*(.+)", additional_text)
-            if origin_match:
-                origin_variety = origin_match.group(1).strip()
-
-            region_match = re.search(r"REGIÓN:\s*(.+)", additional_text)
-            if region_match:
-                origin_region = region_match.group(1).strip()
-
-            farm_match = re.search(r"FARMA:\s*(.+)", additional_text)
-            if farm_match:
-                origin_farm = farm_match.group(1).strip()
-
-            altitude_match = re.search(r"NADMORSKÁ VÝŠKA:\s*(.+)", additional_text)
-            if altitude_match:
-                origin_altitude = altitude_match.group(1).strip()
-
+    def handle_origin(self, page: CoffeeinPageContext) -> Origin:
+        origin_fields = page.long_desc_fields
         return Origin(
-            region=origin_region,
-            farm=origin_farm,
-            altitude=origin_altitude,
-            variety=origin_variety,
+            region=origin_fields.get(REGION),
+            farm=origin_fields.get(FARM),
+            altitude=origin_fields.get(ALTITUDE),
+            variety=origin_fields.get(VARIETY),
         )
 
     def extract_weight_in_grams(self, text):
@@ -299,7 +299,7 @@ class CoffeeinProcessor(Processor):
         else:
             return int(number)
 
-    def handle_size(self, name: str, coffee_soup: BeautifulSoup) -> int:
+    def handle_size(self, name: str, page: CoffeeinPageContext) -> int:
         if "(1000 g" in name:
             return 1000
         elif "(500 g" in name:
@@ -308,18 +308,16 @@ class CoffeeinProcessor(Processor):
             return 200
         elif "(100 g" in name:
             return 100
-        description = coffee_soup.find("p", itemprop=DESCRIPTION)
-        if description:
-            size_match = re.search(r"Veľkosť balenia:\s*([^<\n]+)", description.text)
-            if size_match:
-                return self.extract_weight_in_grams(size_match.group(1).strip())
+        package_size = page.description_fields.get(PACKAGE_SIZE)
+        if package_size:
+            return self.extract_weight_in_grams(package_size)
 
-    def handle_popularity(self, coffee_soup: BeautifulSoup) -> Popularity:
+    def handle_popularity(self, page: CoffeeinPageContext) -> Popularity:
         reviews = []
         review_score = 0.0
         buy_count = 0
 
-        review_section = coffee_soup.find(DIV, id="ranks_box")
+        review_section = page.ranks_box
         if review_section:
             for review_item in review_section.find_all("li", itemprop="review"):
                 review_text_div = review_item.find(DIV, class_="rank_right")
@@ -330,28 +328,21 @@ class CoffeeinProcessor(Processor):
             if rating_value:
                 review_score = float(rating_value.get("content", "0")) * 20
 
-        popis_date_data = coffee_soup.find(DIV, class_="popis_date_data")
-        if popis_date_data:
-            popularity_text = popis_date_data.text
-            popularity_match = re.search(
-                r"Upražené a vypité:\s*(\d+)x", popularity_text
-            )
-            if popularity_match:
-                buy_count = int(popularity_match.group(1))
+        if buy_count_text := page.popis_date_fields.get(BUY_COUNT):
+            buy_count = int(buy_count_text)
 
         return Popularity(
-            reviews=reviews, review_score=int(review_score), buy_count=buy_count
+            reviews=tuple(reviews), review_score=int(review_score), buy_count=buy_count
         )
 
-    def handle_decaf(self, name: str, coffee_soup: BeautifulSoup) -> bool:
-        description = coffee_soup.find("p", itemprop=DESCRIPTION)
+    def handle_decaf(self, name: str, page: CoffeeinPageContext) -> bool:
         is_decaf = False
         if "BEZKOFEINOVÁ" in name.upper() or "BEZKOFEÍNOVÁ" in name.upper():
             is_decaf = True
         else:
-            if description and (
-                "bezkofeinová" in description.text.lower()
-                or "bezkofeínová" in description.text.lower()
+            if page.description and (
+                "bezkofeinová" in page.description_lower
+                or "bezkofeínová" in page.description_lower
             ):
                 is_decaf = True
 
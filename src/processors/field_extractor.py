@@ -0,0 +1,106 @@
+import re
+from dataclasses import dataclass, field as dataclass_field
+from typing import Iterable, Optional
+
+
+@dataclass(frozen=True)
+class FieldSpec:
+    name: str
+    label: str
+    # applied to the text after the label, the first group (or whole match) is kept
+    value_pattern: Optional[str] = None
+    # words that end the value even when they are not labels themselves
+    stops: tuple[str, ...] = ()
+    compiled_pattern: Optional[re.Pattern] = dataclass_field(
+        init=False, repr=False, compare=False, default=None
+    )
+
+    def __post_init__(self) -> None:
+        if self.value_pattern:
+            object.__setattr__(self, "compiled_pattern", re.compile(self.value_pattern))
+
+    def clean(self, raw_value: str) -> str | None:
+        value = raw_value
+        for stop in self.stops:
+            value = value.split(stop)[0]
+        value = value.strip()
+        if self.compiled_pattern:
+            match = self.compiled_pattern.match(value)
+            if not match:
+                return None
+            value = match.group(1) if match.groups() else match.group(0)
+        return value or None
+
+
+class FieldExtractor:
+    """Finds every labelled value of a text block in a single scan.
+
+    Labels all end with the same delimiter, so the scan only jumps between
+    delimiter occurrences (str.find) and checks which label precedes each one.
+    A value runs until the end of its line or the next known label."""
+
+    def __init__(self, fields: Iterable[FieldSpec], delimiter: str = ":") -> None:
+        self.delimiter = delimiter
+        self.fields = {}
+        for field in fields:
+            if not field.label.endswith(delimiter):
+                raise ValueError(f"Label {field.label!r} must end with {delimiter!r}")
+            self.fields[field.label] = field
+        # labels are bucketed by their shortest common suffix, so each delimiter
+        # costs one slice and one dict lookup
+        self.suffix_length = min(len(label) for label in self.fields)
+        self.labels_by_suffix: dict[str, list[str]] = {}
+        for label in sorted(self.fields, key=len, reverse=True):
+            suffix = label[-self.suffix_length :]
+            self.labels_by_suffix.setdefault(suffix, []).append(label)
+
+    def extract(self, text: str | None) -> dict[str, str]:
+        values = {}
+        if not text:
+            return values
+        delimiter = self.delimiter
+        suffix_length = self.suffix_length
+        pending_field = None
+        pending_start = 0
+
+        position = text.find(delimiter)
+        while position != -1:
+            label_end = position + len(delimiter)
+            for label in self.labels_by_suffix.get(
+                text[label_end - suffix_length : label_end], ()
+            ):
+                if text.endswith(label, 0, label_end):
+                    if pending_field is not None:
+                        self.store(
+                            values,
+                            pending_field,
+                            text,
+                            pending_start,
+                            label_end - len(label),
+                        )
+                    field = self.fields[label]
+                    # the first occurrence with a value wins, like re.search
+                    pending_field = None if field.name in values else field
+                    pending_start = label_end
+                    break
+            position = text.find(delimiter, label_end)
+
+        if pending_field is not None:
+            self.store(values, pending_field, text, pending_start, len(text))
+        return values
+
+    def store(
+        self, values: dict, field: FieldSpec, text: str, start: int, limit: int
+    ) -> None:
+        end = text.find("\n", start, limit)
+        if end == -1:
+            end = limit
+        elif not text[start:end].strip():
+            # like \s* in a regex, the value may start on a following line
+            start = limit - len(text[start:limit].lstrip())
+            end = text.find("\n", start, limit)
+            if end == -1:
+                end = limit
+        value = field.clean(text[start:end])
+        if value is not None:
+            values[field.name] = value
@@ -0,0 +1,76 @@
+import json
+import re
+
+DECODER = json.JSONDecoder()
+# the parts of a JavaScript literal that are not JSON yet, double quoted
+# strings are matched only so nothing inside them gets rewritten
+TOKEN = re.compile(
+    r"""
+    (?P<string>"[^"\\]*(?:\\.[^"\\]*)*")
+    | '(?P<single>[^'\\]*(?:\\.[^'\\]*)*)'
+    | (?P<comma>,)(?=\s*[\]}])
+    | (?P<key>[A-Za-z_$][\w$]*)(?=\s*:)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+SINGLE_QUOTED_ESCAPE = re.compile(r"\\(?:x([0-9a-fA-F]{2})|(.))|\"", re.DOTALL)
+DOUBLE_QUOTED = re.compile(r'"[^"]*"')
+TRAILING_COMMA = re.compile(r",(\s*[\]}])")
+
+
+def parse_array(text: str, start: int) -> list:
+    """parses the JavaScript array literal opening at text[start], tolerating
+    single quoted strings, bare keys and trailing commas, the way sites write
+    their dataLayer pushes, anything after the closing bracket is ignored"""
+    if text[start : start + 1] != "[":
+        raise ValueError(f"No array at position {start}")
+    literal = text[start:]
+    if "\\" not in literal:
+        try:
+            return quote_swap(literal)
+        except ValueError:
+            pass
+    return DECODER.raw_decode(TOKEN.sub(to_json, literal))[0]
+
+
+def quote_swap(literal: str) -> list:
+    """the usual case without escapes, where turning every single quote into a
+    double quote is enough, in C speed string operations only, ValueError
+    when a string holds the other kind of quote or the result is no JSON"""
+    single = "".join(literal.split("'")[1::2])
+    double = "".join(DOUBLE_QUOTED.findall(literal))
+    if '"' in single or "'" in double:
+        raise ValueError("Quotes inside strings")
+    if TRAILING_COMMA.search(single) or TRAILING_COMMA.search(double):
+        raise ValueError("Trailing comma lookalike inside a string")
+    swapped = literal.replace("'", '"')
+    return DECODER.raw_decode(TRAILING_COMMA.sub(r"\1", swapped))[0]
+
+
+def to_json(match: re.Match) -> str:
+    kind = match.lastgroup
+    if kind == "single":
+        return json_string(match.group("single"))
+    if kind == "key":
+        return f'"{match.group()}"'
+    if kind == "comma":
+        return ""
+    return match.group()
+
+
+def json_string(content: str) -> str:
+    """the JSON form of a single quoted string's content"""
+    if "\\" not in content and '"' not in content:
+        return f'"{content}"'
+    return f'"{SINGLE_QUOTED_ESCAPE.sub(json_escape, content)}"'
+
+
+def json_escape(match: re.Match) -> str:
+    if match.group(1):
+        return f"\\u00{match.group(1)}"
+    escaped = match.group(2)
+    if escaped is None:
+        return '\\"'
+    if escaped == "'":
+        return "'"
+    return match.group()
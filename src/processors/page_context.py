@@ -0,0 +1,125 @@
+from collections import defaultdict
+from functools import cached_property
+
+from bs4 import BeautifulSoup, Tag
+
+from assets.constants import DESCRIPTION, DIV, H1, SCRIPT, SPAN
+from processors.coffein_fields import COFFEEIN_FIELDS
+from processors.field_extractor import FieldExtractor
+
+DIV_CLASSES = frozenset(
+    {"speci_param", "long_desc_desc", "recommended_preparation", "popis_date_data"}
+)
+
+
+class CoffeeinPageContext:
+    """Finds each node of a coffeein detail page the processor reads, and its
+    text, at most once per page"""
+
+    def __init__(
+        self, soup: BeautifulSoup, field_extractor: FieldExtractor = COFFEEIN_FIELDS
+    ) -> None:
+        self.soup = soup
+        self.field_extractor = field_extractor
+
+    @cached_property
+    def nodes(self) -> dict[str, list[Tag]]:
+        """every relevant node in document order, collected in one walk"""
+        nodes = defaultdict(list)
+        for element in self.soup.descendants:
+            name = element.name
+            if name == SCRIPT:
+                nodes[SCRIPT].append(element)
+            elif name == DIV:
+                if element.get("id") == "ranks_box":
+                    nodes["ranks_box"].append(element)
+                for class_name in element.get("class") or ():
+                    if class_name in DIV_CLASSES:
+                        nodes[class_name].append(element)
+            elif name == H1 and element.get("itemprop") == "name":
+                nodes[H1].append(element)
+            elif name == "p" and element.get("itemprop") == DESCRIPTION:
+                nodes[DESCRIPTION].append(element)
+            elif name == SPAN and "product_price" in (element.get("class") or ()):
+                nodes["product_price"].append(element)
+        return nodes
+
+    def first(self, key: str) -> Tag | None:
+        found = self.nodes.get(key)
+        return found[0] if found else None
+
+    @cached_property
+    def name(self) -> str:
+        return self.first(H1).text.strip()
+
+    @cached_property
+    def price(self) -> float:
+        return float(self.first("product_price").get("content"))
+
+    @cached_property
+    def description(self) -> Tag | None:
+        return self.first(DESCRIPTION)
+
+    @cached_property
+    def description_text(self) -> str:
+        return self.description.text if self.description else ""
+
+    @cached_property
+    def description_lower(self) -> str:
+        return self.description_text.lower()
+
+    @cached_property
+    def description_strong_texts(self) -> list[str]:
+        if not self.description:
+            return []
+        return [
+            strong.text.strip().lower()
+            for strong in self.description.find_all("strong")
+        ]
+
+    @cached_property
+    def scripts(self) -> list[str]:
+        return [script.string or "" for script in self.nodes.get(SCRIPT, [])]
+
+    @cached_property
+    def speci_params(self) -> list[Tag]:
+        return self.nodes.get("speci_param", [])
+
+    @cached_property
+    def recommended_preparation(self) -> list[Tag]:
+        return self.nodes.get("recommended_preparation", [])
+
+    @cached_property
+    def long_desc_text(self) -> str | None:
+        additional_info = self.first("long_desc_desc")
+        return additional_info.text if additional_info else None
+
+    @cached_property
+    def ranks_box(self) -> Tag | None:
+        return self.first("ranks_box")
+
+    @cached_property
+    def popis_date_text(self) -> str | None:
+        popis_date_data = self.first("popis_date_data")
+        return popis_date_data.text if popis_date_data else None
+
+    @cached_property
+    def description_fields(self) -> dict[str, str]:
+        return self.field_extractor.extract(self.description_text)
+
+    @cached_property
+    def long_desc_fields(self) -> dict[str, str]:
+        return self.field_extractor.extract(self.long_desc_text)
+
+    @cached_property
+    def popis_date_fields(self) -> dict[str, str]:
+        return self.field_extractor.extract(self.popis_date_text)
+
+    @cached_property
+    def full_text_fields(self) -> dict[str, str]:
+        return self.field_extractor.extract(self.full_text)
+
+    @cached_property
+    def full_text(self) -> str:
+        """serialises the whole document, only use as a last resort"""
+        return self.soup.text
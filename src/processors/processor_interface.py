@@ -1,14 +1,25 @@
 from abc import ABC, abstractmethod
+from collections import Counter
+from typing import List
 from models.metadata import Metadata
 from models.coffee import Coffee
 from bs4 import BeautifulSoup
 
 
 class Processor(ABC):
+    def __init__(self) -> None:
+        # products dropped on purpose, keyed by reason (e.g. ignored, blend)
+        self.skipped: Counter[str] = Counter()
+
     @abstractmethod
     def process_metadata(self, metadata_soup: BeautifulSoup) -> Metadata:
         """Process unstrucutured metadata to model Metadata"""
 
+    @abstractmethod
+    def process_listing(self, html: str | bytes) -> List[Metadata]:
+        """Process a raw listing page to model Metadata without building a DOM,
+        parsers read listings this way unless raw_listings is off"""
+
     @abstractmethod
     def process_coffee(self, coffe_soup: BeautifulSoup) -> Coffee:
         """Process unstructured coffe details to model Coffee"""
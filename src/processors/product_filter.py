@@ -0,0 +1,92 @@
+import re
+from collections import Counter
+from typing import Generator, Iterable, Optional
+
+from assets.constants import (
+    SKIPPED_IGNORED,
+    SKIPPED_KEYWORD,
+    SKIPPED_PRICE,
+    SKIPPED_WEIGHT,
+)
+from models.metadata import Metadata
+
+# package size shops put into product names, e.g. "Brazil Santos (1000 g)"
+WEIGHT_HINT = re.compile(r"\((\d+(?:[.,]\d+)?)\s*(kg|g)\b", re.IGNORECASE)
+
+
+def compile_words(words: Iterable[str]) -> Optional[re.Pattern]:
+    """one case insensitive regex matching any of the words, longest first"""
+    words = sorted({word for word in words if word}, key=len, reverse=True)
+    if not words:
+        return None
+    return re.compile("|".join(map(re.escape, words)), re.IGNORECASE)
+
+
+def weight_hint(name: str) -> Optional[int]:
+    """the package size in grams stated in a product name, None without one"""
+    match = WEIGHT_HINT.search(name)
+    if not match:
+        return None
+    number = float(match.group(1).replace(",", "."))
+    return int(number * 1000) if match.group(2).lower() == "kg" else int(number)
+
+
+class ProductFilter:
+    """Decides from listing data alone which products get a detail request.
+
+    Ignore words and keywords are compiled into one regex each, so a name is
+    scanned once however long the lists are. A product is kept only when it
+    matches no ignore word, at least one keyword (when any are given) and
+    lies within the price and weight bounds, names without a weight hint
+    pass the weight bounds."""
+
+    def __init__(
+        self,
+        ignored: Iterable[str] = (),
+        keywords: Iterable[str] = (),
+        min_price: float = None,
+        max_price: float = None,
+        min_weight: int = None,
+        max_weight: int = None,
+    ) -> None:
+        self.ignored = compile_words(ignored)
+        self.keywords = compile_words(keywords)
+        self.min_price = min_price
+        self.max_price = max_price
+        self.min_weight = min_weight
+        self.max_weight = max_weight
+
+    def is_ignored(self, name: str) -> bool:
+        return self.ignored is not None and self.ignored.search(name) is not None
+
+    def rejects(self, metadata: Metadata) -> Optional[str]:
+        """the reason the product is skipped, None when it is kept"""
+        name = metadata.name
+        if self.is_ignored(name):
+            return SKIPPED_IGNORED
+        if self.keywords is not None and not self.keywords.search(name):
+            return SKIPPED_KEYWORD
+        price = metadata.price
+        if (self.min_price is not None and price < self.min_price) or (
+            self.max_price is not None and price > self.max_price
+        ):
+            return SKIPPED_PRICE
+        if self.min_weight is not None or self.max_weight is not None:
+            weight = weight_hint(name)
+            if weight is not None and (
+                (self.min_weight is not None and weight < self.min_weight)
+                or (self.max_weight is not None and weight > self.max_weight)
+            ):
+                return SKIPPED_WEIGHT
+        return None
+
+    def apply(
+        self, metadata: Iterable[Metadata], skipped: Counter
+    ) -> Generator[Metadata, None, None]:
+        """yields the kept products, counting the others per reason in skipped"""
+        for item in metadata:
+            reason = self.rejects(item)
+            if reason is None:
+                yield item
+            else:
+                skipped[reason] += 1
@@ -0,0 +1,159 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List
+
+from assets.constants import DETAIL_PAGE, LISTING_PAGE
+from database.rows import chunked
+from models.metadata import Metadata
+
+MEMORY = ":memory:"
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+FRONTIER_STATES = (DONE, PENDING, FAILED)
+
+
+class CrawlFrontier:
+    """Every page of a crawl with its state, attempt count and last error,
+    kept in SQLite and updated as pages complete, so a run that died halfway
+    can be resumed without fetching what it already finished.
+
+    Listing pages are done once processed. Detail pages are pending from the
+    moment they are scheduled and done once their coffee is written, or once
+    processed when they yield none (blends)."""
+
+    def __init__(self, path=MEMORY) -> None:
+        self.lock = threading.Lock()
+        if path != MEMORY and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.execute(
+                """CREATE TABLE IF NOT EXISTS frontier (
+                    url TEXT PRIMARY KEY,
+                    origin TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    page_id INTEGER,
+                    state TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    updated_at TEXT
+                )"""
+            )
+            self.connection.execute(
+                "CREATE INDEX IF NOT EXISTS frontier_page ON frontier (origin, page_id)"
+            )
+
+    def reset(self, origin: str) -> None:
+        """forgets the previous run of a site, a fresh run starts empty"""
+        with self.lock, self.connection:
+            self.connection.execute("DELETE FROM frontier WHERE origin = ?", (origin,))
+
+    def schedule(
+        self,
+        origin: str,
+        batch: Iterable[Metadata],
+        planned: Iterable[Metadata],
+        url_of: Callable[[Metadata], str],
+    ) -> List[Metadata]:
+        """the planned products plus the ones of batch a previous run left
+        pending or failed, without those it finished, recorded as pending"""
+        planned_urls = {url_of(item): item for item in planned}
+        items = {url_of(item): item for item in batch}
+        items.update(planned_urls)
+        states = self.states(items)
+        scheduled = {
+            url: item
+            for url, item in items.items()
+            if states.get(url) in (PENDING, FAILED)
+            or (url in planned_urls and states.get(url) != DONE)
+        }
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT INTO frontier (url, origin, kind, page_id, state, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (url) DO NOTHING",
+                [
+                    (url, origin, DETAIL_PAGE, item.page_id, PENDING, now())
+                    for url, item in scheduled.items()
+                ],
+            )
+        return list(scheduled.values())
+
+    def states(self, urls: Iterable[str]) -> Dict[str, str]:
+        states = {}
+        with self.lock:
+            for url_batch in chunked(list(urls), 500):
+                rows = self.connection.execute(
+                    "SELECT url, state FROM frontier "
+                    f"WHERE url IN ({', '.join('?' * len(url_batch))})",
+                    url_batch,
+                )
+                states.update(rows)
+        return states
+
+    def finish(self, origin: str, urls: Iterable[str]) -> None:
+        """pages done, urls not scheduled before are recorded as listing pages"""
+        self.record(origin, [(url, None) for url in urls], DONE)
+
+    def fail(self, origin: str, failures: Iterable[tuple[str, str]]) -> None:
+        """pages that could not be fetched, as (url, error) pairs"""
+        self.record(origin, failures, FAILED)
+
+    def record(
+        self, origin: str, outcomes: Iterable[tuple[str, str | None]], state: str
+    ) -> None:
+        updated_at = now()
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT INTO frontier "
+                "(url, origin, kind, state, attempts, last_error, updated_at) "
+                "VALUES (?, ?, ?, ?, 1, ?, ?) ON CONFLICT (url) DO UPDATE SET "
+                "state = excluded.state, attempts = attempts + 1, "
+                "last_error = excluded.last_error, updated_at = excluded.updated_at",
+                [
+                    (url, origin, LISTING_PAGE, state, error, updated_at)
+                    for url, error in outcomes
+                ],
+            )
+
+    def finish_coffees(self, origin: str, page_ids: Iterable[int]) -> None:
+        self.record_coffees(origin, page_ids, DONE, None)
+
+    def fail_coffees(self, origin: str, page_ids: Iterable[int], error: str) -> None:
+        self.record_coffees(origin, page_ids, FAILED, error)
+
+    def record_coffees(
+        self, origin: str, page_ids: Iterable[int], state: str, error: str | None
+    ) -> None:
+        updated_at = now()
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "UPDATE frontier SET state = ?, attempts = attempts + 1, "
+                "last_error = ?, updated_at = ? "
+                "WHERE origin = ? AND page_id = ? AND kind = ?",
+                [
+                    (state, error, updated_at, origin, page_id, DETAIL_PAGE)
+                    for page_id in page_ids
+                ],
+            )
+
+    def counts(self, origin: str) -> Dict[str, int]:
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT state, COUNT(*) FROM frontier WHERE origin = ? "
+                "AND kind = ? GROUP BY state",
+                (origin, DETAIL_PAGE),
+            )
+            return dict(rows.fetchall())
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+
+def now() -> str:
+    return datetime.now(timezone.utc).isoformat()
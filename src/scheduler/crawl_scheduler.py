@@ -0,0 +1,51 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Iterable, TypeVar
+
+from metrics.run_metrics import RunMetrics
+from models.site import Site
+
+T = TypeVar("T")
+
+
+class CrawlScheduler:
+    """Runs one task per site concurrently, each on its own thread, so the
+    run takes as long as the slowest site instead of the sum of all of them.
+
+    Sites are started highest priority first and their crawlers enforce their
+    own concurrency and request rate. A failing site does not stop the others,
+    its error is kept in errors."""
+
+    def __init__(self, sites: Iterable[Site], metrics: RunMetrics = None) -> None:
+        self.sites = sorted(sites, key=lambda site: -site.budget.priority)
+        self.metrics = metrics or RunMetrics()
+        self.errors: dict[str, Exception] = {}
+
+    def run(self, task: Callable[[Site], T]) -> dict[str, T]:
+        """returns the result of every site that finished, keyed by site name"""
+        results = {}
+        if not self.sites:
+            return results
+        with ThreadPoolExecutor(
+            max_workers=len(self.sites), thread_name_prefix="site"
+        ) as executor:
+            futures = {
+                executor.submit(self.run_site, task, site): site for site in self.sites
+            }
+            for future in as_completed(futures):
+                site = futures[future]
+                try:
+                    results[site.name] = future.result()
+                except Exception as e:
+                    self.errors[site.name] = e
+                    self.metrics.count("sites_failed", site=site.name)
+                    print(f"Crawling {site.name} failed: {e}")
+        return results
+
+    def run_site(self, task: Callable[[Site], T], site: Site) -> T:
+        started = time.perf_counter()
+        try:
+            return task(site)
+        finally:
+            elapsed = round(time.perf_counter() - started, 3)
+            self.metrics.set("site_duration_seconds", elapsed, site=site.name)
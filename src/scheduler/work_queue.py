@@ -0,0 +1,167 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List
+
+from assets.constants import WORK_QUEUE_PATH
+from models.metadata import Metadata
+from models.work_item import WorkItem
+
+QUEUED = "queued"
+LEASED = "leased"
+DONE = "done"
+DEAD = "dead"
+WORK_STATES = (QUEUED, LEASED, DONE, DEAD)
+
+
+class WorkQueue:
+    """Detail pages waiting to be crawled, shared by any number of worker
+    processes through one SQLite file, on one machine or on a shared volume
+    whose filesystem supports SQLite's locking.
+
+    Workers lease items for a while and ack them once their coffee is
+    stored. A lease that runs out, because its worker crashed or hangs, makes
+    the item available again, so nothing leased is lost. Items nacked or
+    expired max_attempts times are dead and keep their last error."""
+
+    def __init__(self, path=WORK_QUEUE_PATH, max_attempts=5) -> None:
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # transactions are explicit, leasing has to lock before it reads
+        self.connection = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS work (
+                id INTEGER PRIMARY KEY,
+                url TEXT NOT NULL UNIQUE,
+                metadata TEXT NOT NULL,
+                state TEXT NOT NULL,
+                owner TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT
+            )"""
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS work_state ON work (state, lease_expires)"
+        )
+
+    def enqueue(
+        self, metadata_list: Iterable[Metadata], url_of: Callable[[Metadata], str]
+    ) -> int:
+        """queues detail pages, a page already queued, leased or dead is
+        left alone, a done one is queued again, returns how many were queued"""
+        rows = [
+            (
+                url_of(metadata),
+                json.dumps(
+                    [
+                        metadata.page_id,
+                        metadata.origin,
+                        metadata.name,
+                        metadata.price,
+                        metadata.detail_link,
+                    ]
+                ),
+                QUEUED,
+            )
+            for metadata in metadata_list
+        ]
+        with self.transaction():
+            before = self.connection.total_changes
+            self.connection.executemany(
+                "INSERT INTO work (url, metadata, state) VALUES (?, ?, ?) "
+                "ON CONFLICT (url) DO UPDATE SET metadata = excluded.metadata, "
+                "state = excluded.state, owner = NULL, lease_expires = NULL, "
+                f"attempts = 0, last_error = NULL WHERE state = '{DONE}'",
+                rows,
+            )
+            return self.connection.total_changes - before
+
+    def lease(self, owner: str, limit: int, lease_seconds: float) -> List[WorkItem]:
+        """takes up to limit queued items, or items whose lease ran out"""
+        now = time.time()
+        with self.transaction():
+            self.connection.execute(
+                f"UPDATE work SET state = '{DEAD}', owner = NULL, "
+                "last_error = COALESCE(last_error, 'lease expired') "
+                f"WHERE state = '{LEASED}' AND lease_expires < ? AND attempts >= ?",
+                (now, self.max_attempts),
+            )
+            rows = self.connection.execute(
+                "SELECT id, url, metadata, attempts FROM work "
+                f"WHERE state = '{QUEUED}' "
+                f"OR (state = '{LEASED}' AND lease_expires < ?) "
+                "ORDER BY id LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            self.connection.executemany(
+                f"UPDATE work SET state = '{LEASED}', owner = ?, lease_expires = ?, "
+                "attempts = attempts + 1 WHERE id = ?",
+                [(owner, now + lease_seconds, row[0]) for row in rows],
+            )
+        return [
+            WorkItem(item_id, url, Metadata(*json.loads(metadata)), attempts + 1)
+            for item_id, url, metadata, attempts in rows
+        ]
+
+    def ack(self, owner: str, item_ids: Iterable[int]) -> None:
+        """items done, ignored for items whose lease went to another worker"""
+        with self.transaction():
+            self.connection.executemany(
+                f"UPDATE work SET state = '{DONE}', owner = NULL, "
+                "lease_expires = NULL, last_error = NULL "
+                f"WHERE id = ? AND owner = ? AND state = '{LEASED}'",
+                [(item_id, owner) for item_id in item_ids],
+            )
+
+    def nack(self, owner: str, failures: Dict[int, str]) -> None:
+        """items that failed with the given errors, queued again until they
+        used up max_attempts"""
+        with self.transaction():
+            self.connection.executemany(
+                "UPDATE work SET state = CASE WHEN attempts >= ? "
+                f"THEN '{DEAD}' ELSE '{QUEUED}' END, owner = NULL, "
+                "lease_expires = NULL, last_error = ? "
+                f"WHERE id = ? AND owner = ? AND state = '{LEASED}'",
+                [
+                    (self.max_attempts, error, item_id, owner)
+                    for item_id, error in failures.items()
+                ],
+            )
+
+    def counts(self) -> Dict[str, int]:
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT state, COUNT(*) FROM work GROUP BY state"
+            ).fetchall()
+        return dict(rows)
+
+    def has_work(self) -> bool:
+        """whether items are queued or leased, leased ones may still expire"""
+        counts = self.counts()
+        return counts.get(QUEUED, 0) + counts.get(LEASED, 0) > 0
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """BEGIN IMMEDIATE takes the write lock up front, so two workers never
+        read the same free items and both lease them"""
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+            self.connection.execute("COMMIT")
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,62 @@
+"""Run from src/: python -m unittest discover -s tests"""
+
+import unittest
+from unittest import mock
+
+from transport.aimd import AimdController
+
+
+class AimdControllerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.now = 100.0
+        clock = mock.patch("transport.aimd.time.monotonic", lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+        self.controller = AimdController(initial=4, minimum=1, maximum=5)
+
+    def test_fast_answers_add_one_request_per_round_trip(self) -> None:
+        self.controller.record(0.1, 200)
+        self.assertAlmostEqual(self.controller.limit, 4.25)
+        for _ in range(4):
+            self.controller.record(0.1, 200)
+        self.assertEqual(self.controller.allowed, 5)
+        for _ in range(20):
+            self.controller.record(0.1, 200)
+        self.assertEqual(self.controller.limit, 5)
+
+    def test_throttling_halves_the_limit_once_per_round_trip(self) -> None:
+        self.controller.record(0.5, 200)
+        self.now += 1
+        self.controller.record(0.5, 429)
+        self.assertAlmostEqual(self.controller.limit, 2.125)
+        # the other requests in flight report the same trouble
+        self.controller.record(0.5, 503)
+        self.assertAlmostEqual(self.controller.limit, 2.125)
+
+        self.now += 1
+        self.controller.record(0.5, 503)
+        self.controller.record(0.5, 404)
+        self.now += 1
+        self.controller.record(0.5, None)
+        self.assertEqual(self.controller.limit, 1)
+        self.assertEqual(
+            self.controller.back_offs, {"429": 1, "503": 1, "no_response": 1}
+        )
+
+    def test_latency_spike_backs_off(self) -> None:
+        self.controller.record(0.1, 200)
+        self.now += 1
+        self.controller.record(5.0, 200)
+        self.assertAlmostEqual(self.controller.limit, 2.125)
+        self.assertEqual(self.controller.back_offs, {"latency": 1})
+
+    def test_timeout_follows_the_usual_latency(self) -> None:
+        self.assertEqual(self.controller.timeout(30), 30)
+        self.controller.record(0.1, 200)
+        self.assertEqual(self.controller.timeout(30), 2.0)
+        self.controller.record(1.0, 200)
+        self.assertAlmostEqual(self.controller.timeout(30), 0.28 * 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
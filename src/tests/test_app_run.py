@@ -0,0 +1,165 @@
+"""Crawls the local stand-in shop with app.run into a temporary SQLite sink.
+
+Run from src/: python -m unittest discover -s tests
+"""
+
+import os
+import tempfile
+import unittest
+from argparse import Namespace
+
+from app import run
+from assets.constants import COFFEIN_MAIN_COFFE_PAGE, TABLE_COFFEE, TABLE_METADATA
+from benchmarks.stand_in_server import StandInCatalogue, StandInServer
+from crawlers.coffeein_crawler import CoffeeinCrawler
+from database.buffered_writer import BufferedCoffeeWriter
+from database.sqlite_db import SQLiteDB
+from models.page import PageType
+from models.site import Site
+from pipeline.page_pipeline import PagePipeline
+from processors.product_filter import ProductFilter
+from transport.http_cache import HttpCache
+
+
+class FlakyCatalogue(StandInCatalogue):
+    """answers 503 for the detail pages of the failing page_ids and for the
+    failing listing page numbers, and bytes that are no utf-8 for the detail
+    pages of the garbled page_ids"""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.failing: set[int] = set()
+        self.failing_listings: set[int] = set()
+        self.garbled: set[int] = set()
+
+    def serve(self, path: str) -> tuple[int, dict, bytes]:
+        detail = self.detail_regex.match(path)
+        listing = self.listing_regex.match(path)
+        if (detail and int(detail.group(1)) in self.failing) or (
+            listing and int(listing.group(1)) in self.failing_listings
+        ):
+            return 503, {}, b"Service Unavailable"
+        if detail and int(detail.group(1)) in self.garbled:
+            return 200, {}, b"\xff\xfe<html>\xc3\x28</html>"
+        return super().serve(path)
+
+
+def crawl(
+    url: str,
+    database: SQLiteDB,
+    product_filter: ProductFilter = None,
+    cache: HttpCache = None,
+):
+    crawler = CoffeeinCrawler(base_url=url, concurrency=4, retries=0, cache=cache)
+    site = Site(
+        PageType.COFFEEIN.name, PageType.COFFEEIN, crawler, COFFEIN_MAIN_COFFE_PAGE
+    )
+    args = Namespace(
+        stale_after_days=7, stale_limit=0, batch_size=50, full=False, resume=False
+    )
+    with (
+        PagePipeline([site], workers=0, product_filter=product_filter) as pipeline,
+        BufferedCoffeeWriter(database) as writer,
+    ):
+        run(args, site, pipeline, database, writer)
+    return site
+
+
+class CrawlTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.catalogue = FlakyCatalogue(products=120, blocks=2)
+        self.server = StandInServer(self.catalogue).start()
+        self.directory = tempfile.TemporaryDirectory()
+        self.database = SQLiteDB(os.path.join(self.directory.name, "coffee.sqlite"))
+
+    def tearDown(self) -> None:
+        self.database.close()
+        self.server.stop()
+        self.directory.cleanup()
+
+    def test_filtered_products_keep_their_rows(self) -> None:
+        crawl(self.server.url, self.database)
+        page_ids = {row["page_id"] for row in self.database.rows(TABLE_METADATA)}
+        self.assertEqual(len(page_ids), 120)
+
+        crawl(self.server.url, self.database, ProductFilter(keywords=["no such name"]))
+        kept = {row["page_id"] for row in self.database.rows(TABLE_METADATA)}
+        self.assertEqual(kept, page_ids)
+
+    def test_ignored_products_lose_their_rows(self) -> None:
+        crawl(self.server.url, self.database)
+        rows = self.database.rows(TABLE_METADATA)
+
+        crawl(self.server.url, self.database, ProductFilter(ignored=["Etiopia"]))
+        kept = {row["page_id"] for row in self.database.rows(TABLE_METADATA)}
+        ignored = {row["page_id"] for row in rows if "Etiopia" in row["name"]}
+        self.assertTrue(ignored)
+        self.assertEqual(kept, {row["page_id"] for row in rows} - ignored)
+
+    def test_failed_detail_pages_are_fetched_again(self) -> None:
+        coffees = [
+            product["page_id"]
+            for product in self.catalogue.products
+            if product["arabica"] == 100
+        ]
+        self.catalogue.failing = set(coffees[:5])
+        crawl(self.server.url, self.database)
+        stored = {row["page_id"] for row in self.database.rows(TABLE_METADATA)}
+        self.assertFalse(stored & self.catalogue.failing)
+
+        self.catalogue.failing = set()
+        crawl(self.server.url, self.database)
+        written = {row["page_id"] for row in self.database.rows(TABLE_COFFEE)}
+        self.assertEqual(written, set(coffees))
+
+    def test_a_page_that_cannot_be_read_fails_alone(self) -> None:
+        coffees = [
+            product["page_id"]
+            for product in self.catalogue.products
+            if product["arabica"] == 100
+        ]
+        self.catalogue.garbled = {coffees[0]}
+        site = crawl(self.server.url, self.database)
+        self.assertEqual(len(site.crawler.failures), 1)
+        stored = {row["page_id"] for row in self.database.rows(TABLE_METADATA)}
+        self.assertNotIn(coffees[0], stored)
+        written = {row["page_id"] for row in self.database.rows(TABLE_COFFEE)}
+        self.assertEqual(written, set(coffees[1:]))
+
+    def test_incomplete_listing_deletes_nothing(self) -> None:
+        crawl(self.server.url, self.database)
+        page_ids = {row["page_id"] for row in self.database.rows(TABLE_METADATA)}
+
+        self.catalogue.failing_listings = {2}
+        site = crawl(self.server.url, self.database)
+        self.assertTrue(site.crawler.listing_incomplete)
+        kept = {row["page_id"] for row in self.database.rows(TABLE_METADATA)}
+        self.assertEqual(kept, page_ids)
+
+    def test_failed_probe_marks_the_listing_incomplete(self) -> None:
+        crawler = CoffeeinCrawler(base_url=self.server.url, concurrency=4, retries=0)
+        listing_url = crawler.base_url + COFFEIN_MAIN_COFFE_PAGE
+        self.assertEqual(crawler.probe_last_page(listing_url), 5)
+        self.assertFalse(crawler.listing_incomplete)
+
+        self.catalogue.failing_listings = {4}
+        crawler.probe_last_page(listing_url)
+        self.assertTrue(crawler.listing_incomplete)
+
+    def test_cached_pages_are_processed_for_a_sink_without_them(self) -> None:
+        # without validators from the stand-in a ttl makes cached pages unchanged
+        cache = HttpCache(os.path.join(self.directory.name, "http.sqlite"), ttl=3600)
+        self.addCleanup(cache.close)
+        crawl(self.server.url, self.database, cache=cache)
+        expected = {row["page_id"] for row in self.database.rows(TABLE_COFFEE)}
+
+        fresh = SQLiteDB(os.path.join(self.directory.name, "fresh.sqlite"))
+        self.addCleanup(fresh.close)
+        site = crawl(self.server.url, fresh, cache=cache)
+        written = {row["page_id"] for row in fresh.rows(TABLE_COFFEE)}
+        self.assertEqual(written, expected)
+        self.assertEqual(site.crawler.unchanged, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+"""Run from src/: python -m unittest discover -s tests"""
+
+import unittest
+
+from database.buffered_writer import BufferedCoffeeWriter
+from database.fingerprint_store import FingerprintStore
+from database.memory_db import InMemoryDB
+from models.coffee import Coffee, Origin, Species, Taste
+
+
+def coffee(page: str, page_id: int) -> Coffee:
+    return Coffee(
+        id=page_id,
+        page=page,
+        name=f"{page} {page_id}",
+        price=9.9,
+        weight=250,
+        origin=Origin(region="Etiopia"),
+        taste=Taste(1, 2, 3, 4, "stredné", Species(100, 0)),
+        popularity=None,
+    )
+
+
+class BrokenFingerprintStore(FingerprintStore):
+    def get(self, keys):
+        raise OSError("disk I/O error")
+
+
+class BufferedWriterTest(unittest.TestCase):
+    def test_failed_flush_is_raised_by_sync(self) -> None:
+        store = BrokenFingerprintStore()
+        self.addCleanup(store.close)
+        writer = BufferedCoffeeWriter(InMemoryDB(), fingerprints=store)
+        writer.write(coffee("SHOP_A", 7))
+        with self.assertRaisesRegex(RuntimeError, "disk I/O error"):
+            writer.sync()
+        self.assertEqual(writer.report.failed, [("SHOP_A", 7)])
+
+        # the thread is still alive and the error is raised only once
+        writer.sync()
+        writer.close()
+
+    def test_rows_stored_before_count_as_changed_after_force_writes(self) -> None:
+        database = InMemoryDB()
+        store = FingerprintStore()
+        self.addCleanup(store.close)
+        with BufferedCoffeeWriter(database, fingerprints=store) as writer:
+            writer.write(coffee("SHOP_A", 7))
+            writer.sync()
+            writer.write(coffee("SHOP_A", 7))
+        self.assertEqual(writer.report.inserted, [("SHOP_A", 7)])
+        self.assertEqual(writer.report.unchanged, [("SHOP_A", 7)])
+
+        store.clear()
+        with BufferedCoffeeWriter(database, fingerprints=store) as writer:
+            writer.write(coffee("SHOP_A", 7))
+            writer.write(coffee("SHOP_B", 7))
+        self.assertEqual(writer.report.changed, [("SHOP_A", 7)])
+        self.assertEqual(writer.report.inserted, [("SHOP_B", 7)])
+
+
+if __name__ == "__main__":
+    unittest.main()
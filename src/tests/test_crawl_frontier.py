@@ -0,0 +1,58 @@
+"""Run from src/: python -m unittest discover -s tests"""
+
+import os
+import tempfile
+import unittest
+
+from models.metadata import Metadata
+from scheduler.crawl_frontier import DONE, FAILED, PENDING, CrawlFrontier
+
+ORIGIN = "SHOP_A"
+PRODUCTS = [Metadata(page_id, ORIGIN, "a", 9.9, "a") for page_id in range(1, 6)]
+
+
+def url_of(metadata: Metadata) -> str:
+    return f"https://example.com/detail/{metadata.page_id}/"
+
+
+class CrawlFrontierTest(unittest.TestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "frontier.sqlite")
+
+    def test_resume_fetches_only_what_the_last_run_did_not_finish(self) -> None:
+        frontier = CrawlFrontier(self.path)
+        frontier.reset(ORIGIN)
+        scheduled = frontier.schedule(ORIGIN, PRODUCTS, PRODUCTS[:4], url_of)
+        self.assertEqual(scheduled, PRODUCTS[:4])
+        frontier.finish_coffees(ORIGIN, [1, 2])
+        frontier.fail_coffees(ORIGIN, [3], "HTTP 503")
+        # the run dies here, page 4 stays pending and page 5 was unchanged
+        frontier.close()
+
+        frontier = CrawlFrontier(self.path)
+        self.addCleanup(frontier.close)
+        self.assertEqual(frontier.counts(ORIGIN), {DONE: 2, FAILED: 1, PENDING: 1})
+        # the resumed run plans page 2 again, it is done already
+        scheduled = frontier.schedule(ORIGIN, PRODUCTS, [PRODUCTS[1]], url_of)
+        self.assertEqual(sorted(item.page_id for item in scheduled), [3, 4])
+
+        frontier.finish_coffees(ORIGIN, [3, 4])
+        self.assertEqual(frontier.schedule(ORIGIN, PRODUCTS, [], url_of), [])
+        self.assertEqual(frontier.counts(ORIGIN), {DONE: 4})
+
+    def test_fresh_run_starts_empty(self) -> None:
+        frontier = CrawlFrontier(self.path)
+        self.addCleanup(frontier.close)
+        frontier.schedule(ORIGIN, PRODUCTS, PRODUCTS, url_of)
+        frontier.finish_coffees(ORIGIN, [1])
+        frontier.reset(ORIGIN)
+        self.assertEqual(frontier.counts(ORIGIN), {})
+        self.assertEqual(
+            frontier.schedule(ORIGIN, PRODUCTS, PRODUCTS[:1], url_of), PRODUCTS[:1]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
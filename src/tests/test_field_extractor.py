@@ -0,0 +1,55 @@
+"""Run from src/: python -m unittest discover -s tests"""
+
+import unittest
+
+from processors.field_extractor import FieldExtractor, FieldSpec
+
+FIELDS = [
+    FieldSpec("region", "Oblasť:"),
+    FieldSpec("altitude", "Nadmorská výška:", r"(\d+(?:\s*-\s*\d+)?)"),
+    FieldSpec("variety", "Odroda:", stops=("Spracovanie",)),
+    FieldSpec("processing", "Spracovanie:"),
+]
+
+
+class FieldExtractorTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.extractor = FieldExtractor(FIELDS)
+
+    def test_values_end_at_the_line_or_the_next_label(self) -> None:
+        text = (
+            "Oblasť: Sidamo\n"
+            "Nadmorská výška: 1800 - 2100 m n. m.\n"
+            "Odroda: Heirloom Spracovanie: praná"
+        )
+        self.assertEqual(
+            self.extractor.extract(text),
+            {
+                "region": "Sidamo",
+                "altitude": "1800 - 2100",
+                "variety": "Heirloom",
+                "processing": "praná",
+            },
+        )
+
+    def test_value_on_the_following_line(self) -> None:
+        self.assertEqual(
+            self.extractor.extract("Oblasť:\n  Huila\nPoznámka: iné"),
+            {"region": "Huila"},
+        )
+
+    def test_first_value_wins_and_unmatched_patterns_are_dropped(self) -> None:
+        text = "Oblasť: Cauca\nOblasť: Huila\nNadmorská výška: neuvedená"
+        self.assertEqual(self.extractor.extract(text), {"region": "Cauca"})
+
+    def test_empty_text_and_unlabelled_delimiters(self) -> None:
+        self.assertEqual(self.extractor.extract(None), {})
+        self.assertEqual(self.extractor.extract("Cena: 9,90 €"), {})
+
+    def test_label_without_the_delimiter_is_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            FieldExtractor([FieldSpec("region", "Oblasť")])
+
+
+if __name__ == "__main__":
+    unittest.main()
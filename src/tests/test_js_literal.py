@@ -0,0 +1,44 @@
+"""Run from src/: python -m unittest discover -s tests"""
+
+import unittest
+
+from processors.js_literal import parse_array
+
+
+class ParseArrayTest(unittest.TestCase):
+    def test_nested_literal(self) -> None:
+        text = (
+            "dataLayer.push({items: [{item_id: '7', price: 9.9, "
+            "item_category: {name: 'Káva', tags: ['zrnková', 'arabica',]},},]});"
+        )
+        self.assertEqual(
+            parse_array(text, text.index("[")),
+            [
+                {
+                    "item_id": "7",
+                    "price": 9.9,
+                    "item_category": {"name": "Káva", "tags": ["zrnková", "arabica"]},
+                }
+            ],
+        )
+
+    def test_quotes_and_escapes_inside_strings(self) -> None:
+        text = (
+            r"""[{name: 'Kenya "AA"', note: "it's, ]", code: 'a\'b\x41', x: 'c\\'}]"""
+        )
+        self.assertEqual(
+            parse_array(text, 0),
+            [{"name": 'Kenya "AA"', "note": "it's, ]", "code": "a'bA", "x": "c\\"}],
+        )
+
+    def test_text_after_the_array_is_ignored(self) -> None:
+        self.assertEqual(parse_array("x = [1, 2,]; y = [3]", 4), [1, 2])
+
+    def test_malformed_literals_raise(self) -> None:
+        for text in ("[{name: 'unterminated}]", "[1, 2", "[{a: }]", "{a: 1}"):
+            with self.subTest(text), self.assertRaises(ValueError):
+                parse_array(text, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
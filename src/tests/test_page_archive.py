@@ -0,0 +1,47 @@
+"""Run from src/: python -m unittest discover -s tests"""
+
+import tempfile
+import unittest
+
+from archive.page_archive import PageArchive
+from assets.constants import DETAIL_PAGE
+from models.fetch_result import FetchResult
+
+
+def page(page_id: int) -> FetchResult:
+    return FetchResult(
+        url=f"https://example.com/detail/{page_id}/",
+        status=200,
+        text=f"<html>{page_id} " + "body " * page_id + "</html>",
+    )
+
+
+class PageArchiveTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_runs_started_together_get_their_own_id(self) -> None:
+        with PageArchive(self.directory.name) as archive:
+            self.assertRegex(archive.run_id, r"^\d{8}T\d{6}-\d+$")
+
+    def test_writers_sharing_a_run_keep_every_body_intact(self) -> None:
+        first = PageArchive(self.directory.name, "shared")
+        second = PageArchive(self.directory.name, "shared")
+        self.addCleanup(first.close)
+        self.addCleanup(second.close)
+        for page_id in range(1, 9):
+            writer = first if page_id % 2 else second
+            writer.record(DETAIL_PAGE, page(page_id), page_id)
+
+        for archive in (first, second):
+            for page_id in range(1, 9):
+                self.assertEqual(archive.get_page(page_id).text, page(page_id).text)
+        self.assertEqual(
+            [result.url for result in first.pages(DETAIL_PAGE)],
+            [page(page_id).url for page_id in range(1, 9)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
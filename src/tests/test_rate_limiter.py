@@ -0,0 +1,43 @@
+"""Run from src/: python -m unittest discover -s tests"""
+
+import unittest
+from unittest import mock
+
+from transport.rate_limiter import RateLimiter
+
+
+class RateLimiterTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.now = 100.0
+        clock = mock.patch("transport.rate_limiter.time.monotonic", lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def test_requests_are_spaced_by_the_interval(self) -> None:
+        limiter = RateLimiter(requests_per_second=4)
+        self.assertEqual([limiter.reserve() for _ in range(3)], [0.0, 0.25, 0.5])
+        self.now += 0.5
+        self.assertEqual(limiter.reserve(), 0.25)
+
+    def test_burst_goes_out_after_an_idle_spell(self) -> None:
+        limiter = RateLimiter(requests_per_second=2, burst=3)
+        self.assertEqual([limiter.reserve() for _ in range(4)], [0.0, 0.0, 0.0, 0.5])
+        # idle time refills the bucket, but never beyond burst
+        self.now += 60
+        self.assertEqual([limiter.reserve() for _ in range(4)], [0.0, 0.0, 0.0, 0.5])
+
+    def test_wait_sleeps_the_reserved_delay(self) -> None:
+        limiter = RateLimiter(requests_per_second=10)
+        with mock.patch("transport.rate_limiter.time.sleep") as sleep:
+            limiter.wait()
+            self.assertAlmostEqual(limiter.wait(), 0.1)
+        sleep.assert_called_once()
+        self.assertAlmostEqual(sleep.call_args.args[0], 0.1)
+
+    def test_rate_must_be_positive(self) -> None:
+        with self.assertRaises(ValueError):
+            RateLimiter(requests_per_second=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+"""Run from src/: python -m unittest discover -s tests"""
+
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from assets.constants import TABLE_COFFEE, TABLE_METADATA
+from database.fingerprint_store import FingerprintStore
+from database.memory_db import InMemoryDB
+from database.sqlite_db import SQLiteDB
+from models.coffee import Coffee, Origin, Species, Taste
+from models.metadata import Metadata
+
+SHOPS = ("SHOP_A", "SHOP_B")
+
+
+def coffee(page: str, page_id: int) -> Coffee:
+    return Coffee(
+        id=page_id,
+        page=page,
+        name=f"{page} {page_id}",
+        price=9.9,
+        weight=250,
+        origin=Origin(region="Etiopia"),
+        taste=Taste(1, 2, 3, 4, "stredné", Species(100, 0)),
+        popularity=None,
+    )
+
+
+class SinkTest(unittest.TestCase):
+    """two shops may use the same page_id, neither may overwrite the other"""
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def sinks(self):
+        database = SQLiteDB(os.path.join(self.directory.name, "coffee.sqlite"))
+        self.addCleanup(database.close)
+        return database, InMemoryDB()
+
+    def test_metadata_is_kept_per_origin(self) -> None:
+        for database in self.sinks():
+            with self.subTest(type(database).__name__):
+                for shop in SHOPS:
+                    result = database.update_metadata(
+                        [Metadata(7, shop, f"{shop} 7", 9.9, f"/{shop}/7/")]
+                    )
+                    self.assertEqual(len(result["created"]), 1)
+
+                for shop in SHOPS:
+                    stored = database.get_metadata(shop, [7])
+                    self.assertEqual(stored[7]["name"], f"{shop} 7")
+                self.assertEqual(database.delete_old_metadata([], "SHOP_A"), [7])
+                self.assertEqual(database.get_metadata("SHOP_A", [7]), {})
+                self.assertEqual(list(database.get_metadata("SHOP_B")), [7])
+
+    def test_coffees_are_kept_per_origin(self) -> None:
+        for database in self.sinks():
+            with self.subTest(type(database).__name__):
+                results = database.update_coffees([coffee(shop, 7) for shop in SHOPS])
+                self.assertEqual(results["created"], [(shop, 7) for shop in SHOPS])
+                self.assertTrue(database.update_coffee(coffee("SHOP_A", 7)))
+                results = database.update_coffees([coffee("SHOP_B", 7)])
+                self.assertEqual(results["updated"], [("SHOP_B", 7)])
+
+        sqlite_db, _ = self.sinks()
+        sqlite_db.update_coffees([coffee(shop, 7) for shop in SHOPS])
+        self.assertEqual(
+            sorted(row["name"] for row in sqlite_db.rows(TABLE_COFFEE)),
+            ["SHOP_A 7", "SHOP_B 7"],
+        )
+
+    def test_sqlite_bad_row_fails_alone(self) -> None:
+        database, _ = self.sinks()
+        database.connection.execute(
+            f"CREATE TRIGGER reject BEFORE INSERT ON {TABLE_COFFEE} "
+            "WHEN NEW.name = 'SHOP_B 8' BEGIN SELECT RAISE(ABORT, 'rejected'); END"
+        )
+        results = database.update_coffees(
+            [coffee("SHOP_A", 7), coffee("SHOP_B", 8), coffee("SHOP_A", 9)]
+        )
+        self.assertEqual(results["created"], [("SHOP_A", 7), ("SHOP_A", 9)])
+        self.assertEqual(results["failed"], [("SHOP_B", 8)])
+
+    def test_sync_keeps_changed_at(self) -> None:
+        database, target = self.sinks()
+        database.update_metadata([Metadata(7, "SHOP_A", "a", 9.9, "/7/")])
+        database.connection.execute(
+            f"UPDATE {TABLE_METADATA} SET changed_at = '2026-01-01T00:00:00+00:00'"
+        )
+        database.sync_to(target)
+        self.assertEqual(
+            target.get_metadata("SHOP_A")[7]["changed_at"],
+            "2026-01-01T00:00:00+00:00",
+        )
+
+    def test_sqlite_file_unique_per_page_id_is_migrated(self) -> None:
+        path = os.path.join(self.directory.name, "old.sqlite")
+        connection = sqlite3.connect(path)
+        connection.execute(
+            "CREATE TABLE metadata (id INTEGER PRIMARY KEY, "
+            "page_id INTEGER NOT NULL UNIQUE, origin TEXT, name TEXT, price REAL, "
+            "detail_link TEXT, changed_at TEXT)"
+        )
+        connection.execute(
+            "INSERT INTO metadata (page_id, origin, name) VALUES (7, 'SHOP_A', 'old')"
+        )
+        connection.commit()
+        connection.close()
+
+        database = SQLiteDB(path)
+        self.addCleanup(database.close)
+        database.update_metadata([Metadata(7, "SHOP_B", "new", 9.9, "/7/")])
+        self.assertEqual(database.get_metadata("SHOP_A", [7])[7]["name"], "old")
+        self.assertEqual(database.get_metadata("SHOP_B", [7])[7]["name"], "new")
+
+    def test_fingerprints_are_kept_per_origin(self) -> None:
+        store = FingerprintStore()
+        self.addCleanup(store.close)
+        store.put({("SHOP_A", 7): "a", ("SHOP_B", 7): "b"})
+        self.assertEqual(
+            store.get([("SHOP_A", 7), ("SHOP_B", 7), ("SHOP_C", 7)]),
+            {("SHOP_A", 7): "a", ("SHOP_B", 7): "b"},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
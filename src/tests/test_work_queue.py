@@ -0,0 +1,72 @@
+"""Run from src/: python -m unittest discover -s tests"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from models.metadata import Metadata
+from scheduler.work_queue import DEAD, DONE, LEASED, WorkQueue
+
+
+def url_of(metadata: Metadata) -> str:
+    return f"https://example.com/detail/{metadata.page_id}/"
+
+
+class WorkQueueTest(unittest.TestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.queue = WorkQueue(os.path.join(directory.name, "queue.sqlite"), 2)
+        self.addCleanup(self.queue.close)
+        self.now = 1000.0
+        clock = mock.patch("scheduler.work_queue.time.time", lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+        self.queue.enqueue([Metadata(7, "SHOP_A", "a", 9.9, "a")], url_of)
+
+    def test_expired_lease_goes_to_another_worker(self) -> None:
+        (item,) = self.queue.lease("first", 10, lease_seconds=30)
+        self.now += 29
+        self.assertEqual(self.queue.lease("second", 10, lease_seconds=30), [])
+
+        self.now += 2
+        (taken,) = self.queue.lease("second", 10, lease_seconds=30)
+        self.assertEqual((taken.id, taken.attempts), (item.id, 2))
+        # the first worker lost the lease, its ack does not count
+        self.queue.ack("first", [item.id])
+        self.assertEqual(self.queue.counts(), {LEASED: 1})
+        self.queue.ack("second", [item.id])
+        self.assertEqual(self.queue.counts(), {DONE: 1})
+
+    def test_second_ack_changes_nothing(self) -> None:
+        (item,) = self.queue.lease("first", 10, lease_seconds=30)
+        self.queue.ack("first", [item.id])
+        self.queue.ack("first", [item.id])
+        self.assertEqual(self.queue.counts(), {DONE: 1})
+        self.assertEqual(self.queue.lease("first", 10, lease_seconds=30), [])
+        self.assertFalse(self.queue.has_work())
+
+    def test_nacked_item_is_dead_after_max_attempts(self) -> None:
+        (item,) = self.queue.lease("first", 10, lease_seconds=30)
+        self.queue.nack("first", {item.id: "HTTP 503"})
+        (item,) = self.queue.lease("first", 10, lease_seconds=30)
+        self.queue.nack("first", {item.id: "HTTP 503"})
+
+        self.assertEqual(self.queue.counts(), {DEAD: 1})
+        self.assertEqual(self.queue.lease("first", 10, lease_seconds=30), [])
+        last_error = self.queue.connection.execute(
+            "SELECT last_error FROM work"
+        ).fetchone()[0]
+        self.assertEqual(last_error, "HTTP 503")
+
+    def test_expired_lease_is_dead_after_max_attempts(self) -> None:
+        for _ in range(2):
+            self.queue.lease("crashed", 10, lease_seconds=30)
+            self.now += 31
+        self.assertEqual(self.queue.lease("second", 10, lease_seconds=30), [])
+        self.assertEqual(self.queue.counts(), {DEAD: 1})
+
+
+if __name__ == "__main__":
+    unittest.main()
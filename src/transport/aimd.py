@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+from collections import Counter
+
+THROTTLE_STATUSES = frozenset({429, 503})
+
+
+class AimdController:
+    """Adapts how many requests a site gets in flight, additive increase
+    while it answers quickly, multiplicative decrease when it throttles us,
+    times out or its latency climbs well above the usual.
+
+    The state outlives a single fetch_all, so every batch of a run starts
+    from what the site tolerated so far."""
+
+    def __init__(
+        self,
+        initial=4,
+        minimum=1,
+        maximum=32,
+        increase=1.0,
+        decrease=0.5,
+        latency_tolerance=2.0,
+        smoothing=0.2,
+        timeout_factor=8.0,
+        min_timeout=2.0,
+    ) -> None:
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_tolerance = latency_tolerance
+        self.smoothing = smoothing
+        self.timeout_factor = timeout_factor
+        self.min_timeout = min_timeout
+        self.latency: float | None = None
+        self.baseline: float | None = None
+        self.last_back_off = 0.0
+        self.back_offs = Counter()
+        self.lock = threading.Lock()
+
+    @property
+    def allowed(self) -> int:
+        return int(self.limit)
+
+    def record(self, latency: float, status: int | None) -> None:
+        """one finished attempt, status None means it never got a response"""
+        with self.lock:
+            if status is None:
+                self.back_off("no_response")
+                return
+            if status in THROTTLE_STATUSES:
+                self.back_off(str(status))
+                return
+            if status >= 400:
+                return
+            self.observe_latency(latency)
+            if self.latency > self.baseline * self.latency_tolerance:
+                self.back_off("latency")
+            else:
+                # about one more request in flight per round trip at the limit
+                self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+
+    def observe_latency(self, latency: float) -> None:
+        if self.latency is None:
+            self.latency = self.baseline = latency
+            return
+        self.latency += self.smoothing * (latency - self.latency)
+        # the baseline follows drops at once and rises slowly, so a site that
+        # is a bit slower today becomes the new normal instead of a spike
+        if self.latency < self.baseline:
+            self.baseline = self.latency
+        else:
+            self.baseline += self.smoothing * 0.05 * (self.latency - self.baseline)
+
+    def back_off(self, reason: str) -> None:
+        now = time.monotonic()
+        # the requests already in flight report the same trouble, react once
+        # per round trip
+        if now - self.last_back_off < (self.latency or 1.0):
+            return
+        self.last_back_off = now
+        self.limit = max(self.minimum, self.limit * self.decrease)
+        self.back_offs[reason] += 1
+
+    def timeout(self, default: float) -> float:
+        """a request timeout scaled to the site's usual latency, at most default"""
+        if self.latency is None:
+            return default
+        return min(default, max(self.min_timeout, self.latency * self.timeout_factor))
+
+
+class AdaptiveSlots:
+    """asyncio gate that lets in as many requests as the controller allows"""
+
+    def __init__(self, controller: AimdController) -> None:
+        self.controller = controller
+        self.in_flight = 0
+        self.condition = asyncio.Condition()
+
+    async def __aenter__(self) -> None:
+        async with self.condition:
+            await self.condition.wait_for(
+                lambda: self.in_flight < self.controller.allowed
+            )
+            self.in_flight += 1
+
+    async def __aexit__(self, *exc_info) -> None:
+        async with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
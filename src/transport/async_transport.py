@@ -0,0 +1,212 @@
+import asyncio
+import queue
+import threading
+import time
+from typing import Generator, Iterable
+
+import aiohttp
+from urllib3.util.request import ACCEPT_ENCODING
+
+from models.fetch_result import FetchResult
+from transport.aimd import AdaptiveSlots, AimdController
+from transport.http_cache import HttpCache
+from transport.rate_limiter import RateLimiter
+from transport.retry_policy import RetryPolicy
+
+_DONE = object()
+
+
+class AsyncTransport:
+    """Fetches many urls concurrently on a background event loop"""
+
+    def __init__(
+        self,
+        retry_policy: RetryPolicy = None,
+        concurrency=8,
+        per_host_limit=4,
+        timeout=15,
+        cache: HttpCache = None,
+        rate_limiter: RateLimiter = None,
+        controller: AimdController = None,
+    ) -> None:
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.controller = controller
+        self.concurrency = concurrency
+        self.per_host_limit = per_host_limit
+        self.timeout = timeout
+
+    def fetch_all(self, urls: Iterable[str]) -> Generator[FetchResult, None, None]:
+        """Yields a FetchResult for every url in completion order"""
+        results = queue.Queue(maxsize=self.concurrency * 2)
+        stop = threading.Event()
+        errors = []
+        worker = threading.Thread(
+            target=self._run_loop,
+            args=(list(urls), results, stop, errors),
+            daemon=True,
+        )
+        worker.start()
+        try:
+            while (item := results.get()) is not _DONE:
+                yield item
+        finally:
+            stop.set()
+            worker.join()
+        if errors:
+            raise errors[0]
+
+    def _run_loop(
+        self, urls: list[str], results: queue.Queue, stop: threading.Event, errors
+    ) -> None:
+        """hands an exception of the event loop thread to fetch_all's caller"""
+        try:
+            asyncio.run(self._crawl(urls, results, stop))
+        except Exception as e:
+            errors.append(e)
+
+    async def _crawl(
+        self, urls: list[str], results: queue.Queue, stop: threading.Event
+    ) -> None:
+        if self.controller:
+            # the controller decides how many requests are in flight
+            limit = per_host_limit = self.controller.maximum
+        else:
+            limit, per_host_limit = self.concurrency, self.per_host_limit
+        connector = aiohttp.TCPConnector(limit=limit, limit_per_host=per_host_limit)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        try:
+            async with aiohttp.ClientSession(
+                connector=connector,
+                timeout=timeout,
+                headers={"Accept-Encoding": ACCEPT_ENCODING},
+            ) as session:
+                # the semaphore keeps queued requests from running down their
+                # timeout and latency clocks while waiting for a connection
+                slots = (
+                    AdaptiveSlots(self.controller)
+                    if self.controller
+                    else asyncio.Semaphore(self.concurrency)
+                )
+                tasks = [
+                    asyncio.create_task(self._fetch_in_slot(slots, session, url))
+                    for url in urls
+                ]
+                try:
+                    for next_done in asyncio.as_completed(tasks):
+                        if not await self._put(results, await next_done, stop):
+                            break
+                finally:
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            await self._put(results, _DONE, stop, force=True)
+
+    async def _fetch_in_slot(
+        self,
+        slots: asyncio.Semaphore | AdaptiveSlots,
+        session: aiohttp.ClientSession,
+        url: str,
+    ) -> FetchResult:
+        async with slots:
+            try:
+                return await self._fetch(session, url)
+            except Exception as e:
+                # e.g. an undecodable body or a cache error, only this url fails
+                return FetchResult(url=url, error=f"An error occurred: {e!r}")
+
+    async def _fetch(self, session: aiohttp.ClientSession, url: str) -> FetchResult:
+        started = time.perf_counter()
+        cached = self.cache.lookup(url) if self.cache else None
+        if cached and self.cache.is_fresh(cached):
+            return self.cache.unchanged_result(cached)
+        headers = self.cache.conditional_headers(cached) if self.cache else {}
+
+        attempt = 0
+        while True:
+            attempt += 1
+            status = None
+            retry_after = None
+            if self.rate_limiter:
+                # waiting for the site's budget is not part of the latency
+                started += await self.rate_limiter.wait_async()
+            attempt_started = time.perf_counter()
+            try:
+                async with session.get(
+                    url, headers=headers, timeout=self.request_timeout()
+                ) as response:
+                    status = response.status
+                    if self.controller:
+                        self.controller.record(
+                            time.perf_counter() - attempt_started, status
+                        )
+                    if status == 304 and cached:
+                        return self.cache.unchanged_result(
+                            cached,
+                            status=status,
+                            attempts=attempt,
+                            elapsed=time.perf_counter() - started,
+                        )
+                    if response.ok:
+                        text = await response.text()
+                        if self.cache and str(response.url) == url:
+                            self.cache.store(url, text, response.headers)
+                        return FetchResult(
+                            url=url,
+                            status=status,
+                            text=text,
+                            final_url=str(response.url),
+                            attempts=attempt,
+                            elapsed=time.perf_counter() - started,
+                        )
+                    error = f"HTTP Error: {status} {response.reason}"
+                    retry_after = response.headers.get("Retry-After")
+            except asyncio.TimeoutError:
+                error = "The request timed out."
+                self.record_no_response(attempt_started)
+            except aiohttp.ClientConnectionError as e:
+                error = f"A connection error occurred: {e}"
+                self.record_no_response(attempt_started)
+            except aiohttp.ClientError as e:
+                return FetchResult(
+                    url=url,
+                    error=f"An error occurred: {e}",
+                    attempts=attempt,
+                    elapsed=time.perf_counter() - started,
+                )
+
+            if not self.retry_policy.should_retry(attempt, status):
+                return FetchResult(
+                    url=url,
+                    status=status,
+                    error=error,
+                    attempts=attempt,
+                    elapsed=time.perf_counter() - started,
+                )
+            await asyncio.sleep(self.retry_policy.delay(attempt, retry_after))
+
+    def request_timeout(self) -> aiohttp.ClientTimeout:
+        if self.controller:
+            return aiohttp.ClientTimeout(total=self.controller.timeout(self.timeout))
+        return aiohttp.ClientTimeout(total=self.timeout)
+
+    def record_no_response(self, attempt_started: float) -> None:
+        if self.controller:
+            self.controller.record(time.perf_counter() - attempt_started, None)
+
+    async def _put(
+        self, results: queue.Queue, item, stop: threading.Event, force=False
+    ) -> bool:
+        # the consumer lives on another thread, never block the event loop on it
+        while True:
+            if stop.is_set() and not force:
+                return False
+            try:
+                results.put_nowait(item)
+                return True
+            except queue.Full:
+                if stop.is_set():
+                    return False
+                await asyncio.sleep(0.01)
@@ -0,0 +1,148 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Mapping, Optional
+
+from models.fetch_result import FetchResult
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    text: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+
+    @property
+    def has_validators(self) -> bool:
+        return bool(self.etag or self.last_modified)
+
+
+class HttpCache:
+    """On-disk store of response bodies keyed by url, revalidated with
+    If-None-Match / If-Modified-Since"""
+
+    def __init__(
+        self, path: str, max_size_bytes=256 * 1024 * 1024, ttl: float = None
+    ) -> None:
+        self.max_size_bytes = max_size_bytes
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            """CREATE TABLE IF NOT EXISTS http_cache (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS http_cache_accessed ON http_cache (accessed_at)"
+        )
+        self.connection.commit()
+        self.total_size = self.connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM http_cache"
+        ).fetchone()[0]
+
+    def lookup(self, url: str) -> CacheEntry | None:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT etag, last_modified, body, stored_at FROM http_cache "
+                "WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, body, stored_at = row
+        return CacheEntry(
+            url=url,
+            text=zlib.decompress(body).decode("utf-8"),
+            etag=etag,
+            last_modified=last_modified,
+            stored_at=stored_at,
+        )
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        """ttl only applies to entries the site sent no validators for"""
+        if self.ttl is None or entry.has_validators:
+            return False
+        return time.time() - entry.stored_at < self.ttl
+
+    def conditional_headers(self, entry: CacheEntry | None) -> dict:
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def unchanged_result(
+        self, entry: CacheEntry, status: int = None, attempts=0, elapsed=0.0
+    ) -> FetchResult:
+        with self.lock:
+            self.connection.execute(
+                "UPDATE http_cache SET accessed_at = ? WHERE url = ?",
+                (time.time(), entry.url),
+            )
+            self.connection.commit()
+        return FetchResult(
+            url=entry.url,
+            status=status,
+            text=entry.text,
+            final_url=entry.url,
+            attempts=attempts,
+            elapsed=elapsed,
+            unchanged=True,
+        )
+
+    def store(self, url: str, text: str, headers: Mapping[str, str]) -> None:
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not (etag or last_modified or self.ttl is not None):
+            return
+        body = zlib.compress(text.encode("utf-8"))
+        now = time.time()
+        with self.lock:
+            previous = self.connection.execute(
+                "SELECT size FROM http_cache WHERE url = ?", (url,)
+            ).fetchone()
+            self.connection.execute(
+                """INSERT OR REPLACE INTO http_cache
+                (url, etag, last_modified, body, size, stored_at, accessed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                (url, etag, last_modified, body, len(body), now, now),
+            )
+            self.total_size += len(body) - (previous[0] if previous else 0)
+            self.evict()
+            self.connection.commit()
+
+    def evict(self) -> None:
+        """drops least recently used entries until the cache fits, caller holds lock"""
+        while self.total_size > self.max_size_bytes:
+            rows = self.connection.execute(
+                "SELECT url, size FROM http_cache ORDER BY accessed_at LIMIT 100"
+            ).fetchall()
+            if not rows:
+                self.total_size = 0
+                return
+            for url, size in rows:
+                self.connection.execute("DELETE FROM http_cache WHERE url = ?", (url,))
+                self.total_size -= size
+                if self.total_size <= self.max_size_bytes:
+                    return
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
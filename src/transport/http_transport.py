@@ -0,0 +1,98 @@
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+from models.fetch_result import FetchResult
+from transport.http_cache import HttpCache
+from transport.rate_limiter import RateLimiter
+from transport.retry_policy import RetryPolicy
+
+
+class HttpTransport:
+    """Pooled keep-alive session shared by every request a crawler makes"""
+
+    def __init__(
+        self,
+        retry_policy: RetryPolicy = None,
+        timeout=15,
+        pool_size=10,
+        cache: HttpCache = None,
+        rate_limiter: RateLimiter = None,
+    ) -> None:
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # urllib3 only advertises br when a brotli decoder is installed
+        self.session.headers.update(
+            {"Accept-Encoding": ACCEPT_ENCODING, "Connection": "keep-alive"}
+        )
+
+    def get(self, url: str) -> FetchResult:
+        started = time.perf_counter()
+        cached = self.cache.lookup(url) if self.cache else None
+        if cached and self.cache.is_fresh(cached):
+            return self.cache.unchanged_result(cached)
+        headers = self.cache.conditional_headers(cached) if self.cache else {}
+
+        attempt = 0
+        while True:
+            attempt += 1
+            status = None
+            retry_after = None
+            if self.rate_limiter:
+                # waiting for the site's budget is not part of the latency
+                started += self.rate_limiter.wait()
+            try:
+                response = self.session.get(url, timeout=self.timeout, headers=headers)
+                status = response.status_code
+                if status == 304 and cached:
+                    return self.cache.unchanged_result(
+                        cached,
+                        status=status,
+                        attempts=attempt,
+                        elapsed=time.perf_counter() - started,
+                    )
+                if response.ok:
+                    if self.cache and response.url == url:
+                        self.cache.store(url, response.text, response.headers)
+                    return FetchResult(
+                        url=url,
+                        status=status,
+                        text=response.text,
+                        final_url=response.url,
+                        attempts=attempt,
+                        elapsed=time.perf_counter() - started,
+                    )
+                error = f"HTTP Error: {status} {response.reason}"
+                retry_after = response.headers.get("Retry-After")
+            except requests.exceptions.Timeout:
+                error = "The request timed out."
+            except requests.exceptions.ConnectionError as e:
+                error = f"A connection error occurred: {e}"
+            except requests.exceptions.RequestException as e:
+                return FetchResult(
+                    url=url,
+                    error=f"An error occurred: {e}",
+                    attempts=attempt,
+                    elapsed=time.perf_counter() - started,
+                )
+
+            if not self.retry_policy.should_retry(attempt, status):
+                return FetchResult(
+                    url=url,
+                    status=status,
+                    error=error,
+                    attempts=attempt,
+                    elapsed=time.perf_counter() - started,
+                )
+            time.sleep(self.retry_policy.delay(attempt, retry_after))
+
+    def close(self) -> None:
+        self.session.close()
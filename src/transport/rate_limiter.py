@@ -0,0 +1,39 @@
+import asyncio
+import threading
+import time
+
+
+class RateLimiter:
+    """Token bucket shared by every transport of one site, so the sync and the
+    async transport together stay within the site's request rate"""
+
+    def __init__(self, requests_per_second: float, burst=1) -> None:
+        if requests_per_second <= 0:
+            raise ValueError("requests_per_second must be positive")
+        self.interval = 1 / requests_per_second
+        # up to burst requests may go out back to back after an idle spell
+        self.tolerance = (max(1, burst) - 1) * self.interval
+        self.lock = threading.Lock()
+        self.next_free = time.monotonic()
+
+    def reserve(self) -> float:
+        """takes a token, returns how long to wait before it may be used"""
+        with self.lock:
+            now = time.monotonic()
+            self.next_free = max(self.next_free, now)
+            delay = max(0.0, self.next_free - self.tolerance - now)
+            self.next_free += self.interval
+            return delay
+
+    def wait(self) -> float:
+        """blocks until a request may go out, returns the seconds waited"""
+        delay = self.reserve()
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    async def wait_async(self) -> float:
+        delay = self.reserve()
+        if delay:
+            await asyncio.sleep(delay)
+        return delay